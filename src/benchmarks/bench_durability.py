@@ -0,0 +1,62 @@
+#!/bin/python3
+"""
+Throughput cost of the durability levels ('none', 'data', 'full') of dumps
+
+Usage (from src/):
+    python3 -m benchmarks.bench_durability [--dir /path/on/the/disk/to/test] [--size-kb 1 100] [--seconds 2]
+
+Run it on the file system of the real files: on tmpfs syncs cost nothing.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from file_access_protector import durability
+from file_access_protector.with_backupfile import json_safe_dump
+from file_access_protector.without_backupfile import write_json
+
+from .bench_serializers import make_document
+
+DUMPS = {
+    'json_safe_dump': lambda file_path, data, level: json_safe_dump(file_path, data, durability=level),
+    'json_safe_dump atomic': lambda file_path, data, level: json_safe_dump(file_path, data, atomic=True, durability=level),
+    'write_json': lambda file_path, data, level: write_json(file_path, data, durability=level),
+}
+
+
+def dumps_per_second(dump, file_path: str, data: dict, level: str, seconds: float) -> float:
+    dump(file_path, data, level)
+
+    count = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < seconds:
+        dump(file_path, data, level)
+        count += 1
+
+    return count / (time.perf_counter() - start_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dir', default=None, help='directory to write in (default: a temp directory)')
+    parser.add_argument('--size-kb', type=float, nargs='+', default=[1, 100])
+    parser.add_argument('--seconds', type=float, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp_dir:
+        for size_kb in args.size_kb:
+            data = make_document(size_kb / 1024)
+
+            for name, dump in DUMPS.items():
+                file_path = os.path.join(tmp_dir, f'{name.replace(" ", "_")}_{size_kb}.json')
+                rates = {level: dumps_per_second(dump, file_path, data, level, args.seconds)
+                         for level in durability.LEVELS}
+
+                print(f'{size_kb:>7} KB {name:<22} ' + ' | '.join(
+                    f'{level}: {rate:>8.0f}/s ({rate / rates[durability.NONE]:>4.0%})' for level, rate in rates.items()))
+
+
+if __name__ == '__main__':
+    main()
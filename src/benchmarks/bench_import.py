@@ -0,0 +1,69 @@
+#!/bin/python3
+"""
+Measure the import time of the package modules with `python -X importtime`
+
+Usage (from src/):
+    python3 -m benchmarks.bench_import [--repeat 10] [--modules file_access_protector.with_backupfile]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    'file_access_protector',
+    'file_access_protector.with_backupfile',
+    'file_access_protector.without_backupfile',
+    'file_access_protector.aio',
+]
+
+# modules the package must not import before they are needed
+HEAVY_MODULES = ['yaml', 'psutil', 'asyncio', 'shutil', 'tempfile', 'subprocess', 'logging', 'dataclasses']
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time(module: str) -> float:
+    """
+    Cumulative import time of module (seconds) in a fresh interpreter
+    """
+
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=_SRC_DIR, capture_output=True, text=True, check=True).stderr
+
+    for line in output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative_us = int(fields[1])
+
+    return cumulative_us / 1e6
+
+
+def imported_modules(code: str) -> set:
+    """
+    Names in sys.modules after running code in a fresh interpreter
+    """
+
+    output = subprocess.run([sys.executable, '-c', f'{code}\nimport sys\nprint("\\n".join(sys.modules))'],
+                            cwd=_SRC_DIR, capture_output=True, text=True, check=True).stdout
+
+    return set(output.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        times = [import_time(module) for _ in range(args.repeat)]
+        heavy = sorted(set(HEAVY_MODULES) & imported_modules(f'import {module}'))
+        print(f'{module:<42} median: {statistics.median(times) * 1000:>7.1f} ms | min: {min(times) * 1000:>7.1f} ms | heavy imports: {heavy}')
+
+
+if __name__ == '__main__':
+    main()
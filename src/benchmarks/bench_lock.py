@@ -0,0 +1,66 @@
+#!/bin/python3
+"""
+Compare the in-process fcntl timed lock against the former `flock` subprocess path
+
+Usage (from src/):
+    python3 -m benchmarks.bench_lock [--iterations 2000]
+"""
+
+import argparse
+import fcntl
+import os
+import subprocess
+import tempfile
+import time
+
+from file_access_protector.lock import get_lock_with_timeout
+
+
+def subprocess_lock_with_timeout(fd: int, timeout: float):
+    # the implementation used before the native lock engine
+    rc = subprocess.call(['flock',
+                          '--timeout', str(timeout),
+                          str(fd)],
+                         pass_fds=[fd])
+
+    if rc != 0:
+        raise TimeoutError(f'Failed to get file lock')
+
+
+def run(lock_func, file_path: str, iterations: int) -> list:
+    latencies = []
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        with open(file_path, 'r') as f:
+            lock_func(f.fileno(), 1)
+            fcntl.flock(f, fcntl.LOCK_UN)
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{name:<12} ops/s: {len(latencies) / total:>10.0f} | p50: {p50 * 1e6:>9.1f}us | p99: {p99 * 1e6:>9.1f}us')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'bench.json')
+        with open(file_path, 'w') as f:
+            f.write('{}')
+
+        report('fcntl', run(get_lock_with_timeout, file_path, args.iterations))
+        report('subprocess', run(subprocess_lock_with_timeout, file_path, args.iterations))
+
+
+if __name__ == '__main__':
+    main()
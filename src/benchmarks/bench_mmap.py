@@ -0,0 +1,70 @@
+#!/bin/python3
+"""
+Compare load latency and peak Python heap of the bytes read path and the mmap read path
+
+Usage (from src/):
+    python3 -m benchmarks.bench_mmap [--size-mb 10 100 500] [--formats json yaml] [--repeat 3]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+
+from file_access_protector import codec
+from file_access_protector.codec import get_codec, load_file
+
+from .bench_serializers import best_time, make_document
+
+# read path -> MMAP_THRESHOLD
+READ_PATHS = {'bytes': None, 'mmap': 0}
+
+
+def peak_memory(func) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, nargs='+', default=[10, 100])
+    parser.add_argument('--formats', nargs='+', default=['json'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench_mmap_')
+
+    try:
+        for size_mb in args.size_mb:
+            document = make_document(size_mb)
+
+            for file_format in args.formats:
+                file_path = f'{folder}/data.{file_format}'
+                codec_ = get_codec(file_format)
+                with open(file_path, 'wb') as f:
+                    f.write(codec_.dumps(document))
+
+                file_size = os.path.getsize(file_path) / 1024 / 1024
+                print(f'--- {file_format} ~{file_size:.1f} MB ---')
+
+                for read_path, threshold in READ_PATHS.items():
+                    with patch.object(codec, 'MMAP_THRESHOLD', threshold):
+                        load_time = best_time(lambda: load_file(file_path, codec_), args.repeat)
+                        peak = peak_memory(lambda: load_file(file_path, codec_))
+
+                    print(f'{read_path:<6} load: {load_time * 1000:>9.1f} ms | heap peak: {peak / 1024 / 1024:>8.1f} MB')
+
+            del document
+
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/bin/python3
+"""
+Compare the latency of loading a corrupted file (recovered from its backup) with and without checksum files
+
+Usage (from src/):
+    python3 -m benchmarks.bench_recovery [--size-mb 1 10] [--formats json yaml] [--repeat 3]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from file_access_protector import with_backupfile
+from file_access_protector.codec import get_codec
+from file_access_protector.with_backupfile import safe_dump, safe_load
+
+from .bench_serializers import make_document
+
+# tail of a torn file, the parse fails once it gets there (after parsing the rest)
+CORRUPTED_TAIL = b'\n]]} ::: {[\n'
+
+
+def corrupt(file_path: str, document, codec) -> None:
+    """
+    Tear file_path by a dump of document interrupted (ex. by a crash) right before its end
+    """
+
+    write_file = with_backupfile._write_file
+
+    def torn_write_file(path, payload, level):
+        if path != file_path:
+            return write_file(path, payload, level)
+
+        with open(path, 'wb') as f:
+            f.write(payload[:-len(CORRUPTED_TAIL)] + CORRUPTED_TAIL)
+        raise InterruptedError('dump interrupted')
+
+    # the same document is dumped again, not skipped as unchanged
+    with patch.object(with_backupfile, '_write_file', torn_write_file), \
+            patch.object(with_backupfile, 'SKIP_UNCHANGED', False):
+        try:
+            safe_dump(file_path, document, codec)
+        except InterruptedError:
+            pass
+
+
+def time_load(file_path: str, document, codec, corrupted: bool, repeat: int) -> float:
+    best = float('inf')
+
+    for _ in range(repeat):
+        if corrupted:
+            # restored by the previous load
+            corrupt(file_path, document, codec)
+
+        start = time.perf_counter()
+        with redirect_stdout(None):
+            safe_load(file_path)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--formats', nargs='+', default=['json', 'yaml'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench_recovery_')
+
+    try:
+        for size_mb in args.size_mb:
+            document = make_document(size_mb)
+
+            for file_format in args.formats:
+                file_path = f'{folder}/data.{file_format}'
+                print(f'--- {file_format} ~{size_mb} MB ---')
+
+                for checksum in (False, True):
+                    with patch.object(with_backupfile, 'CHECKSUM', checksum), \
+                            patch.object(with_backupfile, 'SLOW_CALL_THRESHOLD', float('inf')):
+                        codec = get_codec(file_format)
+                        safe_dump(file_path, document, codec)
+
+                        load_time = time_load(file_path, document, codec, False, args.repeat)
+                        recovery_time = time_load(file_path, document, codec, True, args.repeat)
+
+                    print(f'checksum: {str(checksum):<5} | load: {load_time * 1000:>9.1f} ms | '
+                          f'corrupted load (recovery): {recovery_time * 1000:>9.1f} ms')
+
+            del document
+
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
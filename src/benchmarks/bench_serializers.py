@@ -0,0 +1,62 @@
+#!/bin/python3
+"""
+Compare output size and dump/load speed of the installed json backends
+
+Usage (from src/):
+    python3 -m benchmarks.bench_serializers [--size-mb 1 5] [--repeat 5]
+"""
+
+import argparse
+import time
+
+from file_access_protector import serializers
+
+
+def make_document(size_mb: float) -> dict:
+    record = {
+        "servlet-name": "cofaxCDS",
+        "servlet-class": "org.cofax.cds.CDSServlet",
+        "init-param": {
+            "configGlossary:installationAt": "Philadelphia, PA",
+            "templatePath": "templates",
+            "useJSP": False,
+            "cachePackageTagsTrack": 200,
+            "ratio": 0.125,
+            "tags": ["a", "b", "c"],
+        },
+    }
+    record_size = len(serializers.dumps(record, 'json'))
+    count = max(1, int(size_mb * 1024 * 1024 / record_size))
+
+    return {"servlet": [dict(record, id=i) for i in range(count)]}
+
+
+def best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, nargs='+', default=[1, 5])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for size_mb in args.size_mb:
+        document = make_document(size_mb)
+        print(f'--- document ~{size_mb} MB ---')
+
+        for backend in serializers.available_backends():
+            payload = serializers.dumps(document, backend)
+            dump_time = best_time(lambda: serializers.dumps(document, backend), args.repeat)
+            load_time = best_time(lambda: serializers.loads(payload, backend), args.repeat)
+            print(f'{backend:<8} size: {len(payload) / 1024 / 1024:>7.2f} MB | dump: {dump_time * 1000:>8.1f} ms | load: {load_time * 1000:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/bin/python3
+"""
+Compare lock wait strategies under heavy contention (many processes, one file)
+
+Every process takes the exclusive lock, holds it briefly and releases it, over and over;
+the time to get the lock is measured. `fixed` is the former without_backupfile.file_lock
+polling (50 ms sleeps).
+
+Usage (from src/):
+    python3 -m benchmarks.bench_wait [--processes 32] [--iterations 50] [--hold-ms 0.2]
+"""
+
+import argparse
+import fcntl
+import multiprocessing
+import os
+import tempfile
+import time
+
+from file_access_protector.lock import WaitStrategy
+
+from .suite import percentile
+
+TIMEOUT = 60  # seconds, only latency is compared
+
+STRATEGIES = {
+    'fixed': WaitStrategy(TIMEOUT, spin_time=0, min_wait=0.05, max_wait=0.05, jitter=0),
+    'backoff': WaitStrategy(TIMEOUT, jitter=0),
+    'backoff+jitter': WaitStrategy(TIMEOUT),
+    'blocking': WaitStrategy(TIMEOUT, blocking=True),
+}
+
+
+def contend(file_path: str, strategy_name: str, iterations: int, hold_time: float, start_time: float) -> list:
+    strategy = STRATEGIES[strategy_name]
+    latencies = []
+
+    time.sleep(max(start_time - time.time(), 0))
+
+    for _ in range(iterations):
+        with open(file_path, 'r') as f:
+            wait_start_time = time.perf_counter()
+            strategy.acquire(f.fileno(), fcntl.LOCK_EX)
+            latencies.append(time.perf_counter() - wait_start_time)
+
+            hold_end_time = time.perf_counter() + hold_time
+            while time.perf_counter() < hold_end_time:
+                pass
+
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=32)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--hold-ms', type=float, default=0.2)
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES), choices=list(STRATEGIES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'bench.json')
+        with open(file_path, 'w') as f:
+            f.write('{}')
+
+        print(f'{args.processes} processes x {args.iterations} locks, held {args.hold_ms} ms')
+
+        for name in args.strategies:
+            with multiprocessing.get_context('fork').Pool(args.processes) as pool:
+                start_time = time.time() + 0.5
+                run_start_time = time.perf_counter()
+                outputs = pool.starmap(contend, [(file_path, name, args.iterations, args.hold_ms / 1000, start_time)
+                                                 for _ in range(args.processes)])
+                elapsed = time.perf_counter() - run_start_time - 0.5
+
+            latencies = sorted(latency for output in outputs for latency in output)
+            print(f'{name:<15} locks/s: {len(latencies) / elapsed:>8.0f} | p50: {percentile(latencies, 50) * 1000:>8.2f} ms '
+                  f'| p99: {percentile(latencies, 99) * 1000:>8.2f} ms | max: {latencies[-1] * 1000:>8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+#!/bin/python3
+"""
+Load/dump throughput and lock latency of with_backupfile and without_backupfile
+
+Every case runs read/write operations on one file for a fixed duration from
+processes x threads workers and reports ops/s and p50/p95/p99 latency. Results
+are saved as JSON and can be compared against a previous run to catch regressions.
+
+Usage (from src/):
+    python3 -m benchmarks.suite [--output results.json] [--compare baseline.json]
+    python3 -m benchmarks.suite --full  # 1 KB - 100 MB, up to 16 threads / 4 processes
+"""
+
+import argparse
+import fcntl
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from file_access_protector import with_backupfile, without_backupfile
+from file_access_protector.lock import open_locked, release
+
+from .bench_serializers import make_document
+
+# module -> (load(file_path), dump(file_path, data))
+MODULES = {
+    'with_backupfile': (with_backupfile.safe_load, with_backupfile.safe_dump),
+    'without_backupfile': (without_backupfile.read_file, without_backupfile.write_file),
+}
+
+QUICK_MATRIX = {
+    'sizes_kb': [1, 100, 1024],
+    'formats': ['json', 'yaml'],
+    'threads': [1, 4],
+    'processes': [1, 2],
+    'read_ratios': [1.0, 0.9, 0.0],
+    'caches': ['warm', 'cold'],
+}
+
+FULL_MATRIX = {
+    'sizes_kb': [1, 100, 1024, 10 * 1024, 100 * 1024],
+    'formats': ['json', 'yaml'],
+    'threads': [1, 4, 16],
+    'processes': [1, 4],
+    'read_ratios': [1.0, 0.9, 0.5, 0.0],
+    'caches': ['warm', 'cold'],
+}
+
+# yaml is ~20x slower to parse, larger files would only measure the parser
+MAX_YAML_SIZE_KB = 1024
+
+
+def drop_page_cache(file_path: str) -> None:
+    """
+    Evict file_path from the page cache so the next read goes to the disk
+    """
+
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+
+    try:
+        # dirty pages can not be dropped
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def lock_op(file_path: str, lock_type: int) -> None:
+    f = open_locked(file_path, with_backupfile.LOCK_TIMEOUT, lock_type)
+    release(f)
+
+
+def make_op(case: dict):
+    """
+    op(is_read) running one operation of the case
+    """
+
+    file_path = case['file_path']
+
+    if case['module'] == 'lock':
+        return lambda is_read: lock_op(file_path, fcntl.LOCK_SH if is_read else fcntl.LOCK_EX)
+
+    load, dump = MODULES[case['module']]
+
+    def op(is_read: bool):
+        if is_read:
+            load(file_path)
+        else:
+            dump(file_path, case['document'])
+
+    return op
+
+
+def run_threads(case: dict, seed: int) -> dict:
+    """
+    Run the case from case['threads'] threads of this process until its duration is over
+    """
+
+    op = make_op(case)
+    cold = case['cache'] == 'cold'
+    deadline = time.monotonic() + case['duration']
+    latencies = []
+    errors = []
+
+    def worker(index: int):
+        # deterministic read/write sequence per worker
+        state = seed * 1000 + index
+        thread_latencies = []
+
+        while time.monotonic() < deadline:
+            state = (state * 1103515245 + 12345) % 2 ** 31
+            is_read = state / 2 ** 31 < case['read_ratio']
+
+            if cold and is_read:
+                drop_page_cache(case['file_path'])
+
+            start = time.perf_counter()
+            try:
+                op(is_read)
+            except Exception as e:
+                errors.append(repr(e))
+                continue
+            thread_latencies.append(time.perf_counter() - start)
+
+        latencies.extend(thread_latencies)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(case['threads'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {'latencies': latencies, 'errors': errors}
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+def run_case(case: dict) -> dict:
+    try:
+        if case['processes'] == 1:
+            outputs = [run_threads(case, 0)]
+        else:
+            with multiprocessing.get_context('spawn').Pool(case['processes']) as pool:
+                outputs = pool.starmap(run_threads, [(case, seed) for seed in range(case['processes'])])
+    except Exception as e:
+        # recorded as a failed case, the next cases still run
+        outputs = [{'latencies': [], 'errors': [repr(e)]}]
+
+    latencies = sorted(latency for output in outputs for latency in output['latencies'])
+    errors = [error for output in outputs for error in output['errors']]
+
+    result = {key: value for key, value in case.items() if key not in ('file_path', 'document')}
+    result.update({
+        'ops': len(latencies),
+        'errors': len(errors),
+        'ops_per_sec': len(latencies) / case['duration'],
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    })
+    if errors:
+        result['first_error'] = errors[0]
+
+    return result
+
+
+def case_key(result: dict) -> tuple:
+    return (result['module'], result['format'], result['size_kb'], result['threads'],
+            result['processes'], result['read_ratio'], result['cache'])
+
+
+def iter_cases(matrix: dict, modules: list, duration: float, folder: str):
+    for size_kb in matrix['sizes_kb']:
+        document = make_document(size_kb / 1024)
+
+        for file_format in matrix['formats']:
+            if file_format == 'yaml' and size_kb > MAX_YAML_SIZE_KB:
+                continue
+
+            file_path = f'{folder}/bench_{size_kb}kb.{file_format}'
+            with_backupfile.safe_dump(file_path, document)
+
+            for module in modules:
+                # lock latency does not depend on the file content
+                if module == 'lock' and (size_kb != matrix['sizes_kb'][0] or file_format != matrix['formats'][0]):
+                    continue
+
+                for processes in matrix['processes']:
+                    for threads in matrix['threads']:
+                        for read_ratio in matrix['read_ratios']:
+                            for cache in matrix['caches']:
+                                if cache == 'cold' and (module == 'lock' or read_ratio == 0):
+                                    continue
+
+                                # dumped by the workers (not read back from the file they rewrite)
+                                yield {
+                                    'module': module, 'format': file_format, 'size_kb': size_kb,
+                                    'threads': threads, 'processes': processes, 'read_ratio': read_ratio,
+                                    'cache': cache, 'duration': duration, 'file_path': file_path,
+                                    'document': document,
+                                }
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    Cases whose ops/s dropped by more than tolerance (ratio) against the baseline results file
+    """
+
+    with open(baseline_path, 'r') as f:
+        baseline = {case_key(result): result for result in json.load(f)['results']}
+
+    regressions = []
+
+    for result in results:
+        base = baseline.get(case_key(result))
+        if base is None or base['ops_per_sec'] == 0:
+            continue
+
+        ratio = result['ops_per_sec'] / base['ops_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append({'case': case_key(result), 'ratio': ratio,
+                                'ops_per_sec': result['ops_per_sec'], 'baseline_ops_per_sec': base['ops_per_sec']})
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--full', action='store_true', help='full matrix (default: quick matrix)')
+    parser.add_argument('--modules', nargs='+', default=list(MODULES) + ['lock'],
+                        choices=list(MODULES) + ['lock'])
+    parser.add_argument('--sizes-kb', type=int, nargs='+')
+    parser.add_argument('--formats', nargs='+', choices=['json', 'yaml'])
+    parser.add_argument('--threads', type=int, nargs='+')
+    parser.add_argument('--processes', type=int, nargs='+')
+    parser.add_argument('--read-ratios', type=float, nargs='+', help='share of reads (1.0 read-only, 0.0 write-only)')
+    parser.add_argument('--caches', nargs='+', choices=['warm', 'cold'])
+    parser.add_argument('--duration', type=float, default=1.0, help='seconds per case')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='previous results file, exit 1 on regression')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed ops/s drop against --compare')
+    args = parser.parse_args()
+
+    matrix = dict(FULL_MATRIX if args.full else QUICK_MATRIX)
+    for key in matrix:
+        if getattr(args, key) is not None:
+            matrix[key] = getattr(args, key)
+
+    folder = tempfile.mkdtemp(prefix='bench_suite_')
+    results = []
+
+    try:
+        for case in iter_cases(matrix, args.modules, args.duration, folder):
+            result = run_case(case)
+            results.append(result)
+            print(f"{result['module']:<18} {result['format']:<4} {result['size_kb']:>7}KB "
+                  f"p{result['processes']}xt{result['threads']:<3} read {result['read_ratio']:.0%} {result['cache']:<4} "
+                  f"| ops/s: {result['ops_per_sec']:>9.1f} | p50: {result['p50_ms']:>8.2f}ms "
+                  f"| p95: {result['p95_ms']:>8.2f}ms | p99: {result['p99_ms']:>8.2f}ms | errors: {result['errors']}")
+    finally:
+        shutil.rmtree(folder)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'meta': {
+                'time': time.time(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'matrix': matrix,
+                'duration': args.duration,
+            },
+            'results': results,
+        }, f, indent=4)
+    print(f'results saved to [{args.output}]')
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"!! regression {regression['case']}: {regression['ops_per_sec']:.1f} ops/s "
+                  f"vs {regression['baseline_ops_per_sec']:.1f} ({regression['ratio']:.0%})")
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Thread/process-safe json/yaml file loader/dumper with automatic file backup
+
+    import file_access_protector as fap
+
+    data = fap.json_safe_load('/path/to/file.json')
+
+Submodules and their dependencies are imported on first use of a name, so importing the
+package costs nothing until a function is called (see tests/test_import_time.py).
+"""
+
+import importlib
+
+# public name -> submodule defining it
+_EXPORTS = {
+    'safe_load': 'with_backupfile',
+    'safe_dump': 'with_backupfile',
+    'json_safe_load': 'with_backupfile',
+    'json_safe_dump': 'with_backupfile',
+    'yaml_safe_load': 'with_backupfile',
+    'yaml_safe_dump': 'with_backupfile',
+    'locked_update': 'with_backupfile',
+    'journal_update': 'with_backupfile',
+    'iter_load': 'with_backupfile',
+    'get_backup_file_path': 'with_backupfile',
+    'read_file': 'without_backupfile',
+    'write_file': 'without_backupfile',
+    'read_json': 'without_backupfile',
+    'write_json': 'without_backupfile',
+    'read_yaml': 'without_backupfile',
+    'write_yaml': 'without_backupfile',
+    'Codec': 'codec',
+    'get_codec': 'codec',
+    'register_codec': 'codec',
+    'LoadCache': 'cache',
+    'CoalescingWriter': 'writer',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,206 @@
+import asyncio
+import fcntl
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+
+from . import with_backupfile, without_backupfile
+from .lock import open_locked_async, release
+
+MAX_IO_WORKERS = 4  # threads parsing/writing files for the async API
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Bounded executor running the blocking file I/O of the async API (created on first use)
+    """
+
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_IO_WORKERS, thread_name_prefix='file_access_protector')
+
+    return _executor
+
+
+async def _run_locked(f, fn, *args):
+    """
+    Run fn(*args) in the executor and release the lock on f once it is done
+
+    If the caller is cancelled, fn is not interrupted mid-write: the lock is released when
+    the executor finishes it (or right away if it had not started yet).
+    """
+
+    def release_lock(_):
+        if f is not None:
+            release(f)
+
+    try:
+        future = get_executor().submit(fn, *args)
+    except BaseException:
+        release_lock(None)
+        raise
+
+    future.add_done_callback(release_lock)
+
+    return await asyncio.wrap_future(future)
+
+
+async def _safe_call(load: bool, check_json: bool, fn, args: tuple, timeout: float):
+    with_backupfile._check_args(load, check_json, args)
+
+    if timeout is None:
+        timeout = with_backupfile.LOCK_TIMEOUT
+
+    f = await open_locked_async(args[0], timeout, fcntl.LOCK_SH if load is True else fcntl.LOCK_EX)
+
+    return await _run_locked(
+        f, with_backupfile.call_locked, fn.__wrapped__, f, timeout, *args)
+
+
+async def safe_load(file_path: str, codec=None, timeout: float = None) -> Union[list, dict]:
+    """
+    Async with_backupfile.safe_load: waits for the lock on the event loop, parses in the executor
+
+    Args:
+        file_path (str): must be absolute path to the file
+        codec (Union[Codec, str], optional): codec or its name (default: by file extension)
+        timeout (float, optional): seconds to wait for the file lock (default: with_backupfile.LOCK_TIMEOUT)
+    """
+
+    return await _safe_call(True, False, with_backupfile.safe_load, (file_path, codec), timeout)
+
+
+async def safe_dump(file_path: str, data: Union[list, dict], codec=None, timeout: float = None) -> None:
+    """
+    Async with_backupfile.safe_dump: waits for the lock on the event loop, writes in the executor
+
+    Args:
+        file_path (str): must be absolute path to the file
+        data (Union[list, dict]): data to dump
+        codec (Union[Codec, str], optional): codec or its name (default: by file extension)
+        timeout (float, optional): seconds to wait for the file lock (default: with_backupfile.LOCK_TIMEOUT)
+    """
+
+    await _safe_call(False, False, with_backupfile.safe_dump, (file_path, data, codec), timeout)
+
+
+async def json_safe_load(file_path: str, timeout: float = None) -> Union[list, dict]:
+    """
+    Async with_backupfile.json_safe_load: waits for the lock on the event loop, parses in the executor
+
+    Args:
+        file_path (str): must be absolute path to the json file
+        timeout (float, optional): seconds to wait for the file lock (default: with_backupfile.LOCK_TIMEOUT)
+    """
+
+    return await _safe_call(True, True, with_backupfile.json_safe_load, (file_path,), timeout)
+
+
+async def json_safe_dump(file_path: str, data: Union[list, dict], timeout: float = None) -> None:
+    """
+    Async with_backupfile.json_safe_dump: waits for the lock on the event loop, writes in the executor
+
+    Args:
+        file_path (str): must be absolute path to the json file
+        data (Union[list, dict]): data to dump
+        timeout (float, optional): seconds to wait for the file lock (default: with_backupfile.LOCK_TIMEOUT)
+    """
+
+    await _safe_call(False, True, with_backupfile.json_safe_dump, (file_path, data), timeout)
+
+
+async def yaml_safe_load(file_path: str, timeout: float = None) -> Union[list, dict]:
+    """
+    Async with_backupfile.yaml_safe_load: waits for the lock on the event loop, parses in the executor
+
+    Args:
+        file_path (str): must be absolute path to the yaml file
+        timeout (float, optional): seconds to wait for the file lock (default: with_backupfile.LOCK_TIMEOUT)
+    """
+
+    return await _safe_call(True, False, with_backupfile.yaml_safe_load, (file_path,), timeout)
+
+
+async def yaml_safe_dump(file_path: str, data: Union[list, dict], timeout: float = None) -> None:
+    """
+    Async with_backupfile.yaml_safe_dump: waits for the lock on the event loop, writes in the executor
+
+    Args:
+        file_path (str): must be absolute path to the yaml file
+        data (Union[list, dict]): data to dump
+        timeout (float, optional): seconds to wait for the file lock (default: with_backupfile.LOCK_TIMEOUT)
+    """
+
+    await _safe_call(False, False, with_backupfile.yaml_safe_dump, (file_path, data), timeout)
+
+
+def _call_and_report(fn, *args):
+    # errors are reported and swallowed, same as without_backupfile.file_lock
+    try:
+        return fn(*args)
+    except Exception as e:
+        print(f'!! Error in file lock func: {e}')
+
+
+async def _file_lock_call(lock_type: int, fn, args: tuple, timeout: float):
+    wait = without_backupfile.LOCK_WAIT
+    if timeout is None:
+        timeout = wait.timeout
+
+    try:
+        f = await open_locked_async(args[0], timeout, lock_type, 'a+' if lock_type == fcntl.LOCK_EX else 'r', wait)
+    except TimeoutError:
+        raise RuntimeError(f"Failed to get lock of file [{args[0]}]")
+
+    return await _run_locked(f, _call_and_report, fn.__wrapped__, *args)
+
+
+async def read_file(file_path: str, codec=None, timeout: float = None):
+    """
+    Async without_backupfile.read_file (timeout default: without_backupfile.LOCK_WAIT.timeout)
+    """
+
+    return await _file_lock_call(fcntl.LOCK_SH, without_backupfile.read_file, (file_path, codec), timeout)
+
+
+async def write_file(file_path: str, write_obj, codec=None, timeout: float = None) -> None:
+    """
+    Async without_backupfile.write_file (timeout default: without_backupfile.LOCK_WAIT.timeout)
+    """
+
+    await _file_lock_call(fcntl.LOCK_EX, without_backupfile.write_file, (file_path, write_obj, codec), timeout)
+
+
+async def read_json(file_path: str, timeout: float = None):
+    """
+    Async without_backupfile.read_json (timeout default: without_backupfile.LOCK_WAIT.timeout)
+    """
+
+    return await _file_lock_call(fcntl.LOCK_SH, without_backupfile.read_json, (file_path,), timeout)
+
+
+async def write_json(file_path: str, write_obj, timeout: float = None) -> None:
+    """
+    Async without_backupfile.write_json (timeout default: without_backupfile.LOCK_WAIT.timeout)
+    """
+
+    await _file_lock_call(fcntl.LOCK_EX, without_backupfile.write_json, (file_path, write_obj), timeout)
+
+
+async def read_yaml(file_path: str, timeout: float = None):
+    """
+    Async without_backupfile.read_yaml (timeout default: without_backupfile.LOCK_WAIT.timeout)
+    """
+
+    return await _file_lock_call(fcntl.LOCK_SH, without_backupfile.read_yaml, (file_path,), timeout)
+
+
+async def write_yaml(file_path: str, write_obj, timeout: float = None) -> None:
+    """
+    Async without_backupfile.write_yaml (timeout default: without_backupfile.LOCK_WAIT.timeout)
+    """
+
+    await _file_lock_call(fcntl.LOCK_EX, without_backupfile.write_yaml, (file_path, write_obj), timeout)
@@ -0,0 +1,202 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+
+# sentinel returned by LoadCache.get on a miss (None is valid file content for read_yaml)
+MISS = object()
+
+CACHE_MODES = ('copy', 'frozen', 'shared')
+
+# file mtimes come from a coarse kernel clock (one tick is up to 10 ms): a file rewritten in
+# the tick it was cached (or dumped) in keeps the stat it had, so an entry is only trusted once
+# it was recorded this long after the file mtime
+MTIME_GRANULARITY_NS = 50_000_000
+
+
+class FrozenDict(Mapping):
+    """
+    Read-only view of a cached dict, nested containers are frozen lazily on access
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: dict):
+        self._data = data
+
+    def __getitem__(self, key):
+        return freeze(self._data[key])
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __repr__(self):
+        return f'FrozenDict({self._data!r})'
+
+
+class FrozenList(Sequence):
+    """
+    Read-only view of a cached list, nested containers are frozen lazily on access
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: list):
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FrozenList(self._data[index])
+        return freeze(self._data[index])
+
+    def __len__(self):
+        return len(self._data)
+
+    def __eq__(self, other):
+        return list(self) == other
+
+    def __repr__(self):
+        return f'FrozenList({self._data!r})'
+
+
+def freeze(obj):
+    if isinstance(obj, dict):
+        return FrozenDict(obj)
+    if isinstance(obj, list):
+        return FrozenList(obj)
+    return obj
+
+
+def stat_key(file_stat: os.stat_result) -> tuple:
+    return (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+
+
+class LoadCache:
+    """
+    LRU cache of parsed file content, validated by the file stat
+
+    An entry is only returned while (st_dev, st_ino, st_size, st_mtime_ns) of the file still
+    match the stat it was parsed from, and once it was recorded MTIME_GRANULARITY_NS after the
+    file mtime (before that, the file is parsed again). Size is estimated by the file size on disk.
+
+    Copies are unpickled from a pickled content kept in the entry, several times faster than
+    copy.deepcopy. Content put in 'copy' mode is only kept pickled: it is returned as is, the
+    caller's object is not shared with the cache.
+
+    Args:
+        max_entries (int): max number of cached files
+        max_bytes (int): max total size (estimated) of cached files
+        mode (str): how a hit is returned by default
+            'copy': private copy (safe to modify), 'frozen': read-only view, 'shared': the cached object itself
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 64 * 1024 * 1024, mode: str = 'copy'):
+        if mode not in CACHE_MODES:
+            raise AttributeError(f'Cache mode must be one of {CACHE_MODES} ({mode})!')
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+        # path -> [stat key, content, size, recorded at (ns), pickled content], content or pickled
+        # content is MISS until a hit needs it
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, file_path: str, file_stat: os.stat_result, mode: str = None):
+        """
+        Return the cached content of file_path (per mode), or MISS if absent or stale
+        """
+
+        mode = self._check_mode(mode)
+        key = os.path.abspath(file_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] != stat_key(file_stat) \
+                    or file_stat.st_mtime_ns >= entry[3] - MTIME_GRANULARITY_NS:
+                self.misses += 1
+                return MISS
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            if mode == 'copy':
+                if entry[4] is MISS:
+                    entry[4] = pickle.dumps(entry[1], pickle.HIGHEST_PROTOCOL)
+                pickled = entry[4]
+            elif entry[1] is MISS:
+                entry[1] = pickle.loads(entry[4])
+
+        if mode == 'copy':
+            return pickle.loads(pickled)
+
+        return freeze(entry[1]) if mode == 'frozen' else entry[1]
+
+    def put(self, file_path: str, file_stat: os.stat_result, content, mode: str = None):
+        """
+        Cache content parsed from file_path at file_stat, return it as the caller should see it (per mode)
+        """
+
+        mode = self._check_mode(mode)
+        key = os.path.abspath(file_path)
+        size = file_stat.st_size
+        recorded_at = time.time_ns()
+
+        if size <= self.max_bytes:
+            if mode == 'copy':
+                entry = [stat_key(file_stat), MISS, size, recorded_at, pickle.dumps(content, pickle.HIGHEST_PROTOCOL)]
+            else:
+                entry = [stat_key(file_stat), content, size, recorded_at, MISS]
+
+        with self._lock:
+            self._pop(key)
+
+            if size <= self.max_bytes:
+                self._entries[key] = entry
+                self._total_bytes += size
+
+                while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                    self._pop(next(iter(self._entries)))
+
+        return freeze(content) if mode == 'frozen' else content
+
+    def invalidate(self, file_path: str) -> None:
+        with self._lock:
+            self._pop(os.path.abspath(file_path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def _check_mode(self, mode: str) -> str:
+        mode = mode or self.mode
+        if mode not in CACHE_MODES:
+            raise AttributeError(f'Cache mode must be one of {CACHE_MODES} ({mode})!')
+
+        return mode
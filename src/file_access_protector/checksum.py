@@ -0,0 +1,110 @@
+import os
+import zlib
+
+from .descriptors import pread_all
+
+CHECKSUM_EXT = ".checksum"
+PENDING = "pending"
+
+# bytes hashed per read, bounds the memory of verifying a large file
+CHUNK_SIZE = 1024 * 1024
+
+
+def get_checksum_file_path(file_path: str) -> str:
+    """
+    Checksum file path of file_path (ex. /path/to/file.json -> /path/to/file.json.checksum)
+    """
+
+    return file_path + CHECKSUM_EXT
+
+
+def format_record(payload: bytes, generation: int, pending: bool = False) -> bytes:
+    """
+    Content of the checksum file of a file holding payload: "<generation> <size> <crc32>",
+    followed by "pending" while payload is being written in place (see is_pending)
+    """
+
+    return f'{generation} {len(payload)} {zlib.crc32(payload):08x}{" " + PENDING if pending else ""}\n'.encode()
+
+
+def read_record(file_path: str) -> tuple:
+    """
+    (generation, size, crc32) of the checksum file of file_path, None if it is missing or torn
+    """
+
+    try:
+        with open(get_checksum_file_path(file_path), 'rb') as f:
+            fields = f.read(64).split()
+
+        generation, size, crc = int(fields[0]), int(fields[1]), int(fields[2], 16)
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return generation, size, crc
+
+
+def get_generation(file_path: str) -> int:
+    """
+    Generation of the last dump of file_path (0 if unknown)
+    """
+
+    record = read_record(file_path)
+
+    return 0 if record is None else record[0]
+
+
+def is_pending(file_path: str) -> bool:
+    """
+    Whether the checksum file of file_path was written ahead of an in-place write not known to be done
+
+    Dumps rewriting a file in place write its pending record first and mark it done after: a file
+    failing a pending record was torn by the interrupted write, while a file failing a done one was
+    modified since (ex. edited by hand or by another tool) and may well hold valid content.
+    """
+
+    try:
+        with open(get_checksum_file_path(file_path), 'rb') as f:
+            fields = f.read(64).split()
+    except OSError:
+        return False
+
+    return fields[3:4] == [PENDING.encode()]
+
+
+def verify(file_path: str, fd: int = None) -> bool:
+    """
+    Whether file_path matches its checksum file (size and crc32), without parsing it
+
+    Returns None if there is no (intact) checksum file to verify against, ex. a file dumped
+    before checksums were written, or by a crash while the checksum file was written.
+
+    Args:
+        file_path (str): file to verify (locked by the caller)
+        fd (int, optional): locked descriptor of file_path, read with pread instead of reopening the file
+    """
+
+    record = read_record(file_path)
+    if record is None:
+        return None
+
+    _, size, crc = record
+
+    opened = fd is None
+    if opened:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+
+    try:
+        if os.fstat(fd).st_size != size:
+            return False
+
+        crc_so_far = 0
+        for offset in range(0, size, CHUNK_SIZE):
+            crc_so_far = zlib.crc32(pread_all(fd, CHUNK_SIZE, offset), crc_so_far)
+    finally:
+        if opened:
+            os.close(fd)
+
+    return crc_so_far == crc
@@ -0,0 +1,205 @@
+import importlib.util
+import mmap
+import os
+import time
+from typing import Callable, Tuple
+
+from . import metrics, serializers
+from .descriptors import pread_all
+
+# yaml, pickle, msgpack and cbor2 are imported on the first call of their codec:
+# processes only touching json files do not pay their import time
+
+
+class Codec:
+    """
+    How a file format is serialized, every codec gets the same locking and backup engine
+
+    Args:
+        name (str): codec name (ex. 'json'), used in messages and to choose it explicitly
+        extensions (Tuple[str]): file extensions (with dot, lower case) selecting this codec
+        dumps (Callable): dumps(obj) -> bytes
+        loads (Callable): loads(bytes) -> obj
+        loads_mapped (Callable, optional): loads_mapped(mmap.mmap) -> obj, parses a large file
+            straight from its mapping (default: None, always read into bytes)
+    """
+
+    # plain class rather than a dataclass: importing dataclasses (and inspect) is slow
+    def __init__(self, name: str, extensions: Tuple[str, ...], dumps: Callable, loads: Callable,
+                 loads_mapped: Callable = None):
+        self.name = name
+        self.extensions = extensions
+        self.dumps = dumps
+        self.loads = loads
+        self.loads_mapped = loads_mapped
+
+    def __repr__(self) -> str:
+        return f'Codec(name={self.name!r}, extensions={self.extensions!r})'
+
+
+# files at least this large are parsed from an mmap instead of a bytes copy (None: never)
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def _yaml_dumps(obj) -> bytes:
+    import yaml
+
+    # libyaml C dumper when pyyaml is built with it
+    return yaml.dump(obj, Dumper=getattr(yaml, 'CDumper', yaml.Dumper), sort_keys=False, indent=4).encode()
+
+
+def _yaml_loads(data: bytes):
+    import yaml
+
+    return yaml.load(data, Loader=getattr(yaml, 'CFullLoader', yaml.FullLoader))
+
+
+def _pickle_dumps(obj) -> bytes:
+    import pickle
+
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _pickle_loads(data: bytes):
+    import pickle
+
+    return pickle.loads(data)
+
+
+def _view_loads(loads: Callable) -> Callable:
+    """
+    loads_mapped of a codec whose loads accepts any bytes-like object
+    """
+
+    def loads_mapped(mm: mmap.mmap):
+        with memoryview(mm) as view:
+            return loads(view)
+
+    return loads_mapped
+
+
+JSON = Codec('json', ('.json',), serializers.dumps, serializers.loads, _view_loads(serializers.loads_buffer))
+# the yaml reader pulls the mapping in chunks like a file
+YAML = Codec('yaml', ('.yaml', '.yml'), _yaml_dumps, _yaml_loads, _yaml_loads)
+# only load pickle files you trust, unpickling can run arbitrary code
+PICKLE = Codec('pickle', ('.pickle', '.pkl'), _pickle_dumps, _pickle_loads, _view_loads(_pickle_loads))
+
+CODECS = {}
+
+
+def register_codec(codec: Codec) -> None:
+    """
+    Add (or replace) a codec, its extensions take precedence over the ones registered before
+    """
+
+    CODECS[codec.name] = codec
+
+
+def get_codec(codec=None, file_path: str = None) -> Codec:
+    """
+    Resolve the codec of a call: explicit codec (Codec or name) first, else by file extension
+
+    Args:
+        codec (Union[Codec, str], optional): codec or registered codec name
+        file_path (str, optional): file whose extension selects the codec
+    """
+
+    if isinstance(codec, Codec):
+        return codec
+
+    if codec is not None:
+        if codec not in CODECS:
+            raise AttributeError(f'Codec [{codec}] is not registered (registered: {list(CODECS)})')
+        return CODECS[codec]
+
+    extension = os.path.splitext(file_path)[1].lower()
+    for registered in reversed(list(CODECS.values())):
+        if extension in registered.extensions:
+            return registered
+
+    raise AttributeError(
+        f'No codec registered for file [{os.path.basename(file_path)}] (registered: {list(CODECS)})')
+
+
+def load_file(file_path: str, codec: Codec, fd: int = None):
+    """
+    Parse file_path with codec, from an mmap if it is at least MMAP_THRESHOLD bytes
+
+    The caller must hold the file lock: a mapped file truncated by another writer
+    while it is parsed would crash the process (SIGBUS).
+
+    Args:
+        fd (int, optional): locked descriptor of file_path, read with pread instead of reopening the file
+    """
+
+    if fd is None:
+        with open(file_path, 'rb') as f:
+            return _load_fd(f.fileno(), codec)
+
+    return _load_fd(fd, codec)
+
+
+def _load_fd(fd: int, codec: Codec):
+    size = os.fstat(fd).st_size
+    parse_start_time = time.perf_counter()
+
+    if codec.loads_mapped is None or MMAP_THRESHOLD is None or size == 0 or size < MMAP_THRESHOLD:
+        content = codec.loads(pread_all(fd, size))
+
+    else:
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            content = codec.loads_mapped(mm)
+
+    if metrics.enabled:
+        metrics.observe('parse_seconds', time.perf_counter() - parse_start_time, codec=codec.name)
+        metrics.increment('read_bytes_total', size, codec=codec.name)
+
+    return content
+
+
+def serialize(codec: Codec, obj, dumps: Callable = None) -> bytes:
+    """
+    Serialize obj with codec.dumps (or dumps, ex. a specific json backend), timed if metrics are enabled
+    """
+
+    if dumps is None:
+        dumps = codec.dumps
+
+    if not metrics.enabled:
+        return dumps(obj)
+
+    serialize_start_time = time.perf_counter()
+    payload = dumps(obj)
+    metrics.observe('serialize_seconds', time.perf_counter() - serialize_start_time, codec=codec.name)
+
+    return payload
+
+
+for _codec in (JSON, YAML, PICKLE):
+    register_codec(_codec)
+
+if importlib.util.find_spec('msgpack') is not None:
+    def _msgpack_dumps(obj) -> bytes:
+        import msgpack
+
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def _msgpack_loads(data):
+        import msgpack
+
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    register_codec(Codec('msgpack', ('.msgpack', '.mpk'), _msgpack_dumps, _msgpack_loads, _view_loads(_msgpack_loads)))
+
+if importlib.util.find_spec('cbor2') is not None:
+    def _cbor_dumps(obj) -> bytes:
+        import cbor2
+
+        return cbor2.dumps(obj)
+
+    def _cbor_loads(data: bytes):
+        import cbor2
+
+        return cbor2.loads(data)
+
+    register_codec(Codec('cbor', ('.cbor',), _cbor_dumps, _cbor_loads))
@@ -0,0 +1,240 @@
+import errno
+import fcntl
+import os
+import threading
+from collections import OrderedDict
+
+# paths whose idle descriptors are kept open (least recently used first out), 0 disables reuse
+MAX_PATHS = 64
+# idle descriptors kept per path (one per thread locking it at the same time)
+MAX_IDLE_PER_PATH = 4
+
+# ioctl cloning a whole file by sharing its extents (reflink: btrfs, XFS, ...), Linux only
+FICLONE = getattr(fcntl, 'FICLONE', 0x40049409)
+# bytes per read/write when the kernel can not copy a file by itself
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# file path -> unlocked descriptors of it, not used by any thread
+_idle = OrderedDict()
+_idle_lock = threading.Lock()
+
+
+class LockedFile:
+    """
+    Descriptor of file_path checked out of the per-process pool
+
+    flock() locks belong to the open file description, so a checked out descriptor is never
+    handed to another checkout: it is given back (close()) unlocked, the threads sharing its
+    lock do so through lock.open_locked. read() reads from its own offset with pread, the descriptor offset is never moved.
+    lock_file is the LockedFile of the sidecar lock file holding the lock of this one, when
+    locks are kept apart from the files (lock.LOCK_MANAGER).
+    """
+
+    __slots__ = ('fd', 'name', 'lock_file', '_offset', '__weakref__')
+
+    def __init__(self, fd: int, file_path: str, lock_file: 'LockedFile' = None):
+        self.fd = fd
+        self.name = file_path
+        self.lock_file = lock_file
+        self._offset = 0
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = max(os.fstat(self.fd).st_size - self._offset, 0)
+
+        data = pread_all(self.fd, size, self._offset)
+        self._offset += len(data)
+
+        return data
+
+    def seek(self, offset: int) -> int:
+        self._offset = offset
+
+        return offset
+
+    def close(self) -> None:
+        """
+        Give the (unlocked) descriptor back to the pool
+        """
+
+        if self.fd is not None:
+            checkin(self.name, self.fd)
+            self.fd = None
+
+    def discard(self) -> None:
+        """
+        Close the descriptor (stale inode, or a lock may still be pending on it)
+        """
+
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _open(file_path: str, create: bool) -> int:
+    try:
+        return os.open(file_path, os.O_RDWR | (os.O_CREAT if create else 0), 0o666)
+    except OSError as e:
+        if e.errno != errno.EACCES and e.errno != errno.EROFS:
+            raise
+
+    # read-only file (or file system), writing through it fails later
+    return os.open(file_path, os.O_RDONLY)
+
+
+def checkout(file_path: str, create: bool = False) -> LockedFile:
+    """
+    Idle descriptor of file_path (opened if none), None if file_path does not exist (and not create)
+
+    A pooled descriptor may point to a replaced or removed inode: callers compare it with the
+    path once locked (lock.open_locked) and discard() it if it is stale.
+    Other errors (ex. a missing directory when creating, no permission) are raised.
+
+    Args:
+        file_path (str): file to open
+        create (bool): create a missing file instead of returning None
+    """
+
+    with _idle_lock:
+        fds = _idle.get(file_path)
+        fd = fds.pop() if fds else None
+
+    if fd is None:
+        try:
+            fd = _open(file_path, create)
+        except FileNotFoundError:
+            if create:
+                # its directory does not exist
+                raise
+
+            return None
+
+    return LockedFile(fd, file_path)
+
+
+def checkin(file_path: str, fd: int) -> None:
+    """
+    Keep the unlocked fd of file_path for a later checkout, or close it past the pool bounds
+    """
+
+    closed = []
+
+    with _idle_lock:
+        fds = _idle.setdefault(file_path, [])
+        if len(fds) < MAX_IDLE_PER_PATH:
+            fds.append(fd)
+        else:
+            closed.append(fd)
+
+        _idle.move_to_end(file_path)
+        while len(_idle) > MAX_PATHS:
+            closed.extend(_idle.popitem(last=False)[1])
+
+    for fd in closed:
+        os.close(fd)
+
+
+def clear() -> None:
+    """
+    Close every idle descriptor (ex. to release the inode of a removed file right away)
+    """
+
+    with _idle_lock:
+        closed = [fd for fds in _idle.values() for fd in fds]
+        _idle.clear()
+
+    for fd in closed:
+        os.close(fd)
+
+
+def _reset_after_fork() -> None:
+    # inherited descriptors share the open file description (and so the flock) with the
+    # parent, the child must open its own
+    global _idle_lock
+
+    _idle_lock = threading.Lock()
+    clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def pread_all(fd: int, size: int, offset: int = 0) -> bytes:
+    """
+    Read size bytes of fd from offset (fewer at the end of the file) without moving its offset
+    """
+
+    chunks = []
+
+    while size > 0:
+        chunk = os.pread(fd, size, offset)
+        if not chunk:
+            break
+
+        chunks.append(chunk)
+        size -= len(chunk)
+        offset += len(chunk)
+
+    return b''.join(chunks)
+
+
+def rewrite(fd: int, payload: bytes) -> None:
+    """
+    Replace the content of fd with payload in place (same as opening it with 'wb')
+    """
+
+    os.ftruncate(fd, 0)
+
+    offset = 0
+    while offset < len(payload):
+        offset += os.pwrite(fd, payload[offset:] if offset else payload, offset)
+
+
+def copy_fd(src_fd: int, dst_fd: int) -> None:
+    """
+    Replace the content of dst_fd with the content of src_fd, in the kernel when possible
+
+    The file system clones the file (FICLONE) when it supports reflinks, otherwise
+    copy_file_range copies it without a round trip through user space; a pread/pwrite loop
+    is the last resort. Neither descriptor offset is moved.
+    """
+
+    os.ftruncate(dst_fd, 0)
+
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return
+    except OSError:
+        # no reflink support (file system, across file systems or not Linux)
+        pass
+
+    size = os.fstat(src_fd).st_size
+    offset = 0
+
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(src_fd, dst_fd, size - offset, offset, offset)
+                if not copied:
+                    return
+
+                offset += copied
+
+            return
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                raise
+
+    while offset < size:
+        chunk = pread_all(src_fd, min(COPY_CHUNK_SIZE, size - offset), offset)
+        if not chunk:
+            break
+
+        written = 0
+        while written < len(chunk):
+            written += os.pwrite(dst_fd, chunk[written:] if written else chunk, offset + written)
+
+        offset += len(chunk)
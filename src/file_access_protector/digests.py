@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .cache import MTIME_GRANULARITY_NS, stat_key
+from .descriptors import pread_all
+
+# paths whose last dump is remembered (least recently dumped first out)
+MAX_PATHS = 1024
+
+# file path -> (stat key of the file, stat key of its backup file, payload digest, recorded at (ns))
+_dumped = OrderedDict()
+_dumped_lock = threading.Lock()
+
+
+def digest(payload: bytes) -> bytes:
+    # hashlib is only needed once a file is dumped
+    import hashlib
+
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def remember(file_path: str, file_stat: os.stat_result, backup_stat: os.stat_result, payload_digest: bytes) -> None:
+    """
+    Record that file_path (and its backup file) now hold the payload of payload_digest
+
+    file_stat and backup_stat are the stats of the files written with it, taken by the writer
+    (ex. of a temp file before it is renamed over file_path): the paths may meanwhile name files
+    written by another process.
+    """
+
+    entry = (stat_key(file_stat), stat_key(backup_stat), payload_digest, time.time_ns())
+
+    with _dumped_lock:
+        _dumped[file_path] = entry
+        _dumped.move_to_end(file_path)
+
+        while len(_dumped) > MAX_PATHS:
+            _dumped.popitem(last=False)
+
+
+def forget(file_path: str) -> None:
+    with _dumped_lock:
+        _dumped.pop(file_path, None)
+
+
+def clear() -> None:
+    with _dumped_lock:
+        _dumped.clear()
+
+
+def is_unchanged(file_path: str, backup_file_path: str, payload_digest: bytes, fd: int = None) -> bool:
+    """
+    Whether file_path already holds the payload of payload_digest, as dumped by this process
+
+    Both files must still have the stat recorded by remember(). A file modified less than
+    MTIME_GRANULARITY_NS before it was recorded is read (through fd if given) and hashed.
+
+    Args:
+        file_path (str): file about to be dumped (locked by the caller)
+        backup_file_path (str): its backup file
+        payload_digest (bytes): digest() of the payload to dump
+        fd (int, optional): locked descriptor of file_path
+    """
+
+    with _dumped_lock:
+        entry = _dumped.get(file_path)
+
+    if entry is None or entry[2] != payload_digest:
+        return False
+
+    try:
+        file_stat = os.stat(file_path)
+        backup_stat = os.stat(backup_file_path)
+    except FileNotFoundError:
+        return False
+
+    if (stat_key(file_stat), stat_key(backup_stat)) != entry[:2]:
+        return False
+
+    if file_stat.st_mtime_ns < entry[3] - MTIME_GRANULARITY_NS:
+        return True
+
+    # may have been rewritten in the same mtime tick, compare the content
+    if fd is None:
+        with open(file_path, 'rb') as f:
+            content = f.read()
+    else:
+        content = pread_all(fd, file_stat.st_size)
+
+    if digest(content) != payload_digest:
+        return False
+
+    # any later rewrite gets a newer mtime, the entry can be trusted from now on
+    remember(file_path, file_stat, backup_stat, payload_digest)
+
+    return True
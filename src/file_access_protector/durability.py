@@ -0,0 +1,43 @@
+import os
+
+# How far a dump is flushed to the disk before it returns:
+#   NONE: left to the page cache, a power loss may lose or tear the last dumps
+#   DATA: written files are fdatasync'ed before they are copied, renamed over or relied on
+#   FULL: written files are fsync'ed, and their directory after a file is created or renamed,
+#         so the new name also survives a power loss
+NONE = 'none'
+DATA = 'data'
+FULL = 'full'
+
+LEVELS = (NONE, DATA, FULL)
+
+
+def check(level: str) -> str:
+    if level not in LEVELS:
+        raise AttributeError(f'Durability must be one of {list(LEVELS)} ({level})')
+
+    return level
+
+
+def sync_file(fd: int, level: str) -> None:
+    """
+    Flush the written data of fd as level requires
+    """
+
+    if level == DATA:
+        os.fdatasync(fd)
+    elif level == FULL:
+        os.fsync(fd)
+
+
+def sync_dir(file_path: str, level: str) -> None:
+    """
+    Flush the directory entries of the directory of file_path (FULL only)
+    """
+
+    if level == FULL:
+        fd = os.open(os.path.dirname(file_path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,147 @@
+import os
+import threading
+
+from . import checksum
+
+GENERATION_INFIX = ".gen-"
+
+# prunes run in one background thread, created on first use
+_executor = None
+# file paths with a prune queued
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def get_generation_file_path(file_path: str, generation: int) -> str:
+    """
+    Generation file path of file_path (ex. /path/to/file.json, 3 -> /path/to/file.gen-3.json)
+    """
+
+    stem, ext = os.path.splitext(file_path)
+
+    return f'{stem}{GENERATION_INFIX}{generation}{ext}'
+
+
+def list_generations(file_path: str) -> list:
+    """
+    (generation, generation file path) of the generation files of file_path, newest first
+    """
+
+    stem, ext = os.path.splitext(os.path.basename(file_path))
+    prefix = f'{stem}{GENERATION_INFIX}'
+    directory = os.path.dirname(file_path)
+
+    found = []
+
+    with os.scandir(directory or '.') as entries:
+        for entry in entries:
+            name = entry.name
+
+            if name.startswith(prefix) and name.endswith(ext):
+                number = name[len(prefix):len(name) - len(ext)]
+                if number.isdigit():
+                    found.append((int(number), os.path.join(directory, name)))
+
+    return sorted(found, reverse=True)
+
+
+def next_generation(file_path: str) -> int:
+    """
+    Number of the next generation of file_path
+    """
+
+    generation = checksum.get_generation(file_path)
+
+    if generation == 0:
+        # no checksum file to tell, continue after the generation files left
+        generations = list_generations(file_path)
+        if generations:
+            generation = generations[0][0]
+
+    return generation + 1
+
+
+def _remove_generation(generation_file_path: str) -> None:
+    for path in (generation_file_path, checksum.get_checksum_file_path(generation_file_path)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_newer(file_path: str, generation_file_path: str) -> None:
+    """
+    Remove the generation files of file_path newer than generation_file_path (ex. failing validation)
+    """
+
+    for _, path in list_generations(file_path):
+        if path == generation_file_path:
+            break
+
+        _remove_generation(path)
+
+
+def prune(file_path: str, keep: int) -> None:
+    """
+    Remove the generation files of file_path but the keep newest ones
+    """
+
+    for _, path in list_generations(file_path)[keep:]:
+        _remove_generation(path)
+
+
+def _prune_pending(file_path: str, keep: int) -> None:
+    with _pending_lock:
+        _pending.discard(file_path)
+
+    try:
+        prune(file_path, keep)
+    except OSError as e:
+        print(f'!! prune generations of [{file_path}] failed ({e})')
+
+
+def prune_later(file_path: str, keep: int) -> None:
+    """
+    Prune the generation files of file_path in the background (once for all requests queued meanwhile)
+    """
+
+    global _executor
+
+    with _pending_lock:
+        if file_path in _pending:
+            return
+
+        _pending.add(file_path)
+
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file_access_protector_prune')
+
+        executor = _executor
+
+    executor.submit(_prune_pending, file_path, keep)
+
+
+def wait_pruned() -> None:
+    """
+    Wait for the prunes queued so far (ex. before checking the generation files left)
+    """
+
+    with _pending_lock:
+        executor = _executor
+
+    if executor is not None:
+        executor.submit(lambda: None).result()
+
+
+def _reset_after_fork() -> None:
+    # the prune thread is not running in the child
+    global _executor, _pending, _pending_lock
+
+    _executor = None
+    _pending = set()
+    _pending_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
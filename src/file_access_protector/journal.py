@@ -0,0 +1,189 @@
+import json
+import os
+
+from . import durability, metrics, serializers
+
+JOURNAL_EXT = ".journal"
+
+# compaction thresholds of with_backupfile.journal_update
+JOURNAL_MAX_RECORDS = 1000
+JOURNAL_MAX_BYTES = 1024 * 1024
+
+# records longer than this make the record count fall back to a full scan
+_TAIL_READ_SIZE = 4096
+
+
+def get_journal_file_path(file_path: str) -> str:
+    """
+    Journal file path of file_path (ex. /path/to/file.json -> /path/to/file.json.journal)
+    """
+
+    return file_path + JOURNAL_EXT
+
+
+def snapshot_id(file_stat: os.stat_result) -> list:
+    return [file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns]
+
+
+def apply_merge_patch(target, patch):
+    """
+    Apply a JSON merge patch (RFC 7386): dicts are merged recursively, None deletes a key
+    """
+
+    if not isinstance(patch, dict):
+        return patch
+
+    if not isinstance(target, dict):
+        target = {}
+
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        else:
+            target[key] = apply_merge_patch(target.get(key), value)
+
+    return target
+
+
+def _dumps_record(record: dict) -> bytes:
+    return json.dumps(record, separators=(',', ':')).encode() + b'\n'
+
+
+def _read_records(journal_file_path: str) -> list:
+    """
+    Parsed lines of the journal, stops at the first torn/corrupted line (ex. crash during append)
+    """
+
+    records = []
+
+    with open(journal_file_path, 'rb') as f:
+        for line in f:
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError('incomplete record')
+                records.append(serializers.loads(line))
+            except Exception as e:
+                print(f'!! journal [{journal_file_path}] truncated at record {len(records)} ({e})')
+                break
+
+    return records
+
+
+def replay(file_path: str, content, file_stat: os.stat_result = None):
+    """
+    Apply the journal of file_path on top of its snapshot content
+
+    Records only apply to the snapshot they were appended to (header), so a journal left
+    behind by a compaction or a full dump is ignored.
+
+    Args:
+        file_path (str): snapshot file
+        content: parsed snapshot content (modified in place)
+        file_stat (os.stat_result, optional): stat of the snapshot the content was parsed from
+    """
+
+    journal_file_path = get_journal_file_path(file_path)
+
+    if not os.path.isfile(journal_file_path):
+        return content
+
+    if file_stat is None:
+        file_stat = os.stat(file_path)
+
+    records = _read_records(journal_file_path)
+
+    if not isinstance(content, dict) or len(records) == 0 \
+            or records[0].get('snapshot') != snapshot_id(file_stat):
+        return content
+
+    for record in records[1:]:
+        content = apply_merge_patch(content, record['patch'])
+
+    return content
+
+
+def _last_seq(f, size: int) -> int:
+    f.seek(max(0, size - _TAIL_READ_SIZE))
+    lines = f.read().splitlines()
+
+    try:
+        return serializers.loads(lines[-1]).get('seq', 0)
+    except Exception:
+        # torn tail or record longer than the tail read
+        f.seek(0)
+        return sum(1 for _ in f) - 1
+
+
+def _truncate_torn_tail(f, size: int) -> int:
+    """
+    Cut a partially written last record (crash during append), return the new size
+    """
+
+    f.seek(size - 1)
+    if f.read(1) == b'\n':
+        return size
+
+    f.seek(0)
+    content = f.read()
+    size = content.rfind(b'\n') + 1
+    os.ftruncate(f.fileno(), size)
+
+    return size
+
+
+def append(file_path: str, patch: dict, file_stat: os.stat_result, level: str = durability.DATA) -> tuple:
+    """
+    Append a patch record to the journal of file_path (synced once, durability level), caller holds the exclusive lock
+
+    A journal not belonging to the current snapshot is started over.
+
+    Returns:
+        (record count, journal size in bytes)
+    """
+
+    journal_file_path = get_journal_file_path(file_path)
+    header = {'snapshot': snapshot_id(file_stat)}
+
+    fd = os.open(journal_file_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+
+    with os.fdopen(fd, 'rb+') as f:
+        size = os.fstat(fd).st_size
+        first_line = f.readline()
+
+        try:
+            valid = serializers.loads(first_line) == header
+        except Exception:
+            valid = False
+
+        if valid:
+            size = _truncate_torn_tail(f, size)
+            seq = _last_seq(f, size) + 1
+            payload = _dumps_record({'seq': seq, 'patch': patch})
+        else:
+            os.ftruncate(fd, 0)
+            seq = 1
+            payload = _dumps_record(header) + _dumps_record({'seq': seq, 'patch': patch})
+            size = 0
+
+        os.write(fd, payload)
+        durability.sync_file(fd, level)
+
+    if size == 0:
+        # journal (re)started, possibly just created
+        durability.sync_dir(journal_file_path, level)
+
+    if metrics.enabled:
+        metrics.increment('written_bytes_total', len(payload), codec='json')
+
+    return seq, size + len(payload)
+
+
+def discard(file_path: str) -> None:
+    """
+    Remove the journal of file_path (its records are in the snapshot or superseded by it)
+    """
+
+    try:
+        os.remove(get_journal_file_path(file_path))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,702 @@
+import fcntl
+import os
+import threading
+import time
+import weakref
+
+from . import descriptors, metrics
+
+# polling interval bounds (seconds) while waiting for a contended lock
+MIN_WAIT_TIME = 0.0005
+MAX_WAIT_TIME = 0.05
+# seconds of back-to-back retries (yielding the CPU) before sleeping, catches fast handoffs
+SPIN_TIME = 0.0002
+# sleeps are randomly shortened by up to this fraction, so waiters do not wake in lockstep
+JITTER = 0.5
+
+LOCK_NAMES = {fcntl.LOCK_SH: 'shared', fcntl.LOCK_EX: 'exclusive'}
+
+# writer-preferring locks (see lock_fair) for open_locked and without_backupfile, set it in every
+# process sharing the files: readers not passing the gate do not wait for queued writers
+WRITER_PREFERRED = False
+GATE_EXT = ".gate"
+
+# lock_manager.LockManager keeping the locks in sidecar lock files (default: lock the files
+# themselves), set the same one in every process sharing the files
+LOCK_MANAGER = None
+
+# locked file object -> (lock name, perf_counter when locked), only filled while metrics are enabled
+_locked_since = weakref.WeakKeyDictionary()
+
+
+def record_retries(retry_count: int, timed_out: bool) -> None:
+    """
+    Record the failed attempts of a lock wait and whether it gave up, if metrics are enabled
+    """
+
+    if metrics.enabled:
+        if retry_count:
+            metrics.increment('lock_retries_total', retry_count)
+        if timed_out:
+            metrics.increment('lock_timeouts_total')
+
+
+def _try_lock(fd: int, lock_type: int) -> bool:
+    try:
+        fcntl.flock(fd, lock_type | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+class WaitStrategy:
+    """
+    How to wait for a contended lock, until a deadline
+
+    An uncontended lock always costs a single non-blocking attempt. Otherwise attempts are
+    retried back-to-back for spin_time seconds, then with an exponential backoff (doubling
+    from min_wait to max_wait) whose sleeps are shortened by a random fraction (up to
+    jitter) so that waiters do not wake in lockstep.
+
+    With blocking=True the lock is instead waited for in a blocking flock() (the kernel hands
+    it over as soon as it is released) run by a helper thread on a duplicate of the
+    descriptor, so the timeout still applies. If it times out, the helper thread stays blocked
+    until it gets the lock and then releases it right away. Async callers always poll.
+
+    Args:
+        timeout (float): seconds to wait before giving up with TimeoutError
+        spin_time (float): seconds of back-to-back retries before sleeping (default: SPIN_TIME)
+        min_wait (float): first backoff sleep (default: MIN_WAIT_TIME)
+        max_wait (float): longest backoff sleep (default: MAX_WAIT_TIME)
+        jitter (float): 0 to 1, max fraction a sleep is randomly shortened by (default: JITTER)
+        blocking (bool): wait in a blocking flock() instead of polling
+    """
+
+    def __init__(self, timeout: float = 1.0, spin_time: float = SPIN_TIME, min_wait: float = MIN_WAIT_TIME,
+                 max_wait: float = MAX_WAIT_TIME, jitter: float = JITTER, blocking: bool = False):
+        self.timeout = timeout
+        self.spin_time = spin_time
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.jitter = jitter
+        self.blocking = blocking
+
+    def __repr__(self) -> str:
+        return (f'WaitStrategy(timeout={self.timeout}, spin_time={self.spin_time}, min_wait={self.min_wait}, '
+                f'max_wait={self.max_wait}, jitter={self.jitter}, blocking={self.blocking})')
+
+    def with_timeout(self, timeout: float) -> 'WaitStrategy':
+        return WaitStrategy(timeout, self.spin_time, self.min_wait, self.max_wait, self.jitter, self.blocking)
+
+    def sleep_times(self, deadline: float):
+        """
+        Seconds to sleep before each retry (0 while spinning), until the deadline (time.monotonic())
+        """
+
+        import random
+
+        spin_deadline = time.monotonic() + self.spin_time
+        wait_time = self.min_wait
+
+        while True:
+            now = time.monotonic()
+            remaining = deadline - now
+            if remaining <= 0:
+                return
+
+            if now < spin_deadline:
+                yield 0
+            else:
+                yield min(wait_time * (1 - self.jitter * random.random()), remaining)
+                wait_time = min(wait_time * 2, self.max_wait)
+
+    def acquire(self, fd: int, lock_type: int = fcntl.LOCK_EX, timeout: float = None) -> None:
+        """
+        Lock fd, raise TimeoutError if it is still contended after timeout (default: self.timeout)
+        """
+
+        if _try_lock(fd, lock_type):
+            return
+
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+
+        if self.blocking:
+            return self._acquire_blocking(fd, lock_type, deadline)
+
+        failed_count = 1
+
+        for sleep_time in self.sleep_times(deadline):
+            # sleep(0) yields the CPU to the lock holder
+            time.sleep(sleep_time)
+
+            if _try_lock(fd, lock_type):
+                record_retries(failed_count, timed_out=False)
+                return
+
+            failed_count += 1
+
+        record_retries(failed_count, timed_out=True)
+        raise TimeoutError(f'Failed to get file lock')
+
+    async def acquire_async(self, fd: int, lock_type: int = fcntl.LOCK_EX, timeout: float = None) -> None:
+        """
+        Same as acquire, but sleeps with asyncio.sleep so the event loop keeps running (never blocks)
+        """
+
+        import asyncio
+
+        if _try_lock(fd, lock_type):
+            return
+
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        failed_count = 1
+
+        for sleep_time in self.sleep_times(deadline):
+            await asyncio.sleep(sleep_time)
+
+            if _try_lock(fd, lock_type):
+                record_retries(failed_count, timed_out=False)
+                return
+
+            failed_count += 1
+
+        record_retries(failed_count, timed_out=True)
+        raise TimeoutError(f'Failed to get file lock')
+
+    def _acquire_blocking(self, fd: int, lock_type: int, deadline: float) -> None:
+        import threading
+
+        # the duplicate shares the open file description, so its lock is the caller's lock
+        dup_fd = os.dup(fd)
+        done = threading.Event()
+        state_lock = threading.Lock()
+        state = {'cancelled': False, 'error': None}
+
+        def wait_lock():
+            try:
+                fcntl.flock(dup_fd, lock_type)
+
+                with state_lock:
+                    if state['cancelled']:
+                        # caller gave up meanwhile
+                        fcntl.flock(dup_fd, fcntl.LOCK_UN)
+                    done.set()
+
+            except OSError as e:
+                state['error'] = e
+                done.set()
+
+            finally:
+                os.close(dup_fd)
+
+        threading.Thread(target=wait_lock, name='file_access_protector_lock_wait', daemon=True).start()
+
+        done.wait(max(deadline - time.monotonic(), 0))
+
+        with state_lock:
+            if not done.is_set():
+                state['cancelled'] = True
+                record_retries(1, timed_out=True)
+                raise TimeoutError(f'Failed to get file lock')
+
+        if state['error'] is not None:
+            raise state['error']
+
+        record_retries(1, timed_out=False)
+
+
+# wait of the lock functions below when no strategy is given
+DEFAULT_WAIT = WaitStrategy()
+
+
+def get_lock_with_timeout(fd: int, timeout: float, lock_type: int = fcntl.LOCK_EX, wait: WaitStrategy = None) -> None:
+    """
+    Acquire a flock on fd within timeout seconds, in-process (no `flock` child process)
+
+    Args:
+        fd (int): file descriptor to lock
+        timeout (float): seconds to keep trying before giving up
+        lock_type (int): fcntl.LOCK_EX or fcntl.LOCK_SH
+        wait (WaitStrategy, optional): how to wait, its timeout is replaced by timeout (default: DEFAULT_WAIT)
+    """
+
+    (wait or DEFAULT_WAIT).acquire(fd, lock_type, timeout)
+
+
+async def get_lock_with_timeout_async(fd: int, timeout: float, lock_type: int = fcntl.LOCK_EX,
+                                      wait: WaitStrategy = None) -> None:
+    """
+    Same as get_lock_with_timeout, but waits with asyncio.sleep so the event loop keeps running
+    """
+
+    await (wait or DEFAULT_WAIT).acquire_async(fd, lock_type, timeout)
+
+
+def get_gate_file_path(file_path: str) -> str:
+    """
+    Companion file locked by lock_fair (kept next to the file, never removed)
+    """
+
+    return f'{file_path}{GATE_EXT}'
+
+
+def lock_fair(fd: int, file_path: str, timeout: float, lock_type: int = fcntl.LOCK_EX, wait: WaitStrategy = None) -> None:
+    """
+    Writer-preferring get_lock_with_timeout, across processes
+
+    The lock of fd is taken while holding the same lock type on the gate file of file_path. A
+    waiting writer holds the gate exclusively, so readers arriving after it queue at the gate
+    instead of taking the (compatible) shared lock of the file and keeping the writer out; the
+    gate is released as soon as the file is locked, readers only hold it for an instant.
+
+    Args:
+        fd (int): file descriptor of file_path to lock
+        file_path (str): path of the locked file
+        timeout (float): seconds to keep trying before giving up, gate included
+        lock_type (int): fcntl.LOCK_EX or fcntl.LOCK_SH
+        wait (WaitStrategy, optional): how to wait (default: DEFAULT_WAIT)
+    """
+
+    deadline = time.monotonic() + timeout
+
+    with open(get_gate_file_path(file_path), 'a') as gate:
+        get_lock_with_timeout(gate.fileno(), timeout, lock_type, wait)
+        # closing the gate file releases it
+        get_lock_with_timeout(fd, max(deadline - time.monotonic(), 0), lock_type, wait)
+
+
+async def lock_fair_async(fd: int, file_path: str, timeout: float, lock_type: int = fcntl.LOCK_EX,
+                          wait: WaitStrategy = None) -> None:
+    """
+    Same as lock_fair, but waits with asyncio.sleep so the event loop keeps running
+    """
+
+    deadline = time.monotonic() + timeout
+
+    with open(get_gate_file_path(file_path), 'a') as gate:
+        await get_lock_with_timeout_async(gate.fileno(), timeout, lock_type, wait)
+        await get_lock_with_timeout_async(fd, max(deadline - time.monotonic(), 0), lock_type, wait)
+
+
+def _is_gate_open(file_path: str) -> bool:
+    """
+    Whether no writer is waiting at the gate of file_path (see lock_fair)
+    """
+
+    try:
+        fd = os.open(get_gate_file_path(file_path), os.O_RDONLY | os.O_CLOEXEC)
+    except FileNotFoundError:
+        return True
+
+    try:
+        # closing the descriptor releases the gate
+        return _try_lock(fd, fcntl.LOCK_SH)
+    finally:
+        os.close(fd)
+
+
+def _is_locked_inode(f, file_path: str) -> bool:
+    try:
+        path_stat = os.stat(file_path)
+    except FileNotFoundError:
+        return False
+
+    locked_stat = os.fstat(f.fileno())
+
+    return (locked_stat.st_dev, locked_stat.st_ino) == (path_stat.st_dev, path_stat.st_ino)
+
+
+def record_locked(f, lock_type: int, wait_start_time: float) -> None:
+    """
+    Record the lock wait of f (locked now) and start its hold time, if metrics are enabled
+    """
+
+    if metrics.enabled:
+        locked_time = time.perf_counter()
+        metrics.observe('lock_wait_seconds', locked_time - wait_start_time, lock=LOCK_NAMES[lock_type])
+        metrics.maximum('lock_wait_max_seconds', locked_time - wait_start_time, lock=LOCK_NAMES[lock_type])
+        _locked_since[f] = (LOCK_NAMES[lock_type], locked_time)
+
+
+def _get_lock_file_path(file_path: str) -> str:
+    return file_path if LOCK_MANAGER is None else LOCK_MANAGER.get_lock_file_path(file_path)
+
+
+def _checkout_lock_file(file_path: str, lock_file_path: str, mode: str):
+    """
+    Descriptor to flock for file_path (itself, or its sidecar lock file), None if file_path does not exist
+    """
+
+    if lock_file_path == file_path:
+        return descriptors.checkout(file_path, create='a' in mode or 'w' in mode)
+
+    try:
+        return descriptors.checkout(lock_file_path, create=True)
+    except FileNotFoundError:
+        # lock directory removed meanwhile
+        LOCK_MANAGER.make_lock_dir()
+
+    return descriptors.checkout(lock_file_path, create=True)
+
+
+def _attach_file(lock_f: descriptors.LockedFile, file_path: str, mode: str):
+    """
+    The locked file of file_path: lock_f itself, or a descriptor of file_path holding lock_f
+
+    A pooled descriptor of file_path may point to an inode replaced since it was opened, the
+    sidecar lock does not tell, so it is checked here.
+    """
+
+    if lock_f.name == file_path:
+        return lock_f
+
+    f = descriptors.checkout(file_path, create='a' in mode or 'w' in mode)
+    if f is not None and not _is_locked_inode(f, file_path):
+        f.discard()
+        f = descriptors.checkout(file_path, create='a' in mode or 'w' in mode)
+
+    if f is None:
+        # file not exist
+        _unlock(lock_f)
+        return None
+
+    f.lock_file = lock_f
+
+    return f
+
+
+def _unlock(f: descriptors.LockedFile) -> None:
+    """
+    Release the flock held for f and give its descriptor(s) back to the pool
+    """
+
+    fcntl.flock(f.lock_file or f, fcntl.LOCK_UN)
+
+    if f.lock_file is not None:
+        f.lock_file.close()
+        f.lock_file = None
+
+    f.close()
+
+
+def _lock_file(file_path: str, deadline: float, lock_type: int, mode: str, wait: WaitStrategy, fair: bool):
+    """
+    Check out a descriptor of file_path and flock it before deadline, None if file_path does not exist
+    """
+
+    lock_file_path = _get_lock_file_path(file_path)
+
+    while True:
+        f = _checkout_lock_file(file_path, lock_file_path, mode)
+        if f is None:
+            # file not exist
+            return None
+
+        try:
+            if fair:
+                lock_fair(f.fileno(), lock_file_path, max(deadline - time.monotonic(), 0), lock_type, wait)
+            else:
+                get_lock_with_timeout(f.fileno(), max(deadline - time.monotonic(), 0), lock_type, wait)
+            if _is_locked_inode(f, lock_file_path):
+                return _attach_file(f, file_path, mode)
+        except BaseException:
+            # a blocking wait may still get the lock later, the descriptor is not reused
+            f.discard()
+            raise
+
+        # replaced while waiting (or a pooled descriptor of an older inode), retry on the new file
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.discard()
+
+
+class _LockView(descriptors.LockedFile):
+    """
+    One thread's handle on the flock its process holds on a path (see _PathLock)
+    """
+
+    __slots__ = ('path_lock', 'lock_type')
+
+    def __init__(self, f: descriptors.LockedFile, path_lock: '_PathLock', lock_type: int):
+        super().__init__(f.fd, f.name, f.lock_file)
+        self.path_lock = path_lock
+        self.lock_type = lock_type
+
+    def close(self) -> None:
+        # the descriptors are shared, they are given back by the last release
+        self.fd = None
+        self.lock_file = None
+
+
+class _PathLock:
+    """
+    In-process reader-writer lock of a path, in front of its flock
+
+    Threads of the process queue on a condition variable, writers first, and are woken as soon
+    as the lock is handed over instead of polling the kernel lock. The process holds a single
+    flock of the path at a time, on one descriptor: the first reader takes it shared and the
+    last one releases it, readers in between share it; a writer takes it exclusive. With the
+    fair lock, readers only share it while no writer of another process waits at the gate.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.writers_waiting = 0
+        self.locking = False  # a reader is taking the flock for the other readers
+        self.file = None  # flocked descriptors.LockedFile
+        self.users = 0  # threads holding or waiting for it, see _get_path_lock
+
+    def _wait(self, predicate, deadline: float) -> None:
+        if not self.condition.wait_for(predicate, max(deadline - time.monotonic(), 0)):
+            record_retries(1, timed_out=True)
+            raise TimeoutError(f'Failed to get file lock')
+
+    def acquire(self, file_path: str, deadline: float, lock_type: int, mode: str, wait: WaitStrategy,
+                fair: bool) -> _LockView:
+        with self.condition:
+            if lock_type == fcntl.LOCK_EX:
+                self.writers_waiting += 1
+                try:
+                    self._wait(lambda: not self.writer and self.readers == 0, deadline)
+                except BaseException:
+                    # readers held back by this writer may go
+                    self.condition.notify_all()
+                    raise
+                finally:
+                    self.writers_waiting -= 1
+
+                self.writer = True
+
+            else:
+                while True:
+                    self._wait(lambda: not self.writer and self.writers_waiting == 0 and not self.locking, deadline)
+                    if self.file is None or not fair or _is_gate_open(_get_lock_file_path(file_path)):
+                        break
+
+                    # a writer of another process waits at the gate: not joining the flock held (it
+                    # would keep the writer out), queued until it is released and retaken via the gate
+                    held_file = self.file
+                    self._wait(lambda: self.file is not held_file, deadline)
+
+                self.readers += 1
+                if self.file is not None:
+                    return _LockView(self.file, self, lock_type)
+
+                self.locking = True
+
+        f = None
+        try:
+            f = _lock_file(file_path, deadline, lock_type, mode, wait, fair)
+        finally:
+            with self.condition:
+                if lock_type == fcntl.LOCK_SH:
+                    self.locking = False
+
+                if f is None:
+                    if lock_type == fcntl.LOCK_EX:
+                        self.writer = False
+                    else:
+                        self.readers -= 1
+
+                self.file = f
+                self.condition.notify_all()
+
+        return None if f is None else _LockView(f, self, lock_type)
+
+    def upgrade(self, view: _LockView, timeout: float) -> None:
+        with self.condition:
+            if view.lock_type == fcntl.LOCK_EX:
+                return
+
+            deadline = time.monotonic() + timeout
+
+            # queued as a writer: no new reader, the others leave
+            self.writers_waiting += 1
+            try:
+                self._wait(lambda: not self.writer and self.readers == 1, deadline)
+            except BaseException:
+                self.condition.notify_all()
+                raise
+            finally:
+                self.writers_waiting -= 1
+
+            # kept exclusive in the process until released, even if the flock upgrade fails
+            # (a failed flock conversion may drop the shared lock)
+            self.readers -= 1
+            self.writer = True
+            view.lock_type = fcntl.LOCK_EX
+
+        get_lock_with_timeout((view.lock_file or view).fileno(), max(deadline - time.monotonic(), 0), fcntl.LOCK_EX)
+
+    def release(self, view: _LockView) -> None:
+        with self.condition:
+            if view.lock_type == fcntl.LOCK_EX:
+                self.writer = False
+            else:
+                self.readers -= 1
+
+            if not self.writer and self.readers == 0:
+                _unlock(self.file)
+                self.file = None
+
+            self.condition.notify_all()
+
+        view.close()
+
+
+# file path -> _PathLock, while a thread holds or waits for it
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+
+def _get_path_lock(file_path: str) -> _PathLock:
+    with _path_locks_lock:
+        path_lock = _path_locks.get(file_path)
+        if path_lock is None:
+            path_lock = _path_locks[file_path] = _PathLock()
+
+        path_lock.users += 1
+
+    return path_lock
+
+
+def _put_path_lock(file_path: str, path_lock: _PathLock) -> None:
+    with _path_locks_lock:
+        path_lock.users -= 1
+        if path_lock.users == 0:
+            del _path_locks[file_path]
+
+
+def _reset_after_fork() -> None:
+    # locks held or waited for by the other threads of the parent do not exist in the child
+    global _path_locks, _path_locks_lock
+
+    _path_locks = {}
+    _path_locks_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def open_locked(file_path: str, timeout: float, lock_type: int = fcntl.LOCK_EX, mode: str = 'r',
+                wait: WaitStrategy = None, fair: bool = None):
+    """
+    Open file_path and lock it within timeout seconds
+
+    Threads of the process first queue on the in-process reader-writer lock of file_path
+    (_PathLock): readers share the flock the process holds, a writer waits for them without
+    polling. The flocked descriptor comes from the per-process pool (descriptors.checkout), so
+    repeated calls on a path do not reopen it. A writer may atomically replace the file (new
+    inode) while we wait for the lock on the old one, or since a pooled descriptor was opened,
+    so the lock is only kept once the locked inode is still the one at file_path.
+
+    Args:
+        file_path (str): file to open and lock
+        timeout (float): seconds to keep trying before giving up
+        lock_type (int): fcntl.LOCK_EX or fcntl.LOCK_SH
+        mode (str): 'r' by default, 'a+' (or 'w') creates a missing file; read() returns bytes
+        wait (WaitStrategy, optional): how to wait, its timeout is replaced by timeout (default: DEFAULT_WAIT)
+        fair (bool, optional): writer-preferring lock_fair (default: WRITER_PREFERRED)
+
+    Returns:
+        the locked file (give it back with release), or None if file_path does not exist
+    """
+
+    deadline = time.monotonic() + timeout
+    wait_start_time = time.perf_counter()
+
+    path_lock = _get_path_lock(file_path)
+    try:
+        f = path_lock.acquire(file_path, deadline, lock_type, mode, wait,
+                              WRITER_PREFERRED if fair is None else fair)
+    except BaseException:
+        _put_path_lock(file_path, path_lock)
+        raise
+
+    if f is None:
+        _put_path_lock(file_path, path_lock)
+        return None
+
+    record_locked(f, lock_type, wait_start_time)
+
+    return f
+
+
+def upgrade(f, timeout: float) -> None:
+    """
+    Turn the shared lock of f (from open_locked) into an exclusive one within timeout seconds
+
+    Like flock, the upgrade is not atomic: the file may be written by another process between
+    the two locks. The lock stays exclusive in the process until released, even on TimeoutError.
+    """
+
+    if isinstance(f, _LockView):
+        f.path_lock.upgrade(f, timeout)
+    else:
+        get_lock_with_timeout((f.lock_file or f).fileno(), timeout, fcntl.LOCK_EX)
+
+
+async def open_locked_async(file_path: str, timeout: float, lock_type: int = fcntl.LOCK_EX, mode: str = 'r',
+                            wait: WaitStrategy = None, fair: bool = None):
+    """
+    Same as open_locked, but waits for the lock without blocking the event loop
+
+    The in-process lock is not used (it would block the loop): the file gets its own flock,
+    which other threads of the process are excluded from by the kernel as other processes are.
+    Cancelling the caller while waiting closes the descriptor, no lock is left behind.
+    """
+
+    deadline = time.monotonic() + timeout
+    wait_start_time = time.perf_counter()
+    lock_file_path = _get_lock_file_path(file_path)
+
+    while True:
+        f = _checkout_lock_file(file_path, lock_file_path, mode)
+        if f is None:
+            # file not exist
+            return None
+
+        try:
+            if WRITER_PREFERRED if fair is None else fair:
+                await lock_fair_async(f.fileno(), lock_file_path, max(deadline - time.monotonic(), 0), lock_type, wait)
+            else:
+                await get_lock_with_timeout_async(f.fileno(), max(deadline - time.monotonic(), 0), lock_type, wait)
+            if _is_locked_inode(f, lock_file_path):
+                f = _attach_file(f, file_path, mode)
+                if f is not None:
+                    record_locked(f, lock_type, wait_start_time)
+                return f
+        except BaseException:
+            # a blocking wait may still get the lock later, the descriptor is not reused
+            f.discard()
+            raise
+
+        # replaced while waiting (or a pooled descriptor of an older inode), retry on the new file
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.discard()
+
+
+def release(f) -> None:
+    """
+    Unlock a file returned by open_locked (or open_locked_async) and give its descriptor back to the pool
+    """
+
+    if isinstance(f, _LockView):
+        f.path_lock.release(f)
+        _put_path_lock(f.name, f.path_lock)
+    else:
+        _unlock(f)
+
+    record_released(f)
+
+
+def record_released(f) -> None:
+    """
+    Record the hold time of f (see record_locked), if metrics are enabled
+    """
+
+    if metrics.enabled:
+        locked = _locked_since.pop(f, None)
+        if locked is not None:
+            metrics.observe('lock_hold_seconds', time.perf_counter() - locked[1], lock=locked[0])
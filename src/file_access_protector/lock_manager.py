@@ -0,0 +1,62 @@
+import os
+
+LOCK_FILE_EXT = ".lock"
+
+# tmpfs: lock files cost no disk I/O and are cleared at boot, when no process can hold them
+DEFAULT_LOCK_DIR = '/dev/shm/file_access_protector' if os.path.isdir('/dev/shm') else '/tmp/file_access_protector'
+
+
+class LockManager:
+    """
+    Keep the locks of files in sidecar lock files of a lock directory, instead of the files themselves
+
+    A lock on the data file belongs to its inode, so an atomic replace (new inode) leaves the
+    waiters on a stale lock; a sidecar lock file is never replaced. Enable it in every process
+    sharing the files (lock.LOCK_MANAGER = LockManager()), locks of a process using another
+    lock directory (or none) do not exclude it.
+
+    The lock file name is a hash of the absolute file path. With stripes=N, paths share N lock
+    files (path hash modulo N) so the lock file count stays bounded for stores of millions of
+    files, at the cost of unrelated files of a stripe excluding each other: a thread must not
+    lock a file while it holds the lock of another one (it may be the same stripe).
+
+    Args:
+        lock_dir (str, optional): directory of the lock files, created if missing (default: DEFAULT_LOCK_DIR)
+        stripes (int, optional): number of lock files shared by all paths (default: one per path)
+    """
+
+    def __init__(self, lock_dir: str = None, stripes: int = None):
+        if stripes is not None and stripes < 1:
+            raise ValueError(f'Lock stripes must be at least 1 ({stripes})')
+
+        self.lock_dir = lock_dir or DEFAULT_LOCK_DIR
+        self.stripes = stripes
+
+        self.make_lock_dir()
+
+    def __repr__(self) -> str:
+        return f'LockManager(lock_dir={self.lock_dir!r}, stripes={self.stripes})'
+
+    def make_lock_dir(self) -> None:
+        """
+        (Re)create the lock directory (ex. after a temp file cleaner removed it)
+        """
+
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    def get_lock_file_path(self, file_path: str) -> str:
+        """
+        Lock file of file_path (the same for every spelling of the path)
+        """
+
+        # hashlib is only needed once a lock manager is used
+        import hashlib
+
+        digest = hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=16).digest()
+
+        if self.stripes is None:
+            name = digest.hex()
+        else:
+            name = f'stripe-{int.from_bytes(digest[:8], "big") % self.stripes}'
+
+        return os.path.join(self.lock_dir, f'{name}{LOCK_FILE_EXT}')
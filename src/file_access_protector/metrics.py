@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from typing import Callable
+
+# Metrics recorded by the library (labels in brackets):
+#   lock_wait_seconds (histogram) [lock]: time to get a file lock ('shared'/'exclusive')
+#   lock_wait_max_seconds (max) [lock]: worst lock wait so far (ex. writers starved by readers)
+#   lock_hold_seconds (histogram) [lock]: time a file lock was held
+#   parse_seconds (histogram) [codec]: time to parse a file
+#   serialize_seconds (histogram) [codec]: time to serialize data to dump
+#   read_bytes_total (counter) [codec]: bytes parsed
+#   written_bytes_total (counter) [codec]: bytes dumped (journal records count as json)
+#   lock_retries_total (counter): failed non-blocking lock attempts
+#   lock_timeouts_total (counter): lock waits given up
+#   backup_recoveries_total (counter) [codec]: loads served from the backup file
+#   skipped_writes_total (counter) [codec]: dumps of the content already in the file, nothing written
+
+# True while at least one sink is registered, call sites check it before measuring anything
+enabled = False
+
+_sinks = []
+
+# seconds, upper bounds of the histogram buckets of PrometheusTextfileSink
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+def add_sink(sink: Callable) -> None:
+    """
+    Register a sink: sink(kind, name, value, labels) is called for every recorded metric
+
+    kind is 'histogram', 'counter' or 'max' (keep the largest value), labels a dict (ex. {'codec': 'json'}).
+    Sinks run in the calling thread, keep them fast.
+    """
+
+    global enabled
+
+    _sinks.append(sink)
+    enabled = True
+
+
+def remove_sink(sink: Callable) -> None:
+    global enabled
+
+    _sinks.remove(sink)
+    enabled = len(_sinks) > 0
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """
+    Record a histogram sample (callers check `enabled` first)
+    """
+
+    for sink in _sinks:
+        sink('histogram', name, value, labels)
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """
+    Add to a counter (callers check `enabled` first)
+    """
+
+    for sink in _sinks:
+        sink('counter', name, value, labels)
+
+
+def maximum(name: str, value: float, **labels) -> None:
+    """
+    Record a sample of a metric exported as its largest value (callers check `enabled` first)
+    """
+
+    for sink in _sinks:
+        sink('max', name, value, labels)
+
+
+class LoggingSink:
+    """
+    Log every metric (ex. metrics.add_sink(LoggingSink()))
+
+    Args:
+        logger (logging.Logger, optional): default: 'file_access_protector.metrics' logger
+        level (int, optional): log level (default: logging.DEBUG)
+    """
+
+    def __init__(self, logger=None, level: int = None):
+        import logging
+
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = logging.DEBUG if level is None else level
+
+    def __call__(self, kind: str, name: str, value: float, labels: dict) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, '%s %s %s %s', kind, name, value, labels)
+
+
+class PrometheusTextfileSink:
+    """
+    Aggregate metrics in memory and export them in the Prometheus text format to a file
+
+    Meant for the node_exporter textfile collector: the file is rewritten atomically at most
+    once per write_interval seconds while metrics are recorded, and by write().
+
+    Args:
+        file_path (str): export file (ex. /var/lib/node_exporter/file_access_protector.prom)
+        namespace (str): prefix of the exported metric names
+        buckets (tuple): histogram bucket upper bounds in seconds
+        write_interval (float): min seconds between two automatic exports
+    """
+
+    def __init__(self, file_path: str, namespace: str = 'file_access_protector',
+                 buckets: tuple = DEFAULT_BUCKETS, write_interval: float = 10.0):
+        self.file_path = file_path
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self.write_interval = write_interval
+
+        self._counters = {}  # (name, labels) -> value
+        self._maximums = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        self._last_write_time = time.monotonic()
+
+    def __call__(self, kind: str, name: str, value: float, labels: dict) -> None:
+        key = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            if kind == 'counter':
+                self._counters[key] = self._counters.get(key, 0) + value
+            elif kind == 'max':
+                self._maximums[key] = max(self._maximums.get(key, value), value)
+            else:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+
+                for index, bound in enumerate(self.buckets):
+                    if value <= bound:
+                        histogram[index] += 1
+                histogram[-2] += value
+                histogram[-1] += 1
+
+            due = time.monotonic() - self._last_write_time >= self.write_interval
+
+        if due:
+            self.write()
+
+    def render(self) -> str:
+        families = {}  # exported name -> (type, sample lines)
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                _, lines = families.setdefault(self._name(name), ('counter', []))
+                lines.append(f'{self._name(name)}{_format_labels(labels)} {value}')
+
+            for (name, labels), value in sorted(self._maximums.items()):
+                _, lines = families.setdefault(self._name(name), ('gauge', []))
+                lines.append(f'{self._name(name)}{_format_labels(labels)} {value}')
+
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                _, lines = families.setdefault(self._name(name), ('histogram', []))
+                for bound, count in zip(self.buckets + ('+Inf',), histogram[:-2] + histogram[-1:]):
+                    lines.append(f'{self._name(name)}_bucket{_format_labels(labels + (("le", bound),))} {count}')
+                lines.append(f'{self._name(name)}_sum{_format_labels(labels)} {histogram[-2]}')
+                lines.append(f'{self._name(name)}_count{_format_labels(labels)} {histogram[-1]}')
+
+        output = []
+        for name, (kind, lines) in sorted(families.items()):
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(lines)
+
+        return '\n'.join(output) + '\n'
+
+    def write(self) -> None:
+        """
+        Export the current values (temp file renamed over file_path)
+        """
+
+        with self._lock:
+            self._last_write_time = time.monotonic()
+
+        import tempfile
+
+        content = self.render()
+
+        fd, tmp_file_path = tempfile.mkstemp(dir=os.path.dirname(self.file_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+            os.chmod(tmp_file_path, 0o644)
+            os.replace(tmp_file_path, self.file_path)
+        except BaseException:
+            os.remove(tmp_file_path)
+            raise
+
+    def _name(self, name: str) -> str:
+        return f'{self.namespace}_{name}' if self.namespace else name
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
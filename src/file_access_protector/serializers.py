@@ -0,0 +1,183 @@
+import json
+import math
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# fastest first, used when no backend is chosen
+BACKEND_PRIORITY = ('orjson', 'ujson', 'json')
+
+# orjson parses integers over 64 bits (20+ digits) as floats: payloads with such a run of
+# digits are parsed by json instead (a false positive, ex. in a string, is only slower).
+# Digits are mapped to '0' and the rest to ' ' (bytes.translate is much faster than a regex)
+_DIGITS_TABLE = bytes(ord('0') if ord('0') <= i <= ord('9') else ord(' ') for i in range(256))
+_LONG_DIGITS = b'0' * 20
+
+
+def _json_dumps(obj) -> bytes:
+    return json.dumps(obj, indent=4).encode()
+
+
+def _has_non_finite_float(obj) -> bool:
+    stack = [obj]
+
+    while stack:
+        value = stack.pop()
+
+        if type(value) is float:
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+
+    return False
+
+
+def _orjson_dumps(obj) -> bytes:
+    # orjson only supports 2-space indent
+    payload = orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    # orjson writes NaN and infinities as null, json keeps them (as NaN, Infinity)
+    if b'null' in payload and _has_non_finite_float(obj):
+        raise OverflowError('NaN or infinity')
+
+    return payload
+
+
+def _has_long_digits(data) -> bool:
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    elif not isinstance(data, bytes):
+        data = bytes(data)
+
+    return _LONG_DIGITS in data.translate(_DIGITS_TABLE)
+
+
+def _orjson_loads(data, fallback=json.loads):
+    if _has_long_digits(data):
+        return fallback(data)
+
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # ex. NaN written by the json fallback of dumps; still raises if the data is corrupted
+        return fallback(data)
+
+
+def _ujson_dumps(obj) -> bytes:
+    return ujson.dumps(obj, indent=4, escape_forward_slashes=False).encode()
+
+
+def _ujson_loads(data):
+    try:
+        return ujson.loads(data)
+    except ValueError:
+        # ex. integers over 64 bits; still raises if the data is corrupted
+        return json.loads(data)
+
+
+# name -> (dumps(obj) -> bytes, loads(bytes/str) -> obj)
+BACKENDS = {'json': (_json_dumps, json.loads)}
+
+if orjson is not None:
+    BACKENDS['orjson'] = (_orjson_dumps, _orjson_loads)
+
+if ujson is not None:
+    BACKENDS['ujson'] = (_ujson_dumps, _ujson_loads)
+
+_default_backend = next(name for name in BACKEND_PRIORITY if name in BACKENDS)
+
+
+def available_backends() -> list:
+    return [name for name in BACKEND_PRIORITY if name in BACKENDS]
+
+
+def get_default_backend() -> str:
+    return _default_backend
+
+
+def set_default_backend(name: str) -> None:
+    """
+    Choose the json backend used by all calls without `backend` in this process
+
+    Args:
+        name (str): 'orjson', 'ujson' or 'json' (must be installed)
+    """
+
+    global _default_backend
+
+    _check_backend(name)
+    _default_backend = name
+
+
+def _check_backend(name: str) -> None:
+    if name not in BACKENDS:
+        raise AttributeError(
+            f'JSON backend [{name}] is not available (available: {available_backends()})')
+
+
+def dumps(obj, backend: str = None) -> bytes:
+    """
+    Serialize obj to json bytes with the chosen backend (default: get_default_backend())
+
+    Data the fast backends can not represent (ex. integers over 64 bits, NaN) falls back to `json`.
+    """
+
+    name = backend or _default_backend
+    _check_backend(name)
+
+    try:
+        return BACKENDS[name][0](obj)
+    except (TypeError, OverflowError):
+        if name == 'json':
+            raise
+
+        return _json_dumps(obj)
+
+
+def loads(data, backend: str = None):
+    """
+    Parse json bytes/str with the chosen backend (default: get_default_backend())
+
+    Data the fast backends can not parse as `json` does (ex. integers over 64 bits, NaN) is parsed by `json`.
+    """
+
+    name = backend or _default_backend
+    _check_backend(name)
+
+    return BACKENDS[name][1](data)
+
+
+def loads_buffer(buffer: memoryview, backend: str = None):
+    """
+    Parse json from a bytes-like buffer (ex. a memoryview of an mmap) without copying it to bytes
+
+    orjson parses the buffer as-is, the other backends get the text decoded straight from it.
+    """
+
+    name = backend or _default_backend
+    _check_backend(name)
+
+    if name == 'orjson':
+        return _orjson_loads(buffer, _json_loads_buffer)
+
+    return BACKENDS[name][1](_decode_buffer(buffer))
+
+
+def _decode_buffer(buffer: memoryview) -> str:
+    encoding = json.detect_encoding(bytes(buffer[:4]))
+
+    return str(buffer, encoding, 'surrogatepass')
+
+
+def _json_loads_buffer(buffer: memoryview):
+    return json.loads(_decode_buffer(buffer))
@@ -0,0 +1,216 @@
+import codecs
+import json
+
+from .codec import Codec
+
+CHUNK_SIZE = 64 * 1024  # bytes read from the file at a time
+
+_JSON_WHITESPACE = ' \t\n\r'
+
+_yaml_item_loader = None
+
+
+def _get_yaml_item_loader():
+    """
+    Loader class composing and constructing one item at a time (yaml is imported on first use)
+
+    libyaml parses the events when pyyaml is built with it.
+    """
+
+    global _yaml_item_loader
+
+    if _yaml_item_loader is None:
+        import yaml
+        from yaml.composer import Composer
+        from yaml.constructor import FullConstructor
+        from yaml.resolver import Resolver
+
+        try:
+            from yaml.cyaml import CParser
+        except ImportError:
+            _yaml_item_loader = yaml.FullLoader
+        else:
+            class _YamlItemLoader(CParser, Composer, FullConstructor, Resolver):
+                def __init__(self, stream):
+                    CParser.__init__(self, stream)
+                    Composer.__init__(self)
+                    FullConstructor.__init__(self)
+                    Resolver.__init__(self)
+
+            _yaml_item_loader = _YamlItemLoader
+
+    return _yaml_item_loader
+
+
+class _JsonReader:
+    """
+    Decode JSON values one at a time from a binary file, keeping only the unparsed text in memory
+    """
+
+    def __init__(self, f, chunk_size: int):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> None:
+        # read at least as much as is buffered, so a large value is not re-decoded too often
+        chunk = self._f.read(max(self._chunk_size, len(self._buf) - self._pos))
+        self._eof = len(chunk) == 0
+
+        self._buf = self._buf[self._pos:] + self._text_decoder.decode(chunk, final=self._eof)
+        self._pos = 0
+
+    def peek(self) -> str:
+        """
+        Next non-whitespace character (not consumed), '' at the end of the file
+        """
+
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _JSON_WHITESPACE:
+                self._pos += 1
+
+            if self._pos < len(self._buf) or self._eof:
+                return self._buf[self._pos:self._pos + 1]
+
+            self._fill()
+
+    def next_char(self) -> str:
+        char = self.peek()
+        self._pos += len(char)
+
+        return char
+
+    def expect(self, *chars: str) -> str:
+        char = self.next_char()
+
+        if char not in chars:
+            raise ValueError(f'Expecting {" or ".join(chars)}, got [{char}]')
+
+        return char
+
+    def value(self):
+        self.peek()
+
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+
+                # a number ending at the buffer end may continue in the next chunk
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+
+            self._fill()
+
+
+def iter_json_items(f, chunk_size: int = None):
+    """
+    Yield the elements of a top-level JSON array (or (key, value) of an object) from binary file f
+
+    Args:
+        f: file opened in binary mode
+        chunk_size (int, optional): bytes read at a time (default: CHUNK_SIZE)
+    """
+
+    reader = _JsonReader(f, chunk_size or CHUNK_SIZE)
+
+    opening = reader.next_char()
+    if opening != '[' and opening != '{':
+        raise ValueError('JSON content is not list or dict!')
+
+    closing = ']' if opening == '[' else '}'
+
+    if reader.peek() == closing:
+        reader.next_char()
+
+    else:
+        while True:
+            if opening == '{':
+                key = reader.value()
+                if type(key) != str:
+                    raise ValueError(f'JSON object key must be string ({key})')
+
+                reader.expect(':')
+                yield key, reader.value()
+
+            else:
+                yield reader.value()
+
+            if reader.expect(',', closing) == closing:
+                break
+
+    if reader.peek() != '':
+        raise ValueError('Extra data after JSON content')
+
+
+def iter_yaml_items(f, chunk_size: int = None):
+    """
+    Yield the elements of a top-level YAML sequence (or (key, value) of a mapping) from binary file f
+
+    Args:
+        f: file opened in binary mode
+        chunk_size (int, optional): unused, the YAML reader buffers the file itself
+    """
+
+    from yaml.events import MappingEndEvent, MappingStartEvent, SequenceEndEvent, SequenceStartEvent, StreamEndEvent
+
+    loader = _get_yaml_item_loader()(f)
+
+    try:
+        # stream start, document start (if any)
+        loader.get_event()
+        if not loader.check_event(StreamEndEvent):
+            loader.get_event()
+
+        if loader.check_event(SequenceStartEvent):
+            end_event = SequenceEndEvent
+        elif loader.check_event(MappingStartEvent):
+            end_event = MappingEndEvent
+        else:
+            raise ValueError('YAML content is not list or dict!')
+
+        loader.get_event()
+
+        while not loader.check_event(end_event):
+            if end_event is MappingEndEvent:
+                key = loader.construct_object(loader.compose_node(None, None), deep=True)
+                item = key, loader.construct_object(loader.compose_node(None, None), deep=True)
+            else:
+                item = loader.construct_object(loader.compose_node(None, None), deep=True)
+
+            # constructed items are not kept, anchored nodes are (for later aliases)
+            loader.constructed_objects = {}
+            yield item
+
+        # sequence/mapping end, document end
+        loader.get_event()
+        loader.get_event()
+
+        if not loader.check_event(StreamEndEvent):
+            raise ValueError('Extra document after YAML content')
+
+    finally:
+        loader.dispose()
+
+
+# codec name -> item iterator
+ITEM_ITERATORS = {
+    'json': iter_json_items,
+    'yaml': iter_yaml_items,
+}
+
+
+def get_item_iterator(codec: Codec):
+    if codec.name not in ITEM_ITERATORS:
+        raise AttributeError(
+            f'Codec [{codec.name}] does not support streaming (supported: {list(ITEM_ITERATORS)})')
+
+    return ITEM_ITERATORS[codec.name]
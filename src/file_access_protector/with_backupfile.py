@@ -1,78 +1,146 @@
 import fcntl
-import json
+import itertools
 import os
-import shutil
-import subprocess
+import stat
+import threading
 import time
+from contextlib import contextmanager
+from functools import wraps
 from typing import Union
 
-import psutil
-import yaml
+from . import checksum, digests, durability, generations, journal, metrics, serializers, stream
+from .cache import MISS
+from .codec import JSON, YAML, Codec, get_codec, load_file, serialize
+from .descriptors import copy_fd
+from .lock import open_locked, release, upgrade
+
+# logging and psutil are imported in the functions using them, so a process
+# only loading json files does not pay their import time
 
 BACKUP_EXT = "_backup"
+LOCK_TIMEOUT = 1  # second, default for calls without `timeout`
+ATOMIC_WRITE = False  # default for dumps without `atomic`
+DURABILITY = durability.DATA  # default for dumps without `durability` ('none', 'data' or 'full')
+# dumps write a checksum file next to the file and its backup, loads skip parsing a file torn by an
+# interrupted dump (failing its pending checksum file) when a backup file passes its own
+CHECKSUM = True
+# keep the previous dumps as generation files (name.gen-K.ext) instead of one backup file: each
+# dump writes a new generation, linked as the file, and the BACKUP_GENERATIONS newest are kept
+# (at least 2; None: backup file). Set it in every process sharing the files
+BACKUP_GENERATIONS = None
+SKIP_UNCHANGED = True  # dumps of the content this process last dumped to the (unmodified) file write nothing
+SLOW_CALL_THRESHOLD = 1  # seconds, locked calls taking longer are logged with system load
+
+# opt-in parsed content cache for loads (cache.LoadCache), dumps in this process write through it
+load_cache = None
+
+# lock held by the current thread inside a wrapped function (used to upgrade it on recovery)
+_lock_context = threading.local()
+
+
+def get_backup_file_path(file_path: str) -> str:
+    """
+    Backup file path of file_path (ex. /path/to/file.json -> /path/to/file_backup.json)
+    """
+
+    file_name = os.path.basename(file_path)
+    last_dot_index = file_name.rfind(".")
+
+    return os.path.dirname(
+        file_path) + "/" + file_name[:last_dot_index] + BACKUP_EXT + file_name[last_dot_index:]
+
+
+def _check_args(load: bool, check_json: bool, args: tuple) -> None:
+    lock_file = args[0]
+
+    if load is True:
+        if not os.path.isfile(lock_file):
+            raise AttributeError(f'Path [{lock_file}] is not a file!')
+    else:
+        # check data to dump
+        if len(args) >= 2 and type(args[1]) != list and type(args[1]) != dict:
+            raise AttributeError(
+                f'Data to dump must be list or dict ({args[1]})!')
+
+    if check_json is True and not lock_file.endswith(".json"):
+        raise AttributeError(
+            f'File name [{os.path.basename(lock_file)}] should have [.json] extension')
+
+
+def call_locked(fn, f, timeout: float, *args, **kwargs):
+    """
+    Call fn while the current thread holds the lock on file object f (None if the file does not exist)
+
+    fn runs as-is (pass a decorated function's __wrapped__), the lock is not released here.
+    """
+
+    if f is not None:
+        _lock_context.file = f
+        _lock_context.fd = f.fileno()
+        _lock_context.file_path = f.name
+        _lock_context.timeout = timeout
+
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _lock_context.file = None
+        _lock_context.fd = None
+
+
+def _report_slow_call(fn_name: str, lock_file: str, fn_time: float, release_time: float, fn_start_time: float) -> None:
+    # logging and psutil are only needed once a call is slow
+    import logging
 
+    logger = logging.getLogger(__name__)
+    if not logger.isEnabledFor(logging.WARNING):
+        return
 
-def get_lock_with_timeout(fd: int, timeout: float):
-    # credit: https://stackoverflow.com/a/70424263
-    # using exclusive lock here
-    rc = subprocess.call(['flock',
-                          '--timeout', str(timeout),
-                          str(fd)],
-                         pass_fds=[fd])
+    import psutil
 
-    if rc != 0:
-        raise TimeoutError(f'Failed to get file lock')
+    logger.warning(
+        '%s(%s) performance -> [func_spent: %ss | lock_release_spent: %ss | func_start: %s | cpu: %s%% | mem: %s%% | disk: %s%%]',
+        fn_name, lock_file, fn_time, release_time, fn_start_time, psutil.cpu_percent(),
+        psutil.virtual_memory().percent, psutil.disk_usage(os.path.dirname(lock_file)).percent)
 
 
-def exclusive_lock(load, check_json):
+def file_lock(load, check_json):
+    """
+    Lock the file (args[0]) around fn: shared lock for loads, exclusive lock for dumps
+    """
     def Inner(fn):
+        @wraps(fn)
         def wrapper_func(*args, **kwargs):
 
             result = None
             lock_file = args[0]
-            timeout = 1  # second
-            file_exist = True
+            timeout = kwargs.pop('timeout', None)
+            if timeout is None:
+                timeout = LOCK_TIMEOUT
 
             fn_start_time = 0
             fn_finish_time = 0
             lock_released_time = 0
 
-            if load is True:
-                if not os.path.isfile(lock_file):
-                    raise AttributeError(f'Path [{lock_file}] is not a file!')
-            else:
-                # check data to dump
-                if len(args) == 2 and type(args[1]) != list and type(args[1]) != dict:
-                    raise AttributeError(
-                        f'Data to dump must be list or dict ({args[1]})!')
-
-            if check_json is True and not lock_file.endswith(".json"):
-                raise AttributeError(
-                    f'File name [{os.path.basename(lock_file)}] should have [.json] extension')
+            _check_args(load, check_json, args)
 
-            try:
-                f = open(lock_file, 'r')
-            except IOError:
-                # file not exist
-                file_exist = False
+            f = open_locked(lock_file, timeout,
+                            fcntl.LOCK_SH if load is True else fcntl.LOCK_EX)
+            file_exist = f is not None
 
             try:
-                if file_exist:
-                    get_lock_with_timeout(f.fileno(), timeout)
-
                 fn_start_time = time.time()
-                result = fn(*args, **kwargs)
+                result = call_locked(fn, f, timeout, *args, **kwargs)
                 fn_finish_time = time.time()
 
             finally:
                 if file_exist:
-                    fcntl.flock(f, fcntl.LOCK_UN)
+                    release(f)
                     lock_released_time = time.time()
-                    f.close()
 
                 fn_time = fn_finish_time - fn_start_time
-                if fn_time > 1:  # fn executed more than 1s
-                    print(f'[{time.time()}] {fn.__name__}({lock_file}) performance -> [func_spent: {fn_time}s | lock_release_spent: {lock_released_time - fn_finish_time}s | func_start: {fn_start_time} | cpu: {psutil.cpu_percent()}% | mem: {psutil.virtual_memory().percent}% | disk: {psutil.disk_usage(os.path.dirname(lock_file)).percent}%]')
+                if fn_time > SLOW_CALL_THRESHOLD:
+                    _report_slow_call(fn.__name__, lock_file, fn_time,
+                                      lock_released_time - fn_finish_time, fn_start_time)
 
             return result
 
@@ -81,161 +149,934 @@ def exclusive_lock(load, check_json):
     return Inner
 
 
-@exclusive_lock(load=True, check_json=True)
-def json_safe_load(file_path: str) -> Union[list, dict]:
+def _sync_from_backup(file_path: str, backup_file_path: str, file_stat: os.stat_result) -> None:
     """
-    Load json file safely
+    Restore the corrupted original file from its backup file
+
+    Loads only hold a shared lock, so it is upgraded to an exclusive one for the copy
+    (once the other readers of this process are done, see lock.upgrade).
+    flock upgrades are not atomic: if the original was rewritten while waiting
+    (stat differs from file_stat), it is no longer corrupted and is left untouched.
+    The upgrade does not pass the writer-preferring gate (lock.lock_fair): a writer queued
+    there waits for our shared lock, so waiting for it at the gate would only time out.
 
     Args:
-        file_path (str): must be absolute path to the json file
+        file_path (str): original file
+        backup_file_path (str): backup file to copy from
+        file_stat (os.stat_result): stat of the original taken before the failed load
     """
 
-    backup_file_path = os.path.dirname(
-        file_path) + "/" + os.path.basename(file_path).replace(".json", f'{BACKUP_EXT}.json')
+    f = getattr(_lock_context, 'file', None)
+
+    if f is not None:
+        try:
+            upgrade(f, _lock_context.timeout)
+        except TimeoutError:
+            print(f'!! can not upgrade lock of [{file_path}], skip syncing from backup file')
+            return
 
     try:
-        with open(file_path, 'r') as f:
-            content = json.load(f)
+        current_stat = os.stat(file_path)
+    except FileNotFoundError:
+        current_stat = None
 
-        if type(content) != list and type(content) != dict:
-            raise ValueError("JSON content is not list or dict!")
+    if file_stat is not None and current_stat is not None \
+            and (current_stat.st_ino, current_stat.st_size, current_stat.st_mtime_ns) \
+            != (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns):
+        print(f'!! file [{file_path}] changed while upgrading lock, skip syncing from backup file')
+        return
 
-    except Exception as e:
-        print(f'!! json load file [{file_path}] failed ({e})')
-        print(f'!! loading backup file [{backup_file_path}]...')
+    if BACKUP_GENERATIONS is None:
+        _copy_file(backup_file_path, file_path, DURABILITY)
+        _copy_checksum(backup_file_path, file_path, DURABILITY)
+        return
 
-        if not os.path.isfile(backup_file_path):
-            raise ValueError(f'Backup file [{backup_file_path}] not found!')
+    # the generation is linked as the file again, no data copy; the newer ones failed validation
+    # and would otherwise outlive the next generations when pruning
+    _promote(backup_file_path, file_path, DURABILITY)
+    generations.remove_newer(file_path, backup_file_path)
+    durability.sync_dir(file_path, DURABILITY)
 
-        with open(backup_file_path, 'r') as f:
-            content = json.load(f)
 
-        if type(content) != list and type(content) != dict:
-            raise ValueError(
-                "JSON content in backup file is not list or dict!")
+def _copy_file(src_path: str, dst_path: str, level: str) -> None:
+    """
+    Copy src_path over dst_path (rewritten in place, like shutil.copy) and sync it (durability level)
 
-        # sync back from backup file
-        shutil.copy(backup_file_path, file_path)
+    The data is cloned or copied by the kernel (descriptors.copy_fd), a locked src_path is
+    read through its locked descriptor.
+    """
 
-        print(f'!! backup file [{backup_file_path}] loaded!')
+    src_fd = _locked_fd(src_path)
+    opened = src_fd is None
+    if opened:
+        src_fd = os.open(src_path, os.O_RDONLY)
 
-    return content
+    try:
+        dst_fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT, 0o666)
+
+        if os.path.sameopenfile(src_fd, dst_fd):
+            # hard link of src_path (ex. crash during an atomic dump), truncating it would lose both
+            os.close(dst_fd)
+            os.remove(dst_path)
+            dst_fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT, 0o666)
+
+        try:
+            copy_fd(src_fd, dst_fd)
+            durability.sync_file(dst_fd, level)
+        finally:
+            os.close(dst_fd)
+    finally:
+        if opened:
+            os.close(src_fd)
 
 
-@exclusive_lock(load=False, check_json=True)
-def json_safe_dump(file_path: str, data: Union[list, dict]) -> None:
+def _open_temp_file(file_path: str, like_file_path: str = None) -> tuple:
     """
-    Dump data to json file safely (indent = 4)
+    (fd, path) of a new temp file in the directory of file_path, to be renamed (or linked) over it
+
+    It gets the mode of file_path, and its owner where allowed. If file_path does not exist, it
+    gets the mode of a file created by open() (0o666 without the umask bits), not the 0o600 of
+    tempfile.mkstemp.
 
     Args:
-        file_path (str): must be absolute path to the json file
-        data (Union[list, dict]): data to dump
+        like_file_path (str, optional): file to take the mode and owner of instead of file_path
     """
 
-    backup_file_path = os.path.dirname(
-        file_path) + "/" + os.path.basename(file_path).replace(".json", f'{BACKUP_EXT}.json')
+    tmp_file_path = os.path.join(os.path.dirname(file_path),
+                                 f'.{os.path.basename(file_path)}.{os.getpid()}.{threading.get_ident()}.tmp')
 
-    if not os.path.isfile(file_path):
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=4)
+    try:
+        file_stat = os.stat(like_file_path or file_path)
+    except FileNotFoundError:
+        file_stat = None
+
+    # left by a crash of a process with the same pid
+    _remove_file(tmp_file_path)
+
+    fd = os.open(tmp_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+
+    try:
+        if file_stat is not None:
+            os.fchmod(fd, stat.S_IMODE(file_stat.st_mode))
+
+            if (file_stat.st_uid, file_stat.st_gid) != (os.geteuid(), os.getegid()):
+                try:
+                    os.fchown(fd, file_stat.st_uid, file_stat.st_gid)
+                except PermissionError:
+                    # not the owner's process (nor root): keep ours
+                    pass
+    except BaseException:
+        os.close(fd)
+        os.remove(tmp_file_path)
+        raise
+
+    return fd, tmp_file_path
+
+
+def _write_file_atomic(file_path: str, payload: bytes, level: str, like_file_path: str = None) -> os.stat_result:
+    """
+    Write payload to a temp file in the same directory, sync it (durability level) and rename it over file_path
+
+    The file keeps the mode and owner of file_path, or takes those of like_file_path (see _open_temp_file).
+
+    Returns the stat of the written file, taken before the rename: once renamed, file_path is a
+    new inode that the caller's lock may not cover (another process can replace it right away).
+    """
+
+    fd, tmp_file_path = _open_temp_file(file_path, like_file_path)
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            durability.sync_file(f.fileno(), level)
+            file_stat = os.fstat(f.fileno())
+
+        os.replace(tmp_file_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_file_path):
+            os.remove(tmp_file_path)
+        raise
+
+    return file_stat
 
-        # create backup file
-        shutil.copy(file_path, backup_file_path)
 
+def _create_file_exclusive(file_path: str, payload: bytes, level: str) -> None:
+    """
+    Create file_path with payload in one step, do nothing if it already exists
+    """
+
+    fd, tmp_file_path = _open_temp_file(file_path)
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            durability.sync_file(f.fileno(), level)
+
+        os.link(tmp_file_path, file_path)
+    except FileExistsError:
+        pass
     else:
-        with open(file_path, 'r') as f:
-            content = json.load(f)
+        # left by a removed file, it does not describe the new one
+        _remove_file(checksum.get_checksum_file_path(file_path))
+    finally:
+        os.remove(tmp_file_path)
 
-        if type(content) != list and type(content) != dict:
-            raise ValueError("Original file content is not list or dict!")
+    durability.sync_dir(file_path, level)
+
+
+def _link_file_atomic(file_path: str, link_path: str, level: str) -> None:
+    """
+    Make link_path a hard link of file_path (atomically replacing it), copy if links are unsupported
+    """
+
+    tmp_link_path = f'{link_path}.{os.getpid()}.{threading.get_ident()}.tmp'
 
+    try:
+        os.link(file_path, tmp_link_path)
+    except OSError:
+        # e.g. filesystem without hard link support
+        _copy_file(file_path, tmp_link_path, level)
+
+    try:
+        os.replace(tmp_link_path, link_path)
+    except BaseException:
+        os.remove(tmp_link_path)
+        raise
+
+
+def _remove_file(file_path: str) -> None:
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_checksum(file_path: str, payload: bytes, generation: int, level: str, atomic: bool = False,
+                    pending: bool = False) -> None:
+    """
+    Write the checksum file of file_path, just written with payload (remove it if generation is None)
+
+    A pending one is written before payload, see checksum.is_pending.
+    """
+
+    checksum_file_path = checksum.get_checksum_file_path(file_path)
+
+    if generation is None:
+        # checksums are disabled, a stale one would fail the verification of the new content
+        _remove_file(checksum_file_path)
+    elif atomic is True:
+        _write_file_atomic(checksum_file_path, checksum.format_record(payload, generation, pending), level)
+    else:
+        _write_file(checksum_file_path, checksum.format_record(payload, generation, pending), level)
+
+
+def _copy_checksum(src_path: str, dst_path: str, level: str, link: bool = False) -> None:
+    """
+    Give dst_path, just copied (or linked) from src_path, the checksum file of src_path
+    """
+
+    src_checksum_file_path = checksum.get_checksum_file_path(src_path)
+    dst_checksum_file_path = checksum.get_checksum_file_path(dst_path)
+
+    if not os.path.isfile(src_checksum_file_path):
+        _remove_file(dst_checksum_file_path)
+    elif link is True:
+        _link_file_atomic(src_checksum_file_path, dst_checksum_file_path, level)
+    else:
+        _copy_file(src_checksum_file_path, dst_checksum_file_path, level)
+
+
+def _atomic_dump(file_path: str, backup_file_path: str, payload: bytes, generation: int, level: str) -> tuple:
+    """
+    Replace file_path with payload in one data pass, keeping the previous generation as backup
+
+    The original is never truncated in place, so a crash leaves either the old or the new
+    file and the backup does not need to be re-validated by parsing.
+    Returns the stats of the written file and backup file (see _write_file_atomic).
+    """
+
+    if os.path.isfile(file_path):
+        # previous generation becomes the backup, no data copy
+        backup_stat = os.stat(file_path)
+        _link_file_atomic(file_path, backup_file_path, level)
+        _copy_checksum(file_path, backup_file_path, durability.NONE, link=True)
+
+        # renamed before the file: if only the checksum file is renamed (crash), the old (intact)
+        # file fails it and is parsed, as a file modified since its dump
+        _write_checksum(file_path, payload, generation, durability.NONE, atomic=True)
+        file_stat = _write_file_atomic(file_path, payload, level)
+
+    else:
+        _write_checksum(file_path, payload, generation, durability.NONE, atomic=True)
+        file_stat = _write_file_atomic(file_path, payload, level)
+
+        # create backup file (own inode, so in-place dumps never write through a shared link)
+        _write_checksum(backup_file_path, payload, generation, durability.NONE, atomic=True)
+        backup_stat = _write_file_atomic(backup_file_path, payload, level)
+
+    # both renames at once
+    durability.sync_dir(file_path, level)
+
+    return file_stat, backup_stat
+
+
+def _promote(generation_file_path: str, file_path: str, level: str) -> None:
+    """
+    Make file_path (and its checksum file) a hard link of generation_file_path, atomically
+    """
+
+    # checksum file first, as in atomic dumps
+    _copy_checksum(generation_file_path, file_path, durability.NONE, link=True)
+    _link_file_atomic(generation_file_path, file_path, level)
+
+
+def _generation_dump(file_path: str, payload: bytes, level: str) -> os.stat_result:
+    """
+    Write payload as a new generation file of file_path and link it as file_path
+
+    Each generation is written once and never modified, the previous ones are the backups.
+    Generations past BACKUP_GENERATIONS are pruned by a background thread.
+    Returns the stat of the generation file (see _write_file_atomic).
+    """
+
+    if BACKUP_GENERATIONS < 2:
+        raise AttributeError(f'Backup generations must be at least 2 ({BACKUP_GENERATIONS})!')
+
+    generation = generations.next_generation(file_path)
+    generation_file_path = generations.get_generation_file_path(file_path, generation)
+
+    # own inode, a generation file left with this number (ex. failing validation) is not written through;
+    # linked as file_path, it keeps the mode of file_path
+    file_stat = _write_file_atomic(generation_file_path, payload, level, file_path)
+    # not synced: a generation file without its checksum is only parsed to be validated
+    _write_checksum(generation_file_path, payload, generation if CHECKSUM else None, durability.NONE)
+
+    _promote(generation_file_path, file_path, level)
+    durability.sync_dir(file_path, level)
+
+    generations.prune_later(file_path, BACKUP_GENERATIONS)
+
+    return file_stat
+
+
+def _durability_level(level: str = None) -> str:
+    return durability.check(DURABILITY if level is None else level)
+
+
+def _write_payload(file_path: str, backup_file_path: str, payload: bytes, atomic: bool = None,
+                   level: str = None) -> tuple:
+    """
+    Write serialized payload to file_path and keep backup_file_path in sync
+
+    The original file is expected to be already validated (not corrupted) by the caller.
+    payload is written to both files, the original is never read back to update the backup.
+    With level 'data' or 'full', the backup file is on disk before the original is truncated,
+    and the original before the backup file is rewritten.
+    The original is rewritten between a pending checksum file and a done one (CHECKSUM): a crash
+    in between leaves it failing the pending one, so loads fall back to the backup file without
+    parsing it. Only the pending checksum file is synced: a lost done one leaves the file passing
+    the pending one, a lost (or torn) one makes loads parse the file as before.
+    Returns the stats of the written file and backup file, taken from the written descriptors.
+    """
+
+    if atomic is None:
+        atomic = ATOMIC_WRITE
+    level = _durability_level(level)
+
+    if BACKUP_GENERATIONS is not None:
+        file_stat = _generation_dump(file_path, payload, level)
+        return file_stat, file_stat
+
+    generation = checksum.get_generation(file_path) + 1 if CHECKSUM else None
+
+    if atomic is True:
+        return _atomic_dump(file_path, backup_file_path, payload, generation, level)
+
+    if not os.path.isfile(file_path):
+        file_stat = _write_file_checked(file_path, payload, generation, level)
+
+        # create backup file
+        backup_stat = _write_file(backup_file_path, payload, level)
+        _write_checksum(backup_file_path, payload, generation, durability.NONE)
+
+    else:
         # make sure backup file synced with latest original file, in case dump fails
-        shutil.copy(file_path, backup_file_path)
+        _copy_file(file_path, backup_file_path, level)
+        _copy_checksum(file_path, backup_file_path, durability.NONE)
 
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=4)
+        file_stat = _write_file_checked(file_path, payload, generation, level)
 
         # sync changes to backup file
-        shutil.copy(file_path, backup_file_path)
+        backup_stat = _write_file(backup_file_path, payload, level)
+        _write_checksum(backup_file_path, payload, generation, durability.NONE)
+
+    durability.sync_dir(file_path, level)
+
+    return file_stat, backup_stat
+
+
+def _write_file(file_path: str, payload: bytes, level: str) -> os.stat_result:
+    with open(file_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        durability.sync_file(f.fileno(), level)
 
+        return os.fstat(f.fileno())
 
-@exclusive_lock(load=True, check_json=False)
-def yaml_safe_load(file_path: str) -> Union[list, dict]:
+
+def _write_file_checked(file_path: str, payload: bytes, generation: int, level: str) -> os.stat_result:
+    """
+    Rewrite file_path in place with payload, between its pending and done checksum files
     """
-    Load yaml file safely
 
-    Args:
-        file_path (str): must be absolute path to the yaml file
+    _write_checksum(file_path, payload, generation, level, pending=True)
+    file_stat = _write_file(file_path, payload, level)
+
+    if generation is not None:
+        _write_checksum(file_path, payload, generation, durability.NONE)
+
+    return file_stat
+
+
+def _update_load_cache(file_path: str, file_stat: os.stat_result, parse) -> None:
     """
+    Write-through the content just dumped to file_path (parse() returns it as a load would)
 
-    file_name = os.path.basename(file_path)
-    last_dot_index = file_name.rfind(".")
-    backup_file_path = os.path.dirname(
-        file_path) + "/" + file_name[:last_dot_index] + BACKUP_EXT + file_name[last_dot_index:]
+    file_stat is the stat of the written file (see _write_payload), not of the path: after an
+    atomic dump it may already name a file written by another process.
+    """
 
-    try:
-        with open(file_path, 'r') as f:
-            content = yaml.load(f, Loader=yaml.CLoader)
+    if load_cache is not None:
+        # parsed for the cache only, kept as is (not pickled for 'copy')
+        load_cache.put(file_path, file_stat, parse(), 'shared')
 
-        if type(content) != list and type(content) != dict:
-            raise ValueError("YAML content is not list or dict!")
 
-    except Exception as e:
-        print(f'!! yaml load file [{file_path}] failed ({e})')
+def _locked_fd(file_path: str) -> int:
+    # descriptor of file_path locked by the current thread, None if it holds no lock on it
+    fd = getattr(_lock_context, 'fd', None)
+    if fd is not None and _lock_context.file_path != file_path:
+        fd = None
+
+    return fd
+
+
+def _read_content(file_path: str, codec: Codec):
+    # the locked file is read through its locked descriptor (pread), not reopened
+    return load_file(file_path, codec, _locked_fd(file_path))
+
+
+def _is_torn(file_path: str, fd: int = None) -> bool:
+    """
+    Whether file_path fails its pending checksum file, left by an interrupted dump (see checksum.is_pending)
+    """
+
+    return CHECKSUM and checksum.is_pending(file_path) and checksum.verify(file_path, fd) is False
+
+
+def _get_backup_file_paths(file_path: str, file_stat: os.stat_result):
+    """
+    (path, checksum verified) of the backup files of file_path to recover from, best first
+
+    The backup file, or with BACKUP_GENERATIONS the generation files from the newest, without
+    the one sharing the inode of the (corrupted) file.
+    """
+
+    if BACKUP_GENERATIONS is None:
+        backup_file_path = get_backup_file_path(file_path)
+        yield backup_file_path, checksum.verify(backup_file_path) if CHECKSUM else None
+        return
+
+    for _, generation_file_path in generations.list_generations(file_path):
+        try:
+            generation_stat = os.stat(generation_file_path)
+        except FileNotFoundError:
+            # pruned meanwhile
+            continue
+
+        if file_stat is not None and (generation_stat.st_dev, generation_stat.st_ino) \
+                == (file_stat.st_dev, file_stat.st_ino):
+            continue
+
+        yield generation_file_path, checksum.verify(generation_file_path) if CHECKSUM else None
+
+
+def _load_backup(file_path: str, codec: Codec, file_stat: os.stat_result, verified_file_path: str = None) -> tuple:
+    """
+    (content, path) of the first backup file of file_path holding a list or dict
+
+    Args:
+        verified_file_path (str, optional): backup file already verified by its checksum, tried first
+    """
+
+    error = None
+    backup_file_paths = _get_backup_file_paths(file_path, file_stat)
+    if verified_file_path is not None:
+        backup_file_paths = itertools.chain([(verified_file_path, True)], backup_file_paths)
+
+    for backup_file_path, _ in backup_file_paths:
         print(f'!! loading backup file [{backup_file_path}]...')
 
         if not os.path.isfile(backup_file_path):
-            raise ValueError(f'Backup file [{backup_file_path}] not found!')
+            error = ValueError(f'Backup file [{backup_file_path}] not found!')
+            continue
+
+        try:
+            content = _read_content(backup_file_path, codec)
+        except Exception as e:
+            error = e
+            continue
+
+        if type(content) != list and type(content) != dict:
+            error = ValueError(f'{codec.name.upper()} content in backup file is not list or dict!')
+            continue
+
+        return content, backup_file_path
+
+    raise error or ValueError(f'No backup file of [{file_path}] found!')
+
+
+def _load(file_path: str, codec: Codec, cache_mode: str = None) -> Union[list, dict]:
+    """
+    Load file_path with codec, fall back to (and restore from) the backup file if it is corrupted
+    """
+
+    file_stat = None
+    verified_backup_file_path = None
+
+    # cached content does not include journal records
+    journaled = os.path.isfile(journal.get_journal_file_path(file_path))
+    use_cache = load_cache is not None and not journaled
+
+    try:
+        file_stat = os.stat(file_path)
+        if use_cache:
+            content = load_cache.get(file_path, file_stat, cache_mode)
+            if content is not MISS:
+                return content
+
+        # a torn file is not parsed when a backup file passes its own
+        if _is_torn(file_path, _locked_fd(file_path)):
+            verified_backup_file_path = next(
+                (path for path, verified in _get_backup_file_paths(file_path, file_stat) if verified), None)
+
+            if verified_backup_file_path is not None:
+                raise ValueError('content does not match its checksum')
 
-        with open(backup_file_path, 'r') as f:
-            content = yaml.load(f, Loader=yaml.CLoader)
+        content = _read_content(file_path, codec)
 
         if type(content) != list and type(content) != dict:
-            raise ValueError(
-                "YAML content in backup file is not list or dict!")
+            raise ValueError(f'{codec.name.upper()} content is not list or dict!')
+
+        if journaled:
+            content = journal.replay(file_path, content, file_stat)
+
+    except Exception as e:
+        print(f'!! {codec.name} load file [{file_path}] failed ({e})')
+
+        content, backup_file_path = _load_backup(file_path, codec, file_stat, verified_backup_file_path)
 
         # sync back from backup file
-        shutil.copy(backup_file_path, file_path)
+        _sync_from_backup(file_path, backup_file_path, file_stat)
+
+        if metrics.enabled:
+            metrics.increment('backup_recoveries_total', codec=codec.name)
 
         print(f'!! backup file [{backup_file_path}] loaded!')
 
+    else:
+        if use_cache:
+            content = load_cache.put(file_path, file_stat, content, cache_mode)
+
     return content
 
 
-@exclusive_lock(load=False, check_json=False)
-def yaml_safe_dump(file_path: str, data: Union[list, dict]) -> None:
+def _dump(file_path: str, payload: bytes, codec: Codec, atomic: bool = None, validate: bool = True,
+          level: str = None) -> None:
+    """
+    Write payload (serialized by codec) to file_path, keeping the backup file in sync
+
+    Nothing is written if file_path already holds payload from a previous dump (SKIP_UNCHANGED).
+
+    Args:
+        validate (bool): make sure the current file is not corrupted before it is mirrored to
+            the backup file (not needed for atomic or generation dumps, or if the caller just loaded it)
+        level (str): durability level (default: DURABILITY)
+    """
+
+    # with generations the file is a link of its newest generation, nothing else to compare
+    backup_file_path = get_backup_file_path(file_path) if BACKUP_GENERATIONS is None else file_path
+
+    if atomic is None:
+        atomic = ATOMIC_WRITE
+
+    payload_digest = None
+    # journal records (if any) are not in the file, the dump must supersede them
+    if SKIP_UNCHANGED and not os.path.isfile(journal.get_journal_file_path(file_path)):
+        payload_digest = digests.digest(payload)
+
+        if digests.is_unchanged(file_path, backup_file_path, payload_digest, _locked_fd(file_path)):
+            if metrics.enabled:
+                metrics.increment('skipped_writes_total', codec=codec.name)
+            return
+
+    if validate is True and atomic is not True and BACKUP_GENERATIONS is None and os.path.isfile(file_path):
+        content = _read_content(file_path, codec)
+
+        if type(content) != list and type(content) != dict:
+            raise ValueError("Original file content is not list or dict!")
+
+    file_stat, backup_stat = _write_payload(file_path, backup_file_path, payload, atomic, level)
+
+    if SKIP_UNCHANGED:
+        digests.remember(file_path, file_stat, backup_stat, payload_digest or digests.digest(payload))
+
+    if metrics.enabled:
+        metrics.increment('written_bytes_total', len(payload), codec=codec.name)
+
+    # journal records (if any) are in payload or superseded by it
+    journal.discard(file_path)
+
+    _update_load_cache(file_path, file_stat, lambda: codec.loads(payload))
+
+
+@file_lock(load=True, check_json=False)
+def safe_load(file_path: str, codec: Union[Codec, str] = None, cache_mode: str = None) -> Union[list, dict]:
+    """
+    Load file of any registered format safely
+
+    Args:
+        file_path (str): must be absolute path to the file
+        codec (Union[Codec, str], optional): codec or its name (default: by file extension)
+        cache_mode (str, optional): 'copy', 'frozen' or 'shared', how content is returned from
+            load_cache when it is enabled (default: load_cache.mode)
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
+    """
+
+    return _load(file_path, get_codec(codec, file_path), cache_mode)
+
+
+@file_lock(load=False, check_json=False)
+def safe_dump(file_path: str, data: Union[list, dict], codec: Union[Codec, str] = None, atomic: bool = None,
+              durability: str = None) -> None:
+    """
+    Dump data to file of any registered format safely
+
+    Args:
+        file_path (str): must be absolute path to the file
+        data (Union[list, dict]): data to dump
+        codec (Union[Codec, str], optional): codec or its name (default: by file extension)
+        atomic (bool, optional): write a temp file and rename it over the original, keeping the
+            previous generation as backup file (default: ATOMIC_WRITE)
+        durability (str, optional): 'none', 'data' or 'full', see durability.py (default: DURABILITY)
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
+    """
+
+    codec = get_codec(codec, file_path)
+
+    _dump(file_path, serialize(codec, data), codec, atomic, level=durability)
+
+
+@file_lock(load=True, check_json=True)
+def json_safe_load(file_path: str, cache_mode: str = None) -> Union[list, dict]:
+    """
+    Load json file safely
+
+    Args:
+        file_path (str): must be absolute path to the json file
+        cache_mode (str, optional): 'copy', 'frozen' or 'shared', how content is returned from
+            load_cache when it is enabled (default: load_cache.mode)
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
+    """
+
+    return _load(file_path, JSON, cache_mode)
+
+
+@file_lock(load=False, check_json=True)
+def json_safe_dump(file_path: str, data: Union[list, dict], atomic: bool = None, backend: str = None,
+                   durability: str = None) -> None:
+    """
+    Dump data to json file safely (indent = 4, 2 with orjson)
+
+    Args:
+        file_path (str): must be absolute path to the json file
+        data (Union[list, dict]): data to dump
+        atomic (bool, optional): write a temp file and rename it over the original, keeping the
+            previous generation as backup file (default: ATOMIC_WRITE)
+        durability (str, optional): 'none', 'data' or 'full', see durability.py (default: DURABILITY)
+        backend (str, optional): 'orjson', 'ujson' or 'json' (default: serializers.get_default_backend())
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
+    """
+
+    _dump(file_path, serialize(JSON, data, lambda obj: serializers.dumps(obj, backend)), JSON, atomic, level=durability)
+
+
+@file_lock(load=True, check_json=False)
+def yaml_safe_load(file_path: str, cache_mode: str = None) -> Union[list, dict]:
+    """
+    Load yaml file safely
+
+    Args:
+        file_path (str): must be absolute path to the yaml file
+        cache_mode (str, optional): 'copy', 'frozen' or 'shared', how content is returned from
+            load_cache when it is enabled (default: load_cache.mode)
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
+    """
+
+    return _load(file_path, YAML, cache_mode)
+
+
+@file_lock(load=False, check_json=False)
+def yaml_safe_dump(file_path: str, data: Union[list, dict], atomic: bool = None, durability: str = None) -> None:
     """
     Dump data to yaml file safely (indent = 4)
 
     Args:
         file_path (str): must be absolute path to the yaml file
         data (_type_): data to dump
+        atomic (bool, optional): write a temp file and rename it over the original, keeping the
+            previous generation as backup file (default: ATOMIC_WRITE)
+        durability (str, optional): 'none', 'data' or 'full', see durability.py (default: DURABILITY)
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
     """
 
-    file_name = os.path.basename(file_path)
-    last_dot_index = file_name.rfind(".")
-    backup_file_path = os.path.dirname(
-        file_path) + "/" + file_name[:last_dot_index] + BACKUP_EXT + file_name[last_dot_index:]
+    _dump(file_path, serialize(YAML, data), YAML, atomic, level=durability)
 
-    if not os.path.isfile(file_path):
-        with open(file_path, 'w') as f:
-            yaml.dump(data, f, Dumper=yaml.CDumper, sort_keys=False, indent=4)
 
-        # create backup file
-        shutil.copy(file_path, backup_file_path)
+def _iter_backup_items(f, file_path: str, codec: Codec, iter_items, timeout: float, file_stat: os.stat_result,
+                       backup_file_path: str, yielded_count: int):
+    """
+    Yield the items of backup_file_path but the yielded_count first ones, then restore locked file f from it
+    """
 
-    else:
-        with open(file_path, 'r') as f:
-            content = yaml.load(f, Loader=yaml.CLoader)
+    if backup_file_path is None:
+        raise ValueError(f'No backup file of [{file_path}] found!')
+
+    print(f'!! loading backup file [{backup_file_path}]...')
+
+    if not os.path.isfile(backup_file_path):
+        raise ValueError(f'Backup file [{backup_file_path}] not found!')
+
+    with open(backup_file_path, 'rb') as backup_f:
+        items = iter_items(backup_f)
+
+        # skip the items already yielded from the original file
+        for _ in itertools.islice(items, yielded_count):
+            pass
+
+        yield from items
+
+    # sync back from backup file (fully parsed, so it is valid)
+    call_locked(_sync_from_backup, f, timeout, file_path, backup_file_path, file_stat)
+
+    if metrics.enabled:
+        metrics.increment('backup_recoveries_total', codec=codec.name)
+
+    print(f'!! backup file [{backup_file_path}] loaded!')
+
+
+def _iter_items(f, file_path: str, codec: Codec, iter_items, timeout: float):
+    """
+    Yield the items of locked binary file f, continue from the backup file if it is corrupted partway
+
+    Yielded items can not be taken back, so a file failing its checksum is not streamed as is:
+    a torn one (see _is_torn) is streamed from a backup file passing its own, others (ex. edited
+    by hand) are parsed through once first and streamed from the backup file if that fails.
+    """
+
+    file_stat = os.fstat(f.fileno())
+
+    if CHECKSUM and checksum.verify(file_path, f.fileno()) is False:
+        backup_file_path = None
+
+        if checksum.is_pending(file_path):
+            backup_file_path = next(
+                (path for path, verified in _get_backup_file_paths(file_path, file_stat) if verified), None)
+
+        if backup_file_path is None:
+            try:
+                for _ in iter_items(f):
+                    pass
+            except Exception as e:
+                print(f'!! {codec.name} iterate file [{file_path}] failed ({e})')
+                backup_file_path, _ = next(_get_backup_file_paths(file_path, file_stat), (None, None))
+
+                yield from _iter_backup_items(f, file_path, codec, iter_items, timeout, file_stat, backup_file_path, 0)
+                return
+
+            f.seek(0)
+
+        else:
+            print(f'!! {codec.name} iterate file [{file_path}] failed (content does not match its checksum)')
+
+            yield from _iter_backup_items(f, file_path, codec, iter_items, timeout, file_stat, backup_file_path, 0)
+            return
+
+    yielded_count = 0
+
+    try:
+        for item in iter_items(f):
+            yield item
+            yielded_count += 1
+
+    except Exception as e:
+        print(f'!! {codec.name} iterate file [{file_path}] failed after {yielded_count} items ({e})')
+
+        backup_file_path, _ = next(_get_backup_file_paths(file_path, file_stat), (None, None))
+
+        yield from _iter_backup_items(f, file_path, codec, iter_items, timeout, file_stat, backup_file_path,
+                                      yielded_count)
+
+
+def iter_load(file_path: str, codec: Union[Codec, str] = None, timeout: float = None):
+    """
+    Iterate over a large json/yaml file without loading it whole
+
+    Yields the elements of a top-level list, or (key, value) of a top-level dict, parsed one
+    at a time. The shared lock is taken on the first item and held until the iterator is
+    exhausted or closed, so consume it promptly (or wrap it in contextlib.closing).
+    If the file turns out to be corrupted partway, iteration continues from the backup file
+    (skipping the items already yielded) and the file is restored from it, same as
+    json_safe_load. A file failing its checksum (CHECKSUM) is checked before the first item,
+    so the items of a corrupted file and of its backup file are never mixed.
+    Journaled files (see journal_update) are loaded whole.
+
+        for record in iter_load('/path/to/records.json'):
+            ...
+
+    Args:
+        file_path (str): must be absolute path to the file
+        codec (Union[Codec, str], optional): 'json' or 'yaml' codec or its name (default: by file extension)
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
+    """
+
+    if timeout is None:
+        timeout = LOCK_TIMEOUT
+
+    codec = get_codec(codec, file_path)
+    iter_items = stream.get_item_iterator(codec)
+
+    f = open_locked(file_path, timeout, fcntl.LOCK_SH, 'rb')
+
+    if f is None:
+        raise AttributeError(f'Path [{file_path}] is not a file!')
+
+    try:
+        if os.path.isfile(journal.get_journal_file_path(file_path)):
+            content = call_locked(_load, f, timeout, file_path, codec)
+            yield from content.items() if type(content) == dict else content
+
+        else:
+            yield from _iter_items(f, file_path, codec, iter_items, timeout)
+
+    finally:
+        release(f)
+
+
+@contextmanager
+def locked_update(file_path: str, default: Union[list, dict] = None, atomic: bool = None,
+                  timeout: float = None, codec: Union[Codec, str] = None, durability: str = None):
+    """
+    Load a file, let the caller modify it and dump it back under one exclusive lock
+
+    The file is parsed once (the dump does not re-read it) and other processes can not
+    interleave a write between the load and the dump. Nothing is written if the block raises.
+
+        with locked_update('/path/to/file.json') as data:
+            data['key'] = 'value'
+
+    Args:
+        file_path (str): must be absolute path to the file
+        default (Union[list, dict], optional): content to start from if the file does not exist
+        atomic (bool, optional): same as safe_dump (default: ATOMIC_WRITE)
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
+        codec (Union[Codec, str], optional): codec or its name (default: by file extension)
+        durability (str, optional): same as safe_dump (default: DURABILITY)
+    """
+
+    if timeout is None:
+        timeout = LOCK_TIMEOUT
+
+    codec = get_codec(codec, file_path)
+    level = _durability_level(durability)
+
+    f = open_locked(file_path, timeout, fcntl.LOCK_EX)
+
+    if f is None and default is not None:
+        # create the file from default (unless another caller just did), then lock it like an existing one
+        _create_file_exclusive(file_path, serialize(codec, default), level)
+        f = open_locked(file_path, timeout, fcntl.LOCK_EX)
+
+    if f is None:
+        raise AttributeError(f'Path [{file_path}] is not a file!')
+
+    try:
+        content = call_locked(_load, f, timeout, file_path, codec, cache_mode='copy')
+
+        yield content
 
         if type(content) != list and type(content) != dict:
-            raise ValueError("Original file content is not list or dict!")
+            raise AttributeError(f'Data to dump must be list or dict ({content})!')
 
-        # make sure backup file synced with latest original file, in case dump fails
-        shutil.copy(file_path, backup_file_path)
+        _dump(file_path, serialize(codec, content), codec, atomic, validate=False, level=level)
 
-        with open(file_path, 'w') as f:
-            yaml.dump(data, f, Dumper=yaml.CDumper, sort_keys=False, indent=4)
+    finally:
+        release(f)
 
-        # sync changes to backup file
-        shutil.copy(file_path, backup_file_path)
+
+def journal_update(file_path: str, patch: dict, codec: Union[Codec, str] = None, atomic: bool = None,
+                   timeout: float = None, max_records: int = None, max_bytes: int = None,
+                   durability: str = None) -> None:
+    """
+    Update a dict-shaped file by appending a patch record to its journal instead of rewriting it
+
+    The patch is a JSON merge patch (RFC 7386): nested dicts are merged, None deletes a key.
+    Records are appended as JSON lines to `<file>.journal` (synced once per durability), and loads replay
+    them on top of the file (snapshot). Once the journal passes max_records or max_bytes it
+    is compacted: the merged content is dumped as a new snapshot (keeping the backup file as
+    recovery point) and the journal is dropped.
+
+    Args:
+        file_path (str): must be absolute path to the file (created as {} if it does not exist)
+        patch (dict): merge patch to apply
+        codec (Union[Codec, str], optional): codec of the snapshot (default: by file extension)
+        atomic (bool, optional): same as safe_dump, for compaction (default: ATOMIC_WRITE)
+        timeout (float, optional): seconds to wait for the file lock (default: LOCK_TIMEOUT)
+        max_records (int, optional): compaction threshold (default: journal.JOURNAL_MAX_RECORDS)
+        max_bytes (int, optional): compaction threshold (default: journal.JOURNAL_MAX_BYTES)
+        durability (str, optional): same as safe_dump, for the record and compaction (default: DURABILITY)
+    """
+
+    if type(patch) != dict:
+        raise AttributeError(f'Patch must be dict ({patch})!')
+
+    if timeout is None:
+        timeout = LOCK_TIMEOUT
+    if max_records is None:
+        max_records = journal.JOURNAL_MAX_RECORDS
+    if max_bytes is None:
+        max_bytes = journal.JOURNAL_MAX_BYTES
+
+    codec = get_codec(codec, file_path)
+    level = _durability_level(durability)
+
+    f = open_locked(file_path, timeout, fcntl.LOCK_EX)
+
+    if f is None:
+        _create_file_exclusive(file_path, serialize(codec, {}), level)
+        f = open_locked(file_path, timeout, fcntl.LOCK_EX)
+
+    try:
+        record_count, journal_size = journal.append(file_path, patch, os.fstat(f.fileno()), level)
+
+        if record_count >= max_records or journal_size >= max_bytes:
+            content = call_locked(_load, f, timeout, file_path, codec)
+
+            if type(content) != dict:
+                raise ValueError(f'Journal needs dict content, file [{file_path}] is {type(content).__name__}')
+
+            _dump(file_path, serialize(codec, content), codec, atomic, validate=False, level=level)
+
+    finally:
+        release(f)
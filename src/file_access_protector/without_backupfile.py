@@ -1,72 +1,170 @@
 import fcntl
-import json
-import time
-import yaml
+import os
+import threading
 
+from contextlib import contextmanager
 from functools import wraps
 
+from . import durability, metrics, serializers
+from .cache import MISS
+from .codec import JSON, YAML, get_codec, load_file, serialize
+from .descriptors import rewrite
+from .lock import WaitStrategy, open_locked, release
+
+# opt-in parsed content cache for reads (cache.LoadCache), writes in this process write through it
+load_cache = None
+
+# locked descriptor of the current thread inside a wrapped function
+_lock_context = threading.local()
+
+# default for writes without `durability`: 'none' (page cache), 'data' (fdatasync) or 'full' (fsync)
+DURABILITY = durability.NONE
+
+# how file_lock waits for a contended lock (1 second deadline, backoff with jitter)
+LOCK_WAIT = WaitStrategy(timeout=1.0)
+
+def _open_locked(file_path, lock_type, wait, create=None):
+    # a pooled descriptor (see descriptors), only writes create a missing file (unless create=False)
+    if create is None:
+        create = lock_type == fcntl.LOCK_EX
+
+    try:
+        return open_locked(file_path, wait.timeout, lock_type, 'a+' if create else 'r', wait)
+    except TimeoutError:
+        raise RuntimeError(f"Failed to get lock of file [{file_path}]")
+
+def _pop_wait(kwargs):
+    # per call: wait=WaitStrategy(...) and/or timeout=seconds
+    wait = kwargs.pop('wait', None) or LOCK_WAIT
+    timeout = kwargs.pop('timeout', None)
+    
+    return wait if timeout is None else wait.with_timeout(timeout)
+
 def file_lock(lock_type=fcntl.LOCK_EX):
     def decorator(fn):
         @wraps(fn)
         def wrapepr_func(*args, **kwargs):
             
             lock_file = args[0]
-            retry_count = 0
-            max_retry = 20
-            wait_time = 0.05
-            gain_lock = False
             result = None
+            wait = _pop_wait(kwargs)
             
-            fd = open(lock_file, 'a+')
+            f = _open_locked(lock_file, lock_type, wait)
             
             try:
-                while retry_count < max_retry:
-                    try:
-                        fcntl.flock(fd, lock_type | fcntl.LOCK_NB)
-                        gain_lock = True
-                        result = fn(*args, **kwargs)
-                        break
-                    except IOError:
-                        retry_count += 1
-                        print(f'!! Can not get lock for file [{lock_file}]! retrying [{retry_count}/{max_retry}]')
-                        time.sleep(wait_time)
-                    except Exception as e:
-                        print(f'!! Error in file lock func: {e}')
-                        break
-                
-                if gain_lock == False:
-                    raise RuntimeError(f"Failed to get lock of file [{lock_file}]")
+                _lock_context.fd = f.fileno() if f is not None else None
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                print(f'!! Error in file lock func: {e}')
             finally:
-                try:
-                    fcntl.flock(fd, fcntl.LOCK_UN)
-                except IOError:
-                    pass
-                fd.close()
+                _lock_context.fd = None
+                if f is not None:
+                    release(f)
             
             return result
         return wrapepr_func
     return decorator
 
+def _read_content(file_path, codec):
+    # read through the locked descriptor (pread from offset 0), not reopened
+    return load_file(file_path, codec, getattr(_lock_context, 'fd', None))
+
+def _cached_read(file_path, codec, cache_mode):
+    if load_cache is None:
+        return _read_content(file_path, codec)
+
+    file_stat = os.stat(file_path)
+    content = load_cache.get(file_path, file_stat, cache_mode)
+    if content is not MISS:
+        return content
+
+    content = _read_content(file_path, codec)
+
+    return load_cache.put(file_path, file_stat, content, cache_mode)
+
+def _update_load_cache(file_path, parse):
+    if load_cache is not None:
+        # parsed for the cache only, kept as is (not pickled for 'copy')
+        load_cache.put(file_path, os.stat(file_path), parse(), 'shared')
+
+def _write(file_path, payload, codec, level=None):
+    level = durability.check(DURABILITY if level is None else level)
+    fd = getattr(_lock_context, 'fd', None)
+    
+    if fd is not None:
+        rewrite(fd, payload)
+        durability.sync_file(fd, level)
+    else:
+        with open(file_path, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            durability.sync_file(f.fileno(), level)
+    
+    # the file may have just been created
+    durability.sync_dir(file_path, level)
+    
+    if metrics.enabled:
+        metrics.increment('written_bytes_total', len(payload), codec=codec.name)
+    
+    _update_load_cache(file_path, lambda: codec.loads(payload))
+
+@file_lock(fcntl.LOCK_SH)
+def read_file(file_path, codec=None, cache_mode=None):
+    # codec: Codec or registered name, by file extension if not given
+    content = _cached_read(file_path, get_codec(codec, file_path), cache_mode)
+    
+    return content
+
+@file_lock(fcntl.LOCK_EX)
+def write_file(file_path, write_obj, codec=None, durability=None):
+    codec = get_codec(codec, file_path)
+    _write(file_path, serialize(codec, write_obj), codec, durability)
+
 @file_lock(fcntl.LOCK_SH)
-def read_json(file_path):
-    with open(file_path, 'r') as f:
-        content = json.load(f)
+def read_json(file_path, cache_mode=None):
+    content = _cached_read(file_path, JSON, cache_mode)
     
     return content
 
 @file_lock(fcntl.LOCK_EX)
-def write_json(file_path, write_obj):
-    with open(file_path, 'w') as f:
-        json.dump(write_obj, f, indent=4)
+def write_json(file_path, write_obj, backend=None, durability=None):
+    _write(file_path, serialize(JSON, write_obj, lambda obj: serializers.dumps(obj, backend)), JSON, durability)
         
 @file_lock(fcntl.LOCK_SH)
-def read_yaml(file_path):
-    with open(file_path, 'r') as f:
-        content = yaml.load(f, Loader=yaml.FullLoader)
+def read_yaml(file_path, cache_mode=None):
+    content = _cached_read(file_path, YAML, cache_mode)
     
     return content
 
 @file_lock(fcntl.LOCK_EX)
-def write_yaml(file_path, write_obj):
-    with open(file_path, 'w') as f:
-        yaml.dump(write_obj, f, sort_keys = False)
\ No newline at end of file
+def write_yaml(file_path, write_obj, durability=None):
+    _write(file_path, serialize(YAML, write_obj), YAML, durability)
+
+@contextmanager
+def locked_update(file_path, default=None, codec=None, wait=None, durability=None):
+    # read, let the caller modify and write back a file under one exclusive lock:
+    #   with locked_update(path) as content:
+    #       content['key'] = 'value'
+    # wait: WaitStrategy of the lock (default: LOCK_WAIT), durability: see DURABILITY
+    # a missing file is only created from default
+    codec = get_codec(codec, file_path)
+    
+    f = _open_locked(file_path, fcntl.LOCK_EX, wait or LOCK_WAIT, create=default is not None)
+    
+    if f is None:
+        raise AttributeError(f'Path [{file_path}] is not a file!')
+    
+    try:
+        _lock_context.fd = f.fileno()
+        
+        if default is not None and os.fstat(f.fileno()).st_size == 0:
+            content = default
+        else:
+            content = _cached_read(file_path, codec, 'copy')
+        
+        yield content
+        
+        _write(file_path, serialize(codec, content), codec, durability)
+    finally:
+        _lock_context.fd = None
+        release(f)
@@ -0,0 +1,154 @@
+import atexit
+import functools
+import threading
+import time
+from typing import Callable, Union
+
+from .with_backupfile import safe_dump
+
+
+class CoalescingWriter:
+    """
+    Write-behind writer for a file dumped many times per second
+
+    Only the latest written object is kept; it is dumped by a background thread at most once
+    per interval, or as soon as max_pending writes piled up. Each flush is a regular
+    safe_dump (or the given dump), so locking and backup are unchanged.
+    Pending data is flushed on close() and at interpreter exit.
+
+    The written object is not copied: do not modify it after write() until it is flushed.
+
+    Args:
+        file_path (str): must be absolute path to the file (format by extension)
+        interval (float): min seconds between two flushes
+        max_pending (int, optional): flush right away once this many writes are pending
+        dump (Callable, optional): dump(file_path, data), default: with_backupfile.safe_dump
+        durability (str, optional): passed to every dump (ex. 'none' for throughput), default: the dump's default
+    """
+
+    def __init__(self, file_path: str, interval: float = 0.1, max_pending: int = None, dump: Callable = None,
+                 durability: str = None):
+        if dump is None:
+            dump = safe_dump
+        if durability is not None:
+            dump = functools.partial(dump, durability=durability)
+
+        self.file_path = file_path
+        self.interval = interval
+        self.max_pending = max_pending
+        self.flush_count = 0
+        self.last_error = None
+
+        self._dump = dump
+        self._data = None
+        self._pending_count = 0
+        self._last_flush_time = 0
+        self._retry_after = 0  # no flush by the background thread before, after a failed one
+        self._closed = False
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # keeps flushes in write order
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    def write(self, data: Union[list, dict]) -> None:
+        """
+        Replace the pending data, it is dumped by the background thread
+        """
+
+        if type(data) != list and type(data) != dict:
+            raise AttributeError(f'Data to dump must be list or dict ({data})!')
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f'Writer of [{self.file_path}] is closed')
+
+            self._data = data
+            self._pending_count += 1
+            self._cond.notify()
+
+    def flush(self) -> None:
+        """
+        Dump the pending data now (if any), errors are raised to the caller
+        """
+
+        with self._flush_lock:
+            with self._cond:
+                if self._pending_count == 0:
+                    return
+
+                data = self._data
+                pending_count = self._pending_count
+                self._data = None
+                self._pending_count = 0
+                self._last_flush_time = time.monotonic()
+
+            try:
+                self._dump(self.file_path, data)
+                self.flush_count += 1
+            except Exception:
+                with self._cond:
+                    # keep it for the next flush unless newer data arrived
+                    if self._pending_count == 0:
+                        self._data = data
+                    self._pending_count += pending_count
+                raise
+
+    def close(self) -> None:
+        """
+        Flush the pending data and stop the background thread
+        """
+
+        with self._cond:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._cond.notify()
+
+        self._thread.join()
+        atexit.unregister(self.close)
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _is_due(self) -> bool:
+        now = time.monotonic()
+
+        # a failed flush is retried after interval, even if max_pending writes are pending
+        if now < self._retry_after:
+            return False
+
+        if self.max_pending is not None and self._pending_count >= self.max_pending:
+            return True
+
+        return now >= self._last_flush_time + self.interval
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (self._pending_count == 0 or not self._is_due()):
+                    if self._pending_count == 0:
+                        self._cond.wait()
+                    else:
+                        self._cond.wait(max(self._last_flush_time + self.interval, self._retry_after) - time.monotonic())
+
+                if self._closed:
+                    return
+
+            try:
+                self.flush()
+            except Exception as e:
+                self.last_error = e
+                print(f'!! flush file [{self.file_path}] failed ({e}), retry in {self.interval}s')
+                with self._cond:
+                    self._retry_after = time.monotonic() + self.interval
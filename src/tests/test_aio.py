@@ -0,0 +1,96 @@
+#!/bin/python3
+
+import asyncio
+import fcntl
+import os
+import shutil
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import aio
+
+_temp_test_folder = "./tests/data/test_data_aio"
+_data = {"servlet": [{"servlet-name": "cofaxCDS", "init-param": {"useJSP": False, "maxUrlLength": 500}}]}
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.mark.parametrize('load, dump, ext', [
+    (aio.json_safe_load, aio.json_safe_dump, 'json'),
+    (aio.yaml_safe_load, aio.yaml_safe_dump, 'yaml'),
+    (aio.read_json, aio.write_json, 'json'),
+    (aio.read_yaml, aio.write_yaml, 'yaml'),
+])
+def test_dump_and_load(load, dump, ext):
+    file_path = f'{_temp_test_folder}/data.{ext}'
+
+    async def run():
+        await dump(file_path, _data)
+        return await load(file_path)
+
+    assert_that(asyncio.run(run())).is_equal_to(_data)
+
+
+def test_lock_wait_does_not_block_loop():
+    file_path = f'{_temp_test_folder}/data.json'
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        ticker = asyncio.create_task(tick())
+        try:
+            await aio.json_safe_load(file_path, timeout=0.2)
+        finally:
+            ticker.cancel()
+
+    asyncio.run(aio.json_safe_dump(file_path, _data))
+
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(run())
+
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    assert_that(len(ticks)).is_greater_than(5)
+
+
+def test_cancel_releases_lock():
+    file_path = f'{_temp_test_folder}/data.json'
+
+    async def run():
+        task = asyncio.create_task(aio.json_safe_dump(file_path, _data, timeout=5))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(aio.json_safe_dump(file_path, {}))
+
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        asyncio.run(run())
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    assert_that(asyncio.run(aio.json_safe_load(file_path))).is_equal_to({})
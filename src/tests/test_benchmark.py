@@ -0,0 +1,111 @@
+#!/bin/python3
+
+import json
+import os
+import shutil
+
+import pytest
+from assertpy import assert_that
+
+from benchmarks import suite
+from benchmarks.bench_serializers import make_document
+from file_access_protector import with_backupfile, without_backupfile
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
+
+requires_benchmark = pytest.mark.skipif(pytest_benchmark is None, reason='pytest-benchmark is not installed')
+
+_temp_test_folder = "./tests/data/test_data_benchmark"
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@requires_benchmark
+@pytest.mark.parametrize('module', list(suite.MODULES))
+@pytest.mark.parametrize('extension', ['json', 'yaml'])
+@pytest.mark.parametrize('size_kb', [1, 100])
+def test_load_throughput(benchmark, module, extension, size_kb):
+    file_path = f'{_temp_test_folder}/bench.{extension}'
+    document = make_document(size_kb / 1024)
+    load, dump = suite.MODULES[module]
+    dump(file_path, document)
+
+    benchmark.group = f'load {extension} {size_kb}KB'
+    assert_that(benchmark(load, file_path)).is_equal_to(document)
+
+
+@requires_benchmark
+@pytest.mark.parametrize('module', list(suite.MODULES))
+@pytest.mark.parametrize('extension', ['json', 'yaml'])
+@pytest.mark.parametrize('size_kb', [1, 100])
+def test_dump_throughput(benchmark, module, extension, size_kb):
+    file_path = f'{_temp_test_folder}/bench.{extension}'
+    document = make_document(size_kb / 1024)
+    load, dump = suite.MODULES[module]
+
+    benchmark.group = f'dump {extension} {size_kb}KB'
+    benchmark(dump, file_path, document)
+
+    assert_that(load(file_path)).is_equal_to(document)
+
+
+@requires_benchmark
+@pytest.mark.parametrize('lock_type', ['shared', 'exclusive'])
+def test_lock_latency(benchmark, lock_type):
+    file_path = f'{_temp_test_folder}/bench.json'
+    with_backupfile.json_safe_dump(file_path, {})
+
+    benchmark.group = 'lock'
+    benchmark(suite.lock_op, file_path, suite.fcntl.LOCK_SH if lock_type == 'shared' else suite.fcntl.LOCK_EX)
+
+
+def test_suite_case_and_regression_check():
+    cases = list(suite.iter_cases(
+        {'sizes_kb': [1], 'formats': ['json'], 'threads': [2], 'processes': [1],
+         'read_ratios': [0.5], 'caches': ['warm']},
+        ['with_backupfile', 'without_backupfile', 'lock'], 0.2, _temp_test_folder))
+
+    results = [suite.run_case(case) for case in cases]
+
+    assert_that(results).is_length(3)
+    for result in results:
+        assert_that(result['ops']).is_greater_than(0)
+        assert_that(result['errors']).is_equal_to(0)
+        assert_that(result['p50_ms']).is_less_than_or_equal_to(result['p95_ms'])
+        assert_that(result['p95_ms']).is_less_than_or_equal_to(result['p99_ms'])
+
+    baseline_path = f'{_temp_test_folder}/baseline.json'
+    baseline = [dict(result, ops_per_sec=result['ops_per_sec'] * 2) for result in results]
+    with open(baseline_path, 'w') as f:
+        json.dump({'results': baseline}, f)
+
+    assert_that(suite.compare(results, baseline_path, 0.2)).is_length(3)
+    assert_that(suite.compare(baseline, baseline_path, 0.2)).is_empty()
+    assert_that(without_backupfile.read_json(cases[0]['file_path'])).is_equal_to(make_document(1 / 1024))
+
+
+def test_suite_failed_case_recorded():
+    case = next(suite.iter_cases(
+        {'sizes_kb': [1], 'formats': ['json'], 'threads': [1], 'processes': [2],
+         'read_ratios': [0.5], 'caches': ['warm']},
+        ['with_backupfile'], 0.1, _temp_test_folder))
+
+    result = suite.run_case(dict(case, module='missing'))
+
+    assert_that(result['ops']).is_equal_to(0)
+    assert_that(result['errors']).is_equal_to(1)
+    assert_that(result['first_error']).contains('KeyError')
+    assert_that(result).does_not_contain_key('document')
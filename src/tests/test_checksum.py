@@ -0,0 +1,239 @@
+#!/bin/python3
+
+import os
+import shutil
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import checksum, with_backupfile
+from file_access_protector.with_backupfile import (get_backup_file_path, json_safe_dump, json_safe_load,
+                                                   locked_update, yaml_safe_dump, yaml_safe_load)
+
+_temp_test_folder = "./tests/data/test_data_checksum"
+_file_path = f'{_temp_test_folder}/data.json'
+_backup_file_path = get_backup_file_path(_file_path)
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    parsed = []
+    read_content = with_backupfile._read_content
+
+    def recording_read_content(file_path, codec):
+        parsed.append(file_path)
+        return read_content(file_path, codec)
+
+    monkeypatch.setattr(with_backupfile, '_read_content', recording_read_content)
+
+    return parsed
+
+
+def corrupt(file_path: str) -> None:
+    with open(file_path, 'r+b') as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b'#!')
+
+
+def interrupt_dump(monkeypatch, dump, file_path: str, data, torn_size=lambda payload: len(payload) // 2) -> None:
+    """
+    Dump data to file_path, interrupted (ex. by a crash) after writing torn_size(payload) bytes of it
+    """
+
+    write_file = with_backupfile._write_file
+    write_file_atomic = with_backupfile._write_file_atomic
+
+    def torn_write_file(path, payload, *args):
+        if path != file_path:
+            return write_file(path, payload, *args)
+
+        with open(path, 'wb') as f:
+            f.write(payload[:torn_size(payload)])
+        raise InterruptedError('dump interrupted')
+
+    def interrupted_write_file_atomic(path, *args):
+        if path != file_path:
+            return write_file_atomic(path, *args)
+
+        raise InterruptedError('dump interrupted')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(with_backupfile, '_write_file', torn_write_file)
+        patch.setattr(with_backupfile, '_write_file_atomic', interrupted_write_file_atomic)
+
+        with pytest.raises(InterruptedError):
+            dump(file_path, data)
+
+
+@pytest.mark.parametrize('atomic', [False, True])
+def test_checksum_files(atomic):
+    json_safe_dump(_file_path, {'a': 1}, atomic=atomic)
+    json_safe_dump(_file_path, {'a': 2}, atomic=atomic)
+
+    assert_that(checksum.verify(_file_path)).is_true()
+    assert_that(checksum.verify(_backup_file_path)).is_true()
+    assert_that(checksum.get_generation(_file_path)).is_equal_to(2)
+    # the backup is the previous generation (atomic) or a copy of the new one
+    assert_that(checksum.get_generation(_backup_file_path)).is_equal_to(1 if atomic else 2)
+
+
+def test_torn_file_not_parsed(monkeypatch, parsed):
+    json_safe_dump(_file_path, {'a': 1})
+    json_safe_dump(_file_path, {'a': 2})
+    interrupt_dump(monkeypatch, json_safe_dump, _file_path, {'a': 3})
+
+    assert_that(checksum.is_pending(_file_path)).is_true()
+    parsed.clear()
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+    assert_that(parsed).is_equal_to([_backup_file_path])
+
+    # restored with its checksum file
+    assert_that(checksum.verify(_file_path)).is_true()
+    assert_that(checksum.is_pending(_file_path)).is_false()
+    parsed.clear()
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+    assert_that(parsed).is_equal_to([_file_path])
+
+
+def test_interrupted_atomic_dump(monkeypatch, parsed):
+    json_safe_dump(_file_path, {'a': 1}, atomic=True)
+    json_safe_dump(_file_path, {'a': 2}, atomic=True)
+    interrupt_dump(monkeypatch, lambda *args: json_safe_dump(*args, atomic=True), _file_path, {'a': 3})
+
+    # the file was not written, only its checksum file: parsed as is
+    parsed.clear()
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+    assert_that(parsed).is_equal_to([_file_path])
+
+
+def test_dump_checksum_done(monkeypatch):
+    records = []
+    write_file = with_backupfile._write_file
+
+    def recording_write_file(file_path, payload, level):
+        if file_path == checksum.get_checksum_file_path(_file_path):
+            records.append((payload.split()[3:], level))
+        return write_file(file_path, payload, level)
+
+    monkeypatch.setattr(with_backupfile, '_write_file', recording_write_file)
+
+    json_safe_dump(_file_path, {'a': 1})
+    json_safe_dump(_file_path, {'a': 2})
+
+    # only the pending one is synced
+    assert_that(records).is_equal_to([([b'pending'], 'data'), ([], 'none')] * 2)
+
+
+def test_truncated_yaml_detected(monkeypatch):
+    file_path = f'{_temp_test_folder}/data.yaml'
+    yaml_safe_dump(file_path, {'a': 1, 'b': 2, 'c': 3})
+
+    # torn at a line boundary: still valid yaml, with keys missing
+    interrupt_dump(monkeypatch, yaml_safe_dump, file_path, {'a': 1, 'b': 2, 'c': 3, 'd': 4},
+                   lambda payload: payload.index(b'\n') + 1)
+
+    assert_that(yaml_safe_load(file_path)).is_equal_to({'a': 1, 'b': 2, 'c': 3})
+
+
+@pytest.mark.parametrize('atomic', [False, True])
+def test_external_edit_loaded(parsed, atomic):
+    json_safe_dump(_file_path, {'a': 1}, atomic=atomic)
+
+    # written by another tool, the checksum file is not pending
+    with open(_file_path, 'w') as f:
+        f.write('{"a": 2, "edited": true}')
+
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2, 'edited': True})
+    assert_that(parsed).is_equal_to([_file_path])
+
+    with open(_file_path) as f:
+        assert_that(f.read()).is_equal_to('{"a": 2, "edited": true}')
+
+    # the next dump gives it a checksum file again
+    json_safe_dump(_file_path, {'a': 3}, atomic=atomic)
+    assert_that(checksum.verify(_file_path)).is_true()
+
+
+def test_corrupted_edit_recovered(parsed):
+    json_safe_dump(_file_path, {'a': 1})
+
+    with open(_file_path, 'w') as f:
+        f.write('{"a": 2')
+
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 1})
+    assert_that(parsed).is_equal_to([_file_path, _backup_file_path])
+
+
+def test_both_failing_parsed(parsed):
+    json_safe_dump(_file_path, {'a': 1})
+
+    # edited by hand (both files), without updating the checksum files
+    for file_path in (_file_path, _backup_file_path):
+        with open(file_path, 'w') as f:
+            f.write('{"a": 10}')
+
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 10})
+    assert_that(parsed).is_equal_to([_file_path])
+
+
+def test_without_checksum_files(parsed):
+    json_safe_dump(_file_path, {'a': 1})
+    os.remove(checksum.get_checksum_file_path(_file_path))
+    os.remove(checksum.get_checksum_file_path(_backup_file_path))
+
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 1})
+
+    corrupt(_file_path)
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 1})
+    assert_that(parsed).is_equal_to([_file_path, _file_path, _backup_file_path])
+
+    json_safe_dump(_file_path, {'a': 2})
+    assert_that(checksum.verify(_file_path)).is_true()
+
+
+def test_torn_checksum_file():
+    json_safe_dump(_file_path, {'a': 1})
+
+    with open(checksum.get_checksum_file_path(_file_path), 'wb') as f:
+        f.write(b'1 ')
+
+    assert_that(checksum.verify(_file_path)).is_none()
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 1})
+
+
+def test_checksum_disabled(monkeypatch, parsed):
+    json_safe_dump(_file_path, {'a': 1})
+
+    monkeypatch.setattr(with_backupfile, 'CHECKSUM', False)
+    json_safe_dump(_file_path, {'a': 2})
+
+    # stale checksum files are removed, not left to fail the new content
+    assert_that(os.path.exists(checksum.get_checksum_file_path(_file_path))).is_false()
+    assert_that(os.path.exists(checksum.get_checksum_file_path(_backup_file_path))).is_false()
+
+    monkeypatch.setattr(with_backupfile, 'CHECKSUM', True)
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+
+
+def test_removed_file_recreated():
+    json_safe_dump(_file_path, {'a': 1})
+    os.remove(_file_path)
+    os.remove(_backup_file_path)
+
+    with locked_update(_file_path, default={'b': 1}) as content:
+        assert_that(content).is_equal_to({'b': 1})
+
+    assert_that(checksum.verify(_file_path)).is_true()
+    assert_that(checksum.get_generation(_file_path)).is_equal_to(1)
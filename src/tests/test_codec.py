@@ -0,0 +1,113 @@
+#!/bin/python3
+
+import json
+import os
+import shutil
+
+from unittest.mock import patch
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import codec
+from file_access_protector.codec import CODECS, JSON, PICKLE, YAML, Codec, get_codec, load_file, register_codec
+from file_access_protector.with_backupfile import locked_update, safe_dump, safe_load
+from file_access_protector.without_backupfile import read_file, write_file
+
+_temp_test_folder = "./tests/data/test_data_codec"
+_data = {"servlet": [{"servlet-name": "cofaxCDS", "init-param": {"useJSP": False, "maxUrlLength": 500}}]}
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+def test_codec_by_extension():
+    assert_that(get_codec(file_path='/a/b.json')).is_same_as(JSON)
+    assert_that(get_codec(file_path='/a/b.YML')).is_same_as(YAML)
+    assert_that(get_codec(file_path='/a/b.pkl')).is_same_as(PICKLE)
+    assert_that(get_codec('yaml', '/a/b.json')).is_same_as(YAML)
+
+    with pytest.raises(AttributeError):
+        get_codec(file_path='/a/b.txt')
+
+    with pytest.raises(AttributeError):
+        get_codec('not_a_codec', '/a/b.json')
+
+
+@pytest.mark.parametrize('codec_name', list(CODECS))
+@pytest.mark.parametrize('load, dump', [(safe_load, safe_dump), (read_file, write_file)])
+def test_dump_and_load_every_codec(codec_name, load, dump):
+    file_path = f'{_temp_test_folder}/data.{CODECS[codec_name].extensions[0][1:]}'
+
+    dump(file_path, _data)
+
+    assert_that(load(file_path)).is_equal_to(_data)
+
+
+
+@pytest.mark.parametrize('codec_name', list(CODECS))
+def test_load_mapped_file(codec_name):
+    codec_ = CODECS[codec_name]
+    file_path = f'{_temp_test_folder}/data.{codec_.extensions[0][1:]}'
+    safe_dump(file_path, _data)
+
+    with patch.object(codec, 'MMAP_THRESHOLD', 0), \
+            patch.object(codec_, 'loads', side_effect=AssertionError('bytes path used')):
+        if codec_.loads_mapped is None:
+            with pytest.raises(AssertionError):
+                load_file(file_path, codec_)
+        else:
+            assert_that(load_file(file_path, codec_)).is_equal_to(_data)
+            assert_that(safe_load(file_path)).is_equal_to(_data)
+            assert_that(read_file(file_path)).is_equal_to(_data)
+
+
+def test_load_small_file_without_mmap():
+    file_path = f'{_temp_test_folder}/data.json'
+    safe_dump(file_path, _data)
+
+    with patch.object(JSON, 'loads_mapped', side_effect=AssertionError('mmap path used')):
+        assert_that(load_file(file_path, JSON)).is_equal_to(_data)
+
+    # empty files can not be mapped
+    open(file_path, 'w').close()
+    with patch.object(codec, 'MMAP_THRESHOLD', 0), pytest.raises(ValueError):
+        load_file(file_path, JSON)
+
+@pytest.mark.parametrize('codec_name', list(CODECS))
+def test_recover_from_backup_every_codec(codec_name):
+    file_path = f'{_temp_test_folder}/data.{CODECS[codec_name].extensions[0][1:]}'
+
+    safe_dump(file_path, _data)
+    with open(file_path, 'wb') as f:
+        f.write(b'\x00\x01')
+
+    assert_that(safe_load(file_path)).is_equal_to(_data)
+    assert_that(safe_load(file_path)).is_equal_to(_data)
+
+
+def test_register_custom_codec():
+    upper_json = Codec('upper_json', ('.ujson',),
+                       lambda obj: json.dumps(obj).upper().encode(),
+                       lambda data: json.loads(data.decode().lower()))
+    file_path = f'{_temp_test_folder}/data.ujson'
+
+    register_codec(upper_json)
+    try:
+        with locked_update(file_path, default={'count': 0}) as content:
+            content['count'] += 1
+
+        with open(file_path, 'rb') as f:
+            assert_that(f.read()).is_equal_to(b'{"COUNT": 1}')
+        assert_that(safe_load(file_path)).is_equal_to({'count': 1})
+    finally:
+        codec.CODECS.pop('upper_json')
@@ -0,0 +1,247 @@
+#!/bin/python3
+
+import errno
+import fcntl
+import json
+import os
+import shutil
+import threading
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import descriptors, with_backupfile
+from file_access_protector.lock import open_locked, release
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load
+from file_access_protector.without_backupfile import locked_update, read_json, write_json
+
+_temp_test_folder = "./tests/data/test_data_descriptors"
+_file_path = f'{_temp_test_folder}/data.json'
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+    descriptors.clear()
+
+    yield
+
+    descriptors.clear()
+    shutil.rmtree(_temp_test_folder)
+
+
+def idle_fds(file_path: str) -> list:
+    return list(descriptors._idle.get(file_path, []))
+
+
+def test_descriptor_reused():
+    write_json(_file_path, {'a': 1})
+    fds = idle_fds(_file_path)
+
+    assert_that(fds).is_length(1)
+    assert_that(read_json(_file_path)).is_equal_to({'a': 1})
+    assert_that(idle_fds(_file_path)).is_equal_to(fds)
+
+    json_safe_dump(_file_path, {'a': 2})
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+    assert_that(idle_fds(_file_path)).is_equal_to(fds)
+
+
+def test_rewrite_through_descriptor():
+    write_json(_file_path, {'a': list(range(100))})
+    write_json(_file_path, {'a': 1})
+
+    with locked_update(_file_path) as content:
+        content['b'] = 2
+
+    with open(_file_path, 'r') as f:
+        assert_that(json.load(f)).is_equal_to({'a': 1, 'b': 2})
+
+
+def test_read_does_not_create_file():
+    assert_that(read_json(_file_path)).is_none()
+    assert_that(os.path.exists(_file_path)).is_false()
+
+
+def test_open_errors_raised():
+    missing_dir_file_path = f'{_temp_test_folder}/missing_dir/data.json'
+
+    with pytest.raises(FileNotFoundError):
+        write_json(missing_dir_file_path, {'a': 1})
+    with pytest.raises(FileNotFoundError):
+        json_safe_dump(missing_dir_file_path, {'a': 1})
+
+    # not "file not exist"
+    with pytest.raises(IsADirectoryError):
+        read_json(_temp_test_folder)
+
+    assert_that(read_json(missing_dir_file_path)).is_none()
+
+
+@pytest.mark.parametrize('atomic', [False, True])
+def test_replaced_file(atomic):
+    write_json(_file_path, {'a': 1})
+
+    # replaced by another process (new inode)
+    with open(f'{_file_path}.tmp', 'w') as f:
+        f.write('{"a": 2}')
+    os.replace(f'{_file_path}.tmp', _file_path)
+
+    assert_that(read_json(_file_path)).is_equal_to({'a': 2})
+    # the pooled descriptor of the old inode was replaced
+    assert_that(idle_fds(_file_path)).is_length(1)
+    assert_that(os.fstat(idle_fds(_file_path)[0]).st_ino).is_equal_to(os.stat(_file_path).st_ino)
+
+    json_safe_dump(_file_path, {'a': 3}, atomic=atomic)
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 3})
+    assert_that(read_json(_file_path)).is_equal_to({'a': 3})
+
+
+def test_removed_file():
+    write_json(_file_path, {'a': 1})
+    os.remove(_file_path)
+
+    assert_that(read_json(_file_path)).is_none()
+
+    write_json(_file_path, {'a': 2})
+    assert_that(read_json(_file_path)).is_equal_to({'a': 2})
+
+
+def test_descriptor_shared_by_readers():
+    write_json(_file_path, {'a': 1})
+
+    first = open_locked(_file_path, 1, fcntl.LOCK_SH)
+    with pytest.raises(TimeoutError):
+        open_locked(_file_path, 0.05, fcntl.LOCK_EX)
+
+    # readers of the process share one flocked descriptor
+    second = open_locked(_file_path, 1, fcntl.LOCK_SH)
+    assert_that(second.fileno()).is_equal_to(first.fileno())
+
+    release(first)
+    assert_that(idle_fds(_file_path)).is_empty()
+    release(second)
+
+    assert_that(idle_fds(_file_path)).is_length(1)
+
+
+def test_concurrent_threads():
+    write_json(_file_path, {'count': 0})
+
+    def increment():
+        for _ in range(50):
+            with locked_update(_file_path, wait=None) as content:
+                content['count'] += 1
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert_that(read_json(_file_path)).is_equal_to({'count': 200})
+    assert_that(len(idle_fds(_file_path))).is_less_than_or_equal_to(descriptors.MAX_IDLE_PER_PATH)
+
+
+def test_pool_bounds(monkeypatch):
+    monkeypatch.setattr(descriptors, 'MAX_PATHS', 2)
+
+    for index in range(4):
+        write_json(f'{_temp_test_folder}/{index}.json', {'a': index})
+
+    assert_that(list(descriptors._idle)).is_equal_to([f'{_temp_test_folder}/2.json', f'{_temp_test_folder}/3.json'])
+
+    monkeypatch.setattr(descriptors, 'MAX_PATHS', 0)
+    write_json(_file_path, {'a': 1})
+
+    assert_that(descriptors._idle).is_empty()
+
+
+def test_pool_reset_in_child():
+    write_json(_file_path, {'a': 1})
+    assert_that(idle_fds(_file_path)).is_not_empty()
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if not descriptors._idle else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert_that(os.WEXITSTATUS(status)).is_equal_to(0)
+
+
+def test_locked_file_read():
+    with open(_file_path, 'w') as f:
+        f.write('{"a": 1}')
+
+    f = open_locked(_file_path, 1, fcntl.LOCK_SH, 'rb')
+    try:
+        assert_that(f.read(3)).is_equal_to(b'{"a')
+        assert_that(f.read()).is_equal_to(b'": 1}')
+        assert_that(f.read()).is_equal_to(b'')
+    finally:
+        release(f)
+
+
+@pytest.mark.parametrize('kernel_copy', [True, False])
+def test_copy_fd(monkeypatch, kernel_copy):
+    if not kernel_copy:
+        def unsupported(*args):
+            raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+        monkeypatch.setattr(fcntl, 'ioctl', unsupported)
+        monkeypatch.setattr(os, 'copy_file_range', unsupported, raising=False)
+        monkeypatch.setattr(descriptors, 'COPY_CHUNK_SIZE', 1000)
+
+    content = os.urandom(descriptors.COPY_CHUNK_SIZE * 2 + 123)
+    with open(_file_path, 'wb') as f:
+        f.write(content)
+    with open(f'{_file_path}.copy', 'wb') as f:
+        f.write(b'x' * (len(content) + 10))
+
+    src_fd = os.open(_file_path, os.O_RDONLY)
+    dst_fd = os.open(f'{_file_path}.copy', os.O_WRONLY)
+    try:
+        descriptors.copy_fd(src_fd, dst_fd)
+
+        assert_that(os.lseek(src_fd, 0, os.SEEK_CUR)).is_equal_to(0)
+        assert_that(os.lseek(dst_fd, 0, os.SEEK_CUR)).is_equal_to(0)
+    finally:
+        os.close(src_fd)
+        os.close(dst_fd)
+
+    with open(f'{_file_path}.copy', 'rb') as f:
+        assert_that(f.read()).is_equal_to(content)
+
+
+def test_dump_does_not_read_back(monkeypatch):
+    json_safe_dump(_file_path, {'a': 1})
+
+    copies = []
+    copy_file = with_backupfile._copy_file
+    monkeypatch.setattr(with_backupfile, '_copy_file', lambda src_path, *args: copies.append(src_path) or copy_file(src_path, *args))
+
+    json_safe_dump(_file_path, {'a': 2})
+
+    # only the previous content is mirrored to the backup file, the new one is written from memory
+    assert_that(copies.count(_file_path)).is_equal_to(1)
+    with open(with_backupfile.get_backup_file_path(_file_path), 'r') as f:
+        assert_that(json.load(f)).is_equal_to({'a': 2})
+
+
+def test_dump_over_linked_backup():
+    json_safe_dump(_file_path, {'a': 1})
+
+    # left by a crash during an atomic dump: the backup file is a hard link of the file
+    backup_file_path = with_backupfile.get_backup_file_path(_file_path)
+    os.remove(backup_file_path)
+    os.link(_file_path, backup_file_path)
+
+    json_safe_dump(_file_path, {'a': 2})
+
+    assert_that(os.path.samefile(_file_path, backup_file_path)).is_false()
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+    with open(backup_file_path, 'r') as f:
+        assert_that(json.load(f)).is_equal_to({'a': 2})
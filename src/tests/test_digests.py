@@ -0,0 +1,191 @@
+#!/bin/python3
+
+import json
+import os
+import shutil
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import digests, journal, metrics, with_backupfile
+from file_access_protector.with_backupfile import get_backup_file_path, json_safe_dump, journal_update, locked_update
+
+_temp_test_folder = "./tests/data/test_data_digests"
+_file_path = f'{_temp_test_folder}/data.json'
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+    digests.clear()
+
+    yield
+
+    digests.clear()
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    writes = []
+    write_payload = with_backupfile._write_payload
+
+    def counting_write_payload(file_path, *args):
+        writes.append(file_path)
+        return write_payload(file_path, *args)
+
+    monkeypatch.setattr(with_backupfile, '_write_payload', counting_write_payload)
+
+    return writes
+
+
+@pytest.fixture
+def skipped():
+    skipped = []
+
+    def sink(kind, name, value, labels):
+        if name == 'skipped_writes_total':
+            skipped.append(labels['codec'])
+
+    metrics.add_sink(sink)
+
+    yield skipped
+
+    metrics.remove_sink(sink)
+
+
+def read(file_path: str):
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize('atomic', [False, True])
+def test_unchanged_dump_skipped(writes, skipped, atomic):
+    json_safe_dump(_file_path, {'a': 1}, atomic=atomic)
+    file_stat = os.stat(_file_path)
+
+    for _ in range(3):
+        json_safe_dump(_file_path, {'a': 1}, atomic=atomic)
+
+    assert_that(writes).is_length(1)
+    assert_that(skipped).is_equal_to(['json'] * 3)
+    assert_that(os.stat(_file_path).st_mtime_ns).is_equal_to(file_stat.st_mtime_ns)
+
+    json_safe_dump(_file_path, {'a': 2}, atomic=atomic)
+
+    assert_that(writes).is_length(2)
+    assert_that(read(_file_path)).is_equal_to({'a': 2})
+
+
+def test_entry_trusted_once_settled(monkeypatch, writes):
+    json_safe_dump(_file_path, {'a': 1})
+
+    # recorded long after the file mtime: the file is not read again
+    monkeypatch.setattr(digests, 'MTIME_GRANULARITY_NS', -10**18)
+    monkeypatch.setattr(digests, 'pread_all', None)
+    monkeypatch.setattr(digests, 'open', None, raising=False)
+
+    json_safe_dump(_file_path, {'a': 1})
+
+    assert_that(writes).is_length(1)
+
+
+def test_rewritten_in_same_mtime_tick(writes):
+    json_safe_dump(_file_path, {'a': 1})
+    file_stat = os.stat(_file_path)
+
+    # rewritten in place by another process, same size and mtime
+    with open(_file_path, 'w') as f:
+        f.write('{"a": 2}')
+    os.utime(_file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+
+    json_safe_dump(_file_path, {'a': 1})
+
+    assert_that(writes).is_length(2)
+    assert_that(read(_file_path)).is_equal_to({'a': 1})
+
+
+@pytest.mark.parametrize('generations', [None, 3])
+def test_replaced_after_rename(monkeypatch, writes, generations):
+    monkeypatch.setattr(with_backupfile, 'BACKUP_GENERATIONS', generations)
+    # trusted without comparing the content
+    monkeypatch.setattr(digests, 'MTIME_GRANULARITY_NS', -10**18)
+    remember = digests.remember
+
+    def racing_remember(*args):
+        # another process locking the renamed file dumps before the dump is remembered
+        with open(f'{_file_path}.tmp', 'w') as f:
+            f.write('{"v": "E"}')
+        os.replace(f'{_file_path}.tmp', _file_path)
+
+        remember(*args)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(digests, 'remember', racing_remember)
+        json_safe_dump(_file_path, {'v': 'B'}, atomic=True)
+
+    assert_that(read(_file_path)).is_equal_to({'v': 'E'})
+
+    json_safe_dump(_file_path, {'v': 'B'}, atomic=True)
+
+    assert_that(writes).is_length(2)
+    assert_that(read(_file_path)).is_equal_to({'v': 'B'})
+
+    with_backupfile.generations.wait_pruned()
+
+
+def test_modified_files_rewritten(writes):
+    json_safe_dump(_file_path, {'a': 1})
+
+    with open(_file_path, 'w') as f:
+        f.write('{"a": 2, "b": 3}')
+    json_safe_dump(_file_path, {'a': 1})
+
+    os.remove(get_backup_file_path(_file_path))
+    json_safe_dump(_file_path, {'a': 1})
+
+    assert_that(writes).is_length(3)
+    assert_that(read(_file_path)).is_equal_to({'a': 1})
+    assert_that(read(get_backup_file_path(_file_path))).is_equal_to({'a': 1})
+
+
+def test_journal_superseded(writes):
+    json_safe_dump(_file_path, {'a': 1})
+    journal_update(_file_path, {'a': 2})
+
+    json_safe_dump(_file_path, {'a': 1})
+
+    assert_that(writes).is_length(2)
+    assert_that(os.path.exists(journal.get_journal_file_path(_file_path))).is_false()
+    assert_that(read(_file_path)).is_equal_to({'a': 1})
+
+
+def test_locked_update_without_change(writes):
+    json_safe_dump(_file_path, {'a': 1})
+
+    with locked_update(_file_path) as content:
+        content['a'] = 1
+
+    assert_that(writes).is_length(1)
+
+
+def test_skip_disabled(monkeypatch, writes):
+    monkeypatch.setattr(with_backupfile, 'SKIP_UNCHANGED', False)
+
+    json_safe_dump(_file_path, {'a': 1})
+    json_safe_dump(_file_path, {'a': 1})
+
+    assert_that(writes).is_length(2)
+    assert_that(digests._dumped).is_empty()
+
+
+def test_bounded_entries(monkeypatch):
+    monkeypatch.setattr(digests, 'MAX_PATHS', 2)
+
+    for index in range(4):
+        json_safe_dump(f'{_temp_test_folder}/{index}.json', {'a': index})
+
+    assert_that(list(digests._dumped)).is_equal_to([f'{_temp_test_folder}/2.json', f'{_temp_test_folder}/3.json'])
@@ -0,0 +1,144 @@
+#!/bin/python3
+
+import os
+import shutil
+import stat
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import with_backupfile, without_backupfile
+from file_access_protector.with_backupfile import journal_update, json_safe_dump, json_safe_load, locked_update
+from file_access_protector.without_backupfile import read_json, write_json
+from file_access_protector.writer import CoalescingWriter
+
+_temp_test_folder = "./tests/data/test_data_durability"
+_file_path = f'{_temp_test_folder}/data.json'
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.fixture
+def syncs(monkeypatch):
+    """
+    ('fdatasync' | 'fsync' | 'fsync_dir') of every sync call
+    """
+
+    calls = []
+    fdatasync, fsync = os.fdatasync, os.fsync
+
+    def record_fdatasync(fd):
+        calls.append('fdatasync')
+        fdatasync(fd)
+
+    def record_fsync(fd):
+        calls.append('fsync_dir' if stat.S_ISDIR(os.fstat(fd).st_mode) else 'fsync')
+        fsync(fd)
+
+    monkeypatch.setattr(os, 'fdatasync', record_fdatasync)
+    monkeypatch.setattr(os, 'fsync', record_fsync)
+
+    return calls
+
+
+@pytest.mark.parametrize('atomic', [False, True])
+def test_none(syncs, atomic):
+    json_safe_dump(_file_path, {'a': 1}, atomic=atomic, durability='none')
+    json_safe_dump(_file_path, {'a': 2}, atomic=atomic, durability='none')
+
+    assert_that(syncs).is_empty()
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+
+
+def test_data(syncs):
+    json_safe_dump(_file_path, {'a': 1})
+    syncs.clear()
+
+    json_safe_dump(_file_path, {'a': 2}, durability='data')
+
+    # backup before the original is truncated, original and its checksum file, backup again
+    assert_that(syncs).is_equal_to(['fdatasync'] * 4)
+
+
+def test_data_atomic(syncs):
+    json_safe_dump(_file_path, {'a': 1}, atomic=True, durability='data')
+    syncs.clear()
+
+    json_safe_dump(_file_path, {'a': 2}, atomic=True, durability='data')
+
+    # the backup is a hard link of the previous generation, only the new file is written
+    assert_that(syncs).is_equal_to(['fdatasync'])
+
+
+@pytest.mark.parametrize('atomic', [False, True])
+def test_full(syncs, atomic):
+    json_safe_dump(_file_path, {'a': 1}, atomic=atomic, durability='full')
+
+    assert_that(syncs).contains('fsync', 'fsync_dir').does_not_contain('fdatasync')
+    assert_that(syncs[-1]).is_equal_to('fsync_dir')
+
+
+def test_module_default(syncs, monkeypatch):
+    monkeypatch.setattr(with_backupfile, 'DURABILITY', 'none')
+    json_safe_dump(_file_path, {'a': 1})
+    with locked_update(_file_path) as content:
+        content['b'] = 2
+
+    assert_that(syncs).is_empty()
+
+    monkeypatch.setattr(with_backupfile, 'DURABILITY', 'full')
+    json_safe_dump(_file_path, {'a': 1})
+
+    assert_that(syncs).contains('fsync_dir')
+
+
+def test_invalid_level():
+    with pytest.raises(AttributeError):
+        json_safe_dump(_file_path, {'a': 1}, durability='sometimes')
+
+    assert_that(write_json(_file_path, {'a': 1}, durability='sometimes')).is_none()
+    assert_that(read_json(_file_path)).is_none()
+
+
+def test_journal(syncs):
+    journal_update(_file_path, {'a': 1}, durability='none')
+    journal_update(_file_path, {'b': 2}, durability='none')
+    assert_that(syncs).is_empty()
+
+    journal_update(_file_path, {'c': 3}, durability='data')
+    assert_that(syncs).is_equal_to(['fdatasync'])
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 1, 'b': 2, 'c': 3})
+
+
+def test_without_backupfile(syncs, monkeypatch):
+    write_json(_file_path, {'a': 1})
+    assert_that(syncs).is_empty()
+
+    write_json(_file_path, {'a': 2}, durability='data')
+    assert_that(syncs).is_equal_to(['fdatasync'])
+
+    syncs.clear()
+    monkeypatch.setattr(without_backupfile, 'DURABILITY', 'full')
+    with without_backupfile.locked_update(_file_path) as content:
+        content['b'] = 3
+
+    assert_that(syncs).is_equal_to(['fsync', 'fsync_dir'])
+    assert_that(read_json(_file_path)).is_equal_to({'a': 2, 'b': 3})
+
+
+def test_writer(syncs):
+    with CoalescingWriter(_file_path, interval=0.01, durability='none') as writer:
+        writer.write({'a': 1})
+
+    assert_that(syncs).is_empty()
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 1})
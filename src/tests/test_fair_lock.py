@@ -0,0 +1,180 @@
+#!/bin/python3
+
+import fcntl
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import lock, metrics
+from file_access_protector.lock import get_gate_file_path, lock_fair, open_locked, release
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load
+from file_access_protector.without_backupfile import read_json, write_json
+
+_temp_test_folder = "./tests/data/test_data_fair_lock"
+_file_path = f'{_temp_test_folder}/data.json'
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+    json_safe_dump(_file_path, {'a': 1})
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.fixture
+def writer_preferred(monkeypatch):
+    monkeypatch.setattr(lock, 'WRITER_PREFERRED', True)
+
+
+def run_readers(stop: threading.Event, count: int = 4, hold_time: float = 0.03) -> list:
+    """
+    Readers keeping the shared lock of the file taken at all times (overlapping holds)
+    """
+
+    def read():
+        while not stop.is_set():
+            with open(_file_path, 'r') as f:
+                lock_fair(f.fileno(), _file_path, 5, fcntl.LOCK_SH)
+                time.sleep(hold_time)
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    threads = []
+    for _ in range(count):
+        threads.append(threading.Thread(target=read))
+        threads[-1].start()
+        time.sleep(hold_time / count)
+
+    return threads
+
+
+def lock_exclusive(file_path: str, timeout: float) -> float:
+    start_time = time.monotonic()
+    release(open_locked(file_path, timeout, fcntl.LOCK_EX, fair=True))
+
+    return time.monotonic() - start_time
+
+
+def test_writer_not_starved_by_readers():
+    stop = threading.Event()
+    readers = run_readers(stop)
+
+    try:
+        with open(_file_path, 'r') as f:
+            start_time = time.monotonic()
+            lock_fair(f.fileno(), _file_path, 1, fcntl.LOCK_EX)
+            waited = time.monotonic() - start_time
+
+            # readers queue at the gate meanwhile
+            with open(_file_path, 'r') as other:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(other, fcntl.LOCK_SH | fcntl.LOCK_NB)
+
+            fcntl.flock(f, fcntl.LOCK_UN)
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+    # only the readers holding the lock when the writer arrived are waited for
+    assert_that(waited).is_less_than(0.3)
+    assert_that(os.path.exists(get_gate_file_path(_file_path))).is_true()
+
+
+def test_gate_released_after_lock():
+    with open(_file_path, 'r') as f:
+        lock_fair(f.fileno(), _file_path, 1, fcntl.LOCK_EX)
+
+        with open(get_gate_file_path(_file_path), 'r') as gate:
+            fcntl.flock(gate, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def test_timeout_includes_gate():
+    with open(get_gate_file_path(_file_path), 'a') as gate:
+        fcntl.flock(gate, fcntl.LOCK_EX)
+
+        with open(_file_path, 'r') as f:
+            start_time = time.monotonic()
+            with pytest.raises(TimeoutError):
+                lock_fair(f.fileno(), _file_path, 0.1, fcntl.LOCK_SH)
+
+        assert_that(time.monotonic() - start_time).is_less_than(0.3)
+
+
+def test_open_locked_fair():
+    f = open_locked(_file_path, 1, fcntl.LOCK_SH, fair=True)
+    release(f)
+
+    assert_that(os.path.exists(get_gate_file_path(_file_path))).is_true()
+    assert_that(open_locked(f'{_temp_test_folder}/missing.json', 1, fair=True)).is_none()
+    assert_that(os.path.exists(get_gate_file_path(f'{_temp_test_folder}/missing.json'))).is_false()
+
+
+def test_writer_preferred_module_functions(writer_preferred):
+    stop = threading.Event()
+    readers = run_readers(stop)
+
+    try:
+        write_json(_file_path, {'a': 2})
+        assert_that(read_json(_file_path)).is_equal_to({'a': 2})
+
+        json_safe_dump(_file_path, {'a': 3})
+        assert_that(json_safe_load(_file_path)).is_equal_to({'a': 3})
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+
+def test_writer_wait_max_metric(writer_preferred):
+    records = []
+
+    def sink(kind, name, value, labels):
+        records.append((kind, name, value, labels))
+
+    metrics.add_sink(sink)
+    try:
+        write_json(_file_path, {'a': 2})
+    finally:
+        metrics.remove_sink(sink)
+
+    assert_that([(kind, labels) for kind, name, _, labels in records if name == 'lock_wait_max_seconds']) \
+        .is_equal_to([('max', {'lock': 'exclusive'})])
+
+
+def test_writer_not_starved_by_reader_threads(writer_preferred):
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            f = open_locked(_file_path, 5, fcntl.LOCK_SH)
+            time.sleep(0.02)
+            release(f)
+
+    # overlapping reader threads of the process share its flock
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for reader in readers:
+        reader.start()
+        time.sleep(0.01)
+
+    try:
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            waited = pool.apply(lock_exclusive, (_file_path, 2.0))
+    finally:
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+    assert_that(waited).is_less_than(1.0)
@@ -0,0 +1,172 @@
+#!/bin/python3
+
+import os
+import shutil
+import stat
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import checksum, durability, generations, with_backupfile
+from file_access_protector.with_backupfile import iter_load, json_safe_dump, json_safe_load, locked_update
+
+_temp_test_folder = "./tests/data/test_data_generations"
+_file_path = f'{_temp_test_folder}/data.json'
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data(monkeypatch):
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+    monkeypatch.setattr(with_backupfile, 'BACKUP_GENERATIONS', 3)
+
+    yield
+
+    generations.wait_pruned()
+    shutil.rmtree(_temp_test_folder)
+
+
+def generation_file_path(generation: int) -> str:
+    return generations.get_generation_file_path(_file_path, generation)
+
+
+def listed() -> list:
+    generations.wait_pruned()
+
+    return [generation for generation, _ in generations.list_generations(_file_path)]
+
+
+def corrupt(file_path: str) -> None:
+    with open(file_path, 'r+b') as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b'#!')
+
+
+def test_generation_file_path():
+    assert_that(generations.get_generation_file_path('/path/to/file.json', 3)).is_equal_to('/path/to/file.gen-3.json')
+    assert_that(generations.get_generation_file_path('file.yaml', 12)).is_equal_to('file.gen-12.yaml')
+
+
+def test_dump_links_new_generation():
+    for index in range(5):
+        json_safe_dump(_file_path, {'a': index})
+
+    assert_that(listed()).is_equal_to([5, 4, 3])
+    assert_that(os.path.samefile(_file_path, generation_file_path(5))).is_true()
+    assert_that(checksum.get_generation(_file_path)).is_equal_to(5)
+    # no backup file, the previous generations are the backups
+    assert_that(os.path.exists(with_backupfile.get_backup_file_path(_file_path))).is_false()
+
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 4})
+
+
+@pytest.mark.parametrize('checksums', [True, False])
+def test_newest_valid_generation_promoted(monkeypatch, checksums):
+    monkeypatch.setattr(with_backupfile, 'CHECKSUM', checksums)
+
+    for index in range(1, 4):
+        json_safe_dump(_file_path, {'a': index})
+
+    # the file (generation 3) and generation 2 are corrupted
+    corrupt(_file_path)
+    corrupt(generation_file_path(2))
+
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 1})
+
+    # promoted by a link, the generations failing validation are removed
+    assert_that(os.path.samefile(_file_path, generation_file_path(1))).is_true()
+    assert_that(listed()).is_equal_to([1])
+
+    json_safe_dump(_file_path, {'a': 4})
+
+    assert_that(listed()).is_equal_to([2, 1])
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 4})
+
+
+def test_interrupted_dump(monkeypatch):
+    json_safe_dump(_file_path, {'a': 1})
+    json_safe_dump(_file_path, {'a': 2})
+
+    def interrupted_sync_file(fd, level):
+        raise InterruptedError('dump interrupted')
+
+    with monkeypatch.context() as patch:
+        # while the new generation is written
+        patch.setattr(durability, 'sync_file', interrupted_sync_file)
+
+        with pytest.raises(InterruptedError):
+            json_safe_dump(_file_path, {'a': 3})
+
+    # written to a temporary file, never linked as the file
+    assert_that(os.path.samefile(_file_path, generation_file_path(2))).is_true()
+    assert_that(checksum.verify(_file_path)).is_true()
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+
+
+def test_no_valid_generation():
+    json_safe_dump(_file_path, {'a': 1})
+    corrupt(_file_path)
+
+    with pytest.raises(ValueError):
+        json_safe_load(_file_path)
+
+
+def test_iter_load_continues_from_generation():
+    json_safe_dump(_file_path, [1, 2, 3])
+    json_safe_dump(_file_path, [1, 2, 3, 4])
+
+    # torn: the parse fails after the first items
+    with open(_file_path, 'r+b') as f:
+        f.truncate(os.path.getsize(_file_path) - 3)
+
+    assert_that(list(iter_load(_file_path))).is_equal_to([1, 2, 3])
+    assert_that(os.path.samefile(_file_path, generation_file_path(1))).is_true()
+
+
+def test_numbering_without_checksum_file():
+    json_safe_dump(_file_path, {'a': 1})
+    json_safe_dump(_file_path, {'a': 2})
+    os.remove(checksum.get_checksum_file_path(_file_path))
+
+    json_safe_dump(_file_path, {'a': 3})
+
+    assert_that(listed()).is_equal_to([3, 2, 1])
+
+
+def test_locked_update():
+    with locked_update(_file_path, default={'count': 0}) as content:
+        content['count'] += 1
+    with locked_update(_file_path) as content:
+        content['count'] += 1
+
+    assert_that(json_safe_load(_file_path)).is_equal_to({'count': 2})
+    assert_that(listed()).is_equal_to([2, 1])
+
+
+def test_file_mode():
+    json_safe_dump(_file_path, {'a': 1})
+    os.chmod(_file_path, 0o640)
+
+    json_safe_dump(_file_path, {'a': 2})
+
+    assert_that(stat.S_IMODE(os.stat(_file_path).st_mode)).is_equal_to(0o640)
+    assert_that(stat.S_IMODE(os.stat(generation_file_path(2)).st_mode)).is_equal_to(0o640)
+
+
+def test_prune():
+    for generation in range(1, 6):
+        with open(generation_file_path(generation), 'w') as f:
+            f.write('{}')
+
+    generations.prune(_file_path, 2)
+
+    assert_that([generation for generation, _ in generations.list_generations(_file_path)]).is_equal_to([5, 4])
+
+
+def test_invalid_generation_count(monkeypatch):
+    monkeypatch.setattr(with_backupfile, 'BACKUP_GENERATIONS', 1)
+
+    with pytest.raises(AttributeError):
+        json_safe_dump(_file_path, {'a': 1})
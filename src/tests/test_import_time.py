@@ -0,0 +1,60 @@
+#!/bin/python3
+
+import pytest
+from assertpy import assert_that
+
+from benchmarks.bench_import import HEAVY_MODULES, import_time, imported_modules
+
+# generous bound (median of a few fresh interpreters), catches a heavy module imported eagerly again
+IMPORT_TIME_BUDGET = 0.15  # second
+
+_temp_test_folder = "./tests/data/test_data_import_time"
+
+
+@pytest.mark.parametrize('module', ['file_access_protector',
+                                    'file_access_protector.with_backupfile',
+                                    'file_access_protector.without_backupfile'])
+def test_no_heavy_module_on_import(module):
+    assert_that(imported_modules(f'import {module}')).does_not_contain(*HEAVY_MODULES)
+
+
+def test_json_calls_do_not_import_yaml_or_psutil():
+    modules = imported_modules(
+        'import os, file_access_protector as fap\n'
+        f'os.makedirs("{_temp_test_folder}", exist_ok=True)\n'
+        f'fap.json_safe_dump("{_temp_test_folder}/data.json", {{"a": 1}})\n'
+        f'assert fap.json_safe_load("{_temp_test_folder}/data.json") == {{"a": 1}}\n'
+        f'assert fap.read_json("{_temp_test_folder}/data.json") == {{"a": 1}}\n'
+        f'import shutil; shutil.rmtree("{_temp_test_folder}")')
+
+    assert_that(modules).does_not_contain('yaml', 'psutil', 'asyncio')
+
+
+def test_yaml_imported_on_first_yaml_call():
+    modules = imported_modules(
+        'import os, file_access_protector as fap\n'
+        f'os.makedirs("{_temp_test_folder}", exist_ok=True)\n'
+        f'fap.yaml_safe_dump("{_temp_test_folder}/data.yaml", {{"a": 1}})\n'
+        f'import shutil; shutil.rmtree("{_temp_test_folder}")')
+
+    assert_that(modules).contains('yaml')
+
+
+def test_top_level_api():
+    import file_access_protector as fap
+    from file_access_protector import with_backupfile, without_backupfile
+
+    assert_that(fap.json_safe_load).is_same_as(with_backupfile.json_safe_load)
+    assert_that(fap.locked_update).is_same_as(with_backupfile.locked_update)
+    assert_that(fap.read_json).is_same_as(without_backupfile.read_json)
+    assert_that(dir(fap)).contains(*fap.__all__)
+
+    with pytest.raises(AttributeError):
+        fap.not_a_function
+
+
+def test_import_time_budget():
+    times = sorted(import_time('file_access_protector.with_backupfile') for _ in range(3))
+
+    print(f'file_access_protector.with_backupfile import time: {times[1] * 1000:.1f} ms')
+    assert_that(times[1]).is_less_than(IMPORT_TIME_BUDGET)
@@ -0,0 +1,184 @@
+#!/bin/python3
+
+import fcntl
+import io
+import json
+import os
+import shutil
+from contextlib import closing
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import checksum, with_backupfile
+from file_access_protector.journal import get_journal_file_path
+from file_access_protector.stream import iter_json_items, iter_yaml_items
+from file_access_protector.with_backupfile import (iter_load, journal_update, json_safe_dump, json_safe_load,
+                                                   safe_dump)
+
+_temp_test_folder = "./tests/data/test_data_iter_load"
+_records = [{"id": i, "name": f"record {i}", "score": i * 1.5, "tags": ["a", "b"] if i % 2 else []}
+            for i in range(200)]
+_mapping = {f"key{i}": {"value": i, "nested": [i, str(i)]} for i in range(50)}
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_iter_json_items_chunk_boundaries(chunk_size):
+    data = [0, 12345, -1.5e10, "ü ✓ \"quoted\"", None, True, {"a": [1, {}]}, [], 67890]
+
+    items = iter_json_items(io.BytesIO(json.dumps(data, ensure_ascii=False).encode()), chunk_size)
+    assert_that(list(items)).is_equal_to(data)
+
+    items = iter_json_items(io.BytesIO(json.dumps(_mapping, indent=4).encode()), chunk_size)
+    assert_that(dict(items)).is_equal_to(_mapping)
+
+
+@pytest.mark.parametrize('content', [b'', b'123', b'[1, 2', b'[1 2]', b'[1, 2] 3', b'{"a" 1}'])
+def test_iter_json_items_invalid(content):
+    with pytest.raises(ValueError):
+        list(iter_json_items(io.BytesIO(content), 2))
+
+
+def test_iter_yaml_items():
+    content = b'- a: 1\n  b: &x [1, 2]\n- *x\n- 3\n'
+
+    assert_that(list(iter_yaml_items(io.BytesIO(content)))).is_equal_to([{'a': 1, 'b': [1, 2]}, [1, 2], 3])
+
+    for content in [b'', b'just a string', b'- 1\n---\n- 2\n']:
+        with pytest.raises(ValueError):
+            list(iter_yaml_items(io.BytesIO(content)))
+
+
+@pytest.mark.parametrize('extension', ['json', 'yaml'])
+def test_iter_load(extension):
+    list_file_path = f'{_temp_test_folder}/records.{extension}'
+    dict_file_path = f'{_temp_test_folder}/mapping.{extension}'
+    safe_dump(list_file_path, _records)
+    safe_dump(dict_file_path, _mapping)
+
+    assert_that(list(iter_load(list_file_path))).is_equal_to(_records)
+    assert_that(dict(iter_load(dict_file_path))).is_equal_to(_mapping)
+
+
+def test_iter_load_holds_shared_lock():
+    file_path = f'{_temp_test_folder}/records.json'
+    json_safe_dump(file_path, _records)
+
+    with closing(iter_load(file_path)) as items:
+        next(items)
+
+        with open(file_path, 'r') as f:
+            fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+@pytest.mark.parametrize('extension', ['json', 'yaml'])
+def test_iter_load_recover_from_backup_partway(extension):
+    file_path = f'{_temp_test_folder}/records.{extension}'
+    safe_dump(file_path, _records)
+
+    # keep the first half, then garbage (ex. torn write)
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    with open(file_path, 'wb') as f:
+        f.write(content[:len(content) // 2] + b'\x00{[garbage')
+
+    assert_that(list(iter_load(file_path))).is_equal_to(_records)
+
+    with open(file_path, 'rb') as f:
+        assert_that(f.read()).is_equal_to(content)
+
+
+@pytest.mark.parametrize('torn', [True, False])
+def test_iter_load_checksum_failed(monkeypatch, torn):
+    file_path = f'{_temp_test_folder}/records.json'
+    json_safe_dump(file_path, [1, 2, 3, 4])
+
+    if torn:
+        # dump interrupted while the file is rewritten in place
+        write_file = with_backupfile._write_file
+
+        def torn_write_file(path, payload, level):
+            if path != file_path:
+                return write_file(path, payload, level)
+
+            with open(path, 'wb') as f:
+                f.write(payload[:len(payload) // 2])
+            raise InterruptedError('dump interrupted')
+
+        with monkeypatch.context() as patch:
+            patch.setattr(with_backupfile, '_write_file', torn_write_file)
+
+            with pytest.raises(InterruptedError):
+                json_safe_dump(file_path, [10, 20, 30, 40])
+
+        assert_that(checksum.is_pending(file_path)).is_true()
+
+    else:
+        with open(file_path, 'w') as f:
+            f.write('[10, 20, 3')
+
+    # not [10, 20, 3, 4]
+    assert_that(list(iter_load(file_path))).is_equal_to([1, 2, 3, 4])
+    assert_that(json_safe_load(file_path)).is_equal_to([1, 2, 3, 4])
+
+
+def test_iter_load_edited_file():
+    file_path = f'{_temp_test_folder}/records.json'
+    json_safe_dump(file_path, [1, 2, 3, 4])
+
+    with open(file_path, 'w') as f:
+        f.write('[10, 20, 30]')
+
+    assert_that(list(iter_load(file_path))).is_equal_to([10, 20, 30])
+
+
+def test_iter_load_without_backup():
+    file_path = f'{_temp_test_folder}/records.json'
+    with open(file_path, 'w') as f:
+        f.write('[1, 2, oops]')
+
+    items = iter_load(file_path)
+
+    assert_that(next(items)).is_equal_to(1)
+    assert_that(next(items)).is_equal_to(2)
+    with pytest.raises(ValueError):
+        next(items)
+
+
+def test_iter_load_journaled_file():
+    file_path = f'{_temp_test_folder}/mapping.json'
+    json_safe_dump(file_path, {'a': 1})
+    journal_update(file_path, {'b': 2})
+
+    assert_that(os.path.isfile(get_journal_file_path(file_path))).is_true()
+    assert_that(dict(iter_load(file_path))).is_equal_to({'a': 1, 'b': 2})
+
+
+def test_iter_load_unsupported():
+    file_path = f'{_temp_test_folder}/records.pkl'
+    safe_dump(file_path, _records)
+
+    with pytest.raises(AttributeError):
+        next(iter_load(file_path))
+
+    with pytest.raises(AttributeError):
+        next(iter_load(f'{_temp_test_folder}/missing.json'))
@@ -0,0 +1,92 @@
+#!/bin/python3
+
+import json
+import os
+import shutil
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector.journal import apply_merge_patch, get_journal_file_path
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load, journal_update, yaml_safe_load
+
+_temp_test_folder = "./tests/data/test_data_journal"
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+def read_json(file_path: str):
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+def test_apply_merge_patch():
+    target = {'a': 1, 'b': {'c': 2, 'd': 3}, 'e': [1, 2]}
+
+    result = apply_merge_patch(target, {'a': None, 'b': {'c': 20}, 'e': [3], 'f': {'g': 4}})
+
+    assert_that(result).is_equal_to({'b': {'c': 20, 'd': 3}, 'e': [3], 'f': {'g': 4}})
+
+
+def test_update_is_appended_and_replayed_on_load():
+    file_path = f'{_temp_test_folder}/state.json'
+    json_safe_dump(file_path, {'a': 1, 'b': 2})
+
+    journal_update(file_path, {'a': 10})
+    journal_update(file_path, {'b': None, 'c': {'d': 1}})
+
+    assert_that(read_json(file_path)).is_equal_to({'a': 1, 'b': 2})
+    assert_that(os.path.isfile(get_journal_file_path(file_path))).is_true()
+    assert_that(json_safe_load(file_path)).is_equal_to({'a': 10, 'c': {'d': 1}})
+
+
+def test_compaction():
+    file_path = f'{_temp_test_folder}/state.yaml'
+    backup_file_path = f'{_temp_test_folder}/state_backup.yaml'
+
+    for i in range(5):
+        journal_update(file_path, {f'key{i}': i}, max_records=3)
+
+    expected = {f'key{i}': i for i in range(5)}
+    assert_that(yaml_safe_load(file_path)).is_equal_to(expected)
+
+    # compacted after the 3rd record, 2 records left in the new journal
+    with open(get_journal_file_path(file_path), 'r') as f:
+        assert_that(f.read().count('\n')).is_equal_to(3)
+    assert_that(os.path.isfile(backup_file_path)).is_true()
+
+
+def test_torn_record_is_ignored_and_repaired():
+    file_path = f'{_temp_test_folder}/state.json'
+    json_safe_dump(file_path, {})
+    journal_update(file_path, {'a': 1})
+
+    with open(get_journal_file_path(file_path), 'a') as f:
+        f.write('{"seq":2,"patch":{"b"')
+
+    assert_that(json_safe_load(file_path)).is_equal_to({'a': 1})
+
+    journal_update(file_path, {'c': 3})
+
+    assert_that(json_safe_load(file_path)).is_equal_to({'a': 1, 'c': 3})
+
+
+def test_full_dump_supersedes_journal():
+    file_path = f'{_temp_test_folder}/state.json'
+    json_safe_dump(file_path, {'a': 1})
+    journal_update(file_path, {'b': 2})
+
+    json_safe_dump(file_path, {'z': 0})
+
+    assert_that(os.path.exists(get_journal_file_path(file_path))).is_false()
+    assert_that(json_safe_load(file_path)).is_equal_to({'z': 0})
@@ -1,8 +1,10 @@
 #!/bin/python3
 
+import fcntl
 import json
 import os
 import shutil
+import stat
 import time
 from dataclasses import dataclass
 from threading import Thread
@@ -11,7 +13,7 @@ from unittest.mock import patch
 import pytest
 from assertpy import assert_that
 
-from file_access_protector.with_backupfile import json_safe_dump, json_safe_load
+from file_access_protector.with_backupfile import locked_update, json_safe_dump, json_safe_load
 
 _temp_test_folder = "./tests/data/test_data_json"
 _test_file_path = "./tests/data/test_data.json"
@@ -200,13 +202,79 @@ def test_concurrent_json_file_access():
     assert_that(backup_content).is_equal_to(_data)
 
 
-@patch('subprocess.call', return_value=1)
-def test_get_file_lock_timeout(mock_subprocess_call):
+@patch('file_access_protector.with_backupfile.ATOMIC_WRITE', True)
+def test_concurrent_json_file_access_atomic():
+
+    file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
+    statistic = Statistic()
+
+    test_time = 2  # seconds
+
+    threads = [Thread(target=read_func, args=(file_path, statistic, test_time), daemon=True) for _ in range(2)] + \
+        [Thread(target=write_func, args=(file_path, _data, statistic, test_time), daemon=True) for _ in range(2)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert_that(statistic.read_timeout_count).is_equal_to(0)
+    assert_that(statistic.read_fail_count).is_equal_to(0)
+    assert_that(statistic.write_timeout_count).is_equal_to(0)
+    assert_that(statistic.write_fail_count).is_equal_to(0)
+
+    assert_that(json_safe_load(file_path)).is_equal_to(_data)
+
+
+def test_get_file_lock_timeout():
     file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
 
-    with pytest.raises(TimeoutError):
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+        with pytest.raises(TimeoutError):
+            r = json_safe_load(file_path, timeout=0.1)
+
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def test_get_file_lock_without_subprocess():
+    file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
+
+    with patch('subprocess.call') as mock_subprocess_call:
         r = json_safe_load(file_path)
 
+    mock_subprocess_call.assert_not_called()
+
+
+def test_load_with_shared_lock_held():
+    file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
+
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+
+        r = json_safe_load(file_path, timeout=0.1)
+
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    assert_that(r).is_equal_to(_data)
+
+
+def test_load_recover_from_backup():
+    file_path = f'{_temp_test_folder}/recover.json'
+    backup_file_path = f'{_temp_test_folder}/recover_backup.json'
+
+    with open(file_path, 'w') as f:
+        f.write('[{"corrupted": ')
+    with open(backup_file_path, 'w') as f:
+        json.dump({'a': 1}, f)
+
+    r = json_safe_load(file_path)
+
+    assert_that(r).is_equal_to({'a': 1})
+    with open(file_path, 'r') as f:
+        assert_that(json.load(f)).is_equal_to({'a': 1})
+
 
 def test_load_file_not_exist():
     file_path = f'{_temp_test_folder}/abc.json'
@@ -239,7 +307,49 @@ def test_write_new_file():
     assert_that(os.path.exists(backup_file_path))
 
 
-@patch('json.load', return_value="")
+def test_atomic_dump():
+    file_path = f'{_temp_test_folder}/atomic.json'
+    backup_file_path = f'{_temp_test_folder}/atomic_backup.json'
+
+    json_safe_dump(file_path, {'generation': 1}, atomic=True)
+    first_inode = os.stat(file_path).st_ino
+    json_safe_dump(file_path, {'generation': 2}, atomic=True)
+
+    with open(file_path, 'r') as f:
+        assert_that(json.load(f)).is_equal_to({'generation': 2})
+    with open(backup_file_path, 'r') as f:
+        assert_that(json.load(f)).is_equal_to({'generation': 1})
+
+    # previous generation kept as backup without copying it
+    assert_that(os.stat(backup_file_path).st_ino).is_equal_to(first_inode)
+    assert_that([n for n in os.listdir(_temp_test_folder) if n.endswith('.tmp')]).is_empty()
+
+
+def test_atomic_dump_file_mode():
+    file_path = f'{_temp_test_folder}/atomic_mode.json'
+    umask = os.umask(0o027)
+
+    try:
+        # new files follow the umask, as with open()
+        json_safe_dump(file_path, {'generation': 1}, atomic=True)
+        assert_that(stat.S_IMODE(os.stat(file_path).st_mode)).is_equal_to(0o640)
+        assert_that(stat.S_IMODE(os.stat(f'{_temp_test_folder}/atomic_mode_backup.json').st_mode)).is_equal_to(0o640)
+
+        # the replaced file keeps its mode
+        os.chmod(file_path, 0o644)
+        json_safe_dump(file_path, {'generation': 2}, atomic=True)
+        assert_that(stat.S_IMODE(os.stat(file_path).st_mode)).is_equal_to(0o644)
+
+        # and its owner, where allowed
+        if os.geteuid() == 0:
+            os.chown(file_path, 1234, 1234)
+            json_safe_dump(file_path, {'generation': 3}, atomic=True)
+            assert_that((os.stat(file_path).st_uid, os.stat(file_path).st_gid)).is_equal_to((1234, 1234))
+    finally:
+        os.umask(umask)
+
+
+@patch('file_access_protector.codec.JSON.loads', return_value="")
 def test_file_and_backup_corruption_in_load(mock_json_load):
     file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
 
@@ -247,7 +357,7 @@ def test_file_and_backup_corruption_in_load(mock_json_load):
         r = json_safe_load(file_path)
 
 
-@patch('json.load', return_value="")
+@patch('file_access_protector.codec.JSON.loads', return_value="")
 def test_file_corruption_in_dump(mock_json_load):
     file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
 
@@ -255,7 +365,7 @@ def test_file_corruption_in_dump(mock_json_load):
         json_safe_dump(file_path, {})
 
 
-@patch('json.load', return_value="")
+@patch('file_access_protector.codec.JSON.loads', return_value="")
 def test_file_corruption_and_backup_not_exist_in_load(mock_json_load):
     file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
     backup_file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path).replace(".json", "_backup.json")}'
@@ -265,3 +375,48 @@ def test_file_corruption_and_backup_not_exist_in_load(mock_json_load):
 
     with pytest.raises(ValueError):
         r = json_safe_load(file_path)
+
+
+def test_locked_update_no_lost_update():
+    file_path = f'{_temp_test_folder}/counter.json'
+    update_count = 50
+
+    def increase():
+        for _ in range(update_count):
+            with locked_update(file_path, default={'count': 0}) as content:
+                content['count'] += 1
+
+    threads = [Thread(target=increase, daemon=True) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert_that(json_safe_load(file_path)).is_equal_to({'count': 4 * update_count})
+
+
+def test_locked_update_not_written_on_error():
+    file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
+
+    with pytest.raises(KeyError):
+        with locked_update(file_path) as content:
+            content['web-app'] = None
+            raise KeyError('abort')
+
+    assert_that(json_safe_load(file_path)).is_equal_to(_data)
+
+
+
+def test_locked_update_created_file_mode():
+    file_path = f'{_temp_test_folder}/created.json'
+    umask = os.umask(0o022)
+
+    try:
+        with locked_update(file_path, default={'count': 0}) as content:
+            content['count'] += 1
+    finally:
+        os.umask(umask)
+
+    # same mode as its backup file, as with open()
+    assert_that(stat.S_IMODE(os.stat(file_path).st_mode)).is_equal_to(0o644)
+    assert_that(stat.S_IMODE(os.stat(f'{_temp_test_folder}/created_backup.json').st_mode)).is_equal_to(0o644)
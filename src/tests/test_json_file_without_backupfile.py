@@ -11,7 +11,7 @@ from unittest.mock import patch
 import pytest
 from assertpy import assert_that
 
-from file_access_protector.without_backupfile import read_json, write_json
+from file_access_protector.without_backupfile import locked_update, read_json, write_json
 
 _temp_test_folder = "./tests/data/test_data_json"
 _test_file_path = "./tests/data/test_data.json"
@@ -180,3 +180,49 @@ def test_concurrent_json_file_access():
 
     assert_that(Statistic.read_fail_count).is_equal_to(0)
     assert_that(Statistic.write_fail_count).is_equal_to(0)
+
+
+def test_locked_update_no_lost_update():
+    file_path = f'{_temp_test_folder}/counter.json'
+    update_count = 50
+
+    def increase():
+        for _ in range(update_count):
+            with locked_update(file_path, default={'count': 0}) as content:
+                content['count'] += 1
+
+    threads = [Thread(target=increase, daemon=True) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert_that(read_json(file_path)).is_equal_to({'count': 4 * update_count})
+
+
+def test_locked_update_not_written_on_error():
+    file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
+
+    with pytest.raises(KeyError):
+        with locked_update(file_path) as content:
+            content['web-app'] = None
+            raise KeyError('abort')
+
+    assert_that(read_json(file_path)).is_equal_to(_data)
+
+
+
+def test_locked_update_missing_file():
+    file_path = f'{_temp_test_folder}/missing.json'
+
+    with pytest.raises(AttributeError):
+        with locked_update(file_path) as content:
+            content['a'] = 1
+
+    assert_that(os.path.exists(file_path)).is_false()
+    assert_that(read_json(file_path)).is_none()
+
+    with locked_update(file_path, default={'a': 0}) as content:
+        content['a'] += 1
+
+    assert_that(read_json(file_path)).is_equal_to({'a': 1})
@@ -0,0 +1,174 @@
+#!/bin/python3
+
+import json
+import os
+import shutil
+import timeit
+from unittest.mock import patch
+
+import pytest
+from assertpy import assert_that
+
+from benchmarks.bench_serializers import make_document
+from file_access_protector import cache, with_backupfile, without_backupfile
+from file_access_protector.cache import CACHE_MODES, MISS, FrozenDict, LoadCache
+from file_access_protector.codec import JSON
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load, yaml_safe_dump, yaml_safe_load
+from file_access_protector.without_backupfile import read_json, write_json
+
+_temp_test_folder = "./tests/data/test_data_cache"
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.fixture
+def settled(monkeypatch):
+    # entries recorded long after the file mtime, trusted right away
+    monkeypatch.setattr(cache, 'MTIME_GRANULARITY_NS', -10**18)
+
+
+def write_file(file_name: str, content) -> str:
+    file_path = f'{_temp_test_folder}/{file_name}'
+    with open(file_path, 'w') as f:
+        json.dump(content, f)
+
+    return file_path
+
+
+def test_cache_hit_and_stat_invalidation(settled):
+    load_cache = LoadCache()
+    file_path = write_file('a.json', {'a': 1})
+
+    assert_that(load_cache.get(file_path, os.stat(file_path))).is_same_as(MISS)
+    load_cache.put(file_path, os.stat(file_path), {'a': 1})
+    assert_that(load_cache.get(file_path, os.stat(file_path))).is_equal_to({'a': 1})
+
+    write_file('a.json', {'a': 22})
+    assert_that(load_cache.get(file_path, os.stat(file_path))).is_same_as(MISS)
+
+
+def test_cache_rewritten_in_same_mtime_tick():
+    load_cache = LoadCache()
+    file_path = write_file('a.json', {'a': 1})
+    file_stat = os.stat(file_path)
+    load_cache.put(file_path, file_stat, {'a': 1})
+
+    # rewritten in place by another process, same size and mtime
+    write_file('a.json', {'a': 2})
+    os.utime(file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+
+    assert_that(load_cache.get(file_path, os.stat(file_path))).is_same_as(MISS)
+
+
+def test_cache_modes(settled):
+    load_cache = LoadCache()
+    file_path = write_file('a.json', {'a': [1]})
+    content = {'a': [1]}
+    load_cache.put(file_path, os.stat(file_path), content, 'shared')
+
+    assert_that(load_cache.get(file_path, os.stat(file_path), 'shared')).is_same_as(content)
+    assert_that(load_cache.get(file_path, os.stat(file_path), 'copy')).is_not_same_as(content)
+    assert_that(load_cache.get(file_path, os.stat(file_path), 'copy')['a']).is_not_same_as(content['a'])
+
+    frozen = load_cache.get(file_path, os.stat(file_path), 'frozen')
+    assert_that(frozen).is_instance_of(FrozenDict)
+    assert_that(frozen).is_equal_to(content)
+    with pytest.raises(TypeError):
+        frozen['a'] = 2
+    with pytest.raises(AttributeError):
+        frozen['a'].append(2)
+
+
+def test_copy_mode_not_shared(settled):
+    load_cache = LoadCache()
+    file_path = write_file('a.json', {'a': [1]})
+    content = {'a': [1]}
+
+    # the parsed content of a miss is returned as is, not copied
+    assert_that(load_cache.put(file_path, os.stat(file_path), content)).is_same_as(content)
+    content['a'].append(2)
+
+    first = load_cache.get(file_path, os.stat(file_path))
+    assert_that(first).is_equal_to({'a': [1]})
+    first['a'].append(3)
+
+    assert_that(load_cache.get(file_path, os.stat(file_path))).is_equal_to({'a': [1]})
+    assert_that(load_cache.get(file_path, os.stat(file_path), 'shared')).is_equal_to({'a': [1]})
+
+
+@pytest.mark.parametrize('mode', CACHE_MODES)
+def test_hit_faster_than_miss(settled, mode):
+    file_path = f'{_temp_test_folder}/cached.yaml'
+    yaml_safe_dump(file_path, make_document(0.1))
+
+    def best_time(load_cache) -> float:
+        with patch.object(with_backupfile, 'load_cache', load_cache):
+            yaml_safe_load(file_path, mode)
+            return min(timeit.repeat(lambda: yaml_safe_load(file_path, mode), number=1, repeat=5))
+
+    assert_that(best_time(LoadCache())).is_less_than(best_time(None) / 2)
+
+
+def test_cache_lru_eviction(settled):
+    load_cache = LoadCache(max_entries=2, max_bytes=1024)
+    paths = [write_file(f'{i}.json', {'i': i}) for i in range(3)]
+
+    for path in paths[:2]:
+        load_cache.put(path, os.stat(path), {})
+    load_cache.get(paths[0], os.stat(paths[0]))  # paths[1] is now least recently used
+    load_cache.put(paths[2], os.stat(paths[2]), {})
+
+    assert_that(len(load_cache)).is_equal_to(2)
+    assert_that(load_cache.get(paths[1], os.stat(paths[1]))).is_same_as(MISS)
+    assert_that(load_cache.get(paths[0], os.stat(paths[0]))).is_not_same_as(MISS)
+
+    big_path = write_file('big.json', {'data': 'x' * 1024})
+    load_cache.put(big_path, os.stat(big_path), {})
+
+    assert_that(load_cache.get(big_path, os.stat(big_path))).is_same_as(MISS)
+    assert_that(load_cache.total_bytes).is_less_than_or_equal_to(1024)
+
+
+@pytest.mark.parametrize('module, load, dump', [
+    (with_backupfile, json_safe_load, json_safe_dump),
+    (without_backupfile, read_json, write_json),
+])
+def test_load_skips_parse_and_dump_writes_through(settled, module, load, dump):
+    file_path = f'{_temp_test_folder}/cached.json'
+
+    with patch.object(module, 'load_cache', LoadCache()):
+        dump(file_path, {'a': 1})
+
+        with patch.object(JSON, 'loads') as mock_loads:
+            assert_that(load(file_path)).is_equal_to({'a': 1})
+            assert_that(load(file_path)).is_equal_to({'a': 1})
+
+        mock_loads.assert_not_called()
+
+
+def test_dump_replaced_before_write_through():
+    file_path = f'{_temp_test_folder}/cached.json'
+    update_load_cache = with_backupfile._update_load_cache
+
+    def racing_update_load_cache(*args):
+        # another process locking the renamed file dumps before the write-through
+        write_file('replaced.json', {'v': 'E'})
+        os.replace(f'{_temp_test_folder}/replaced.json', file_path)
+
+        update_load_cache(*args)
+
+    with patch.object(with_backupfile, 'load_cache', LoadCache()):
+        with patch.object(with_backupfile, '_update_load_cache', racing_update_load_cache):
+            json_safe_dump(file_path, {'v': 'B'}, atomic=True)
+
+        assert_that(json_safe_load(file_path)).is_equal_to({'v': 'E'})
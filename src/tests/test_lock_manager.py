@@ -0,0 +1,146 @@
+#!/bin/python3
+
+import asyncio
+import fcntl
+import os
+import shutil
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import aio, descriptors, lock
+from file_access_protector.lock import open_locked, release
+from file_access_protector.lock_manager import LockManager
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load, locked_update
+from file_access_protector.without_backupfile import read_json, write_json
+
+_temp_test_folder = "./tests/data/test_data_lock_manager"
+_lock_dir = f'{_temp_test_folder}/locks'
+_file_path = f'{_temp_test_folder}/data.json'
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    descriptors.clear()
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.fixture
+def lock_manager(monkeypatch):
+    lock_manager = LockManager(_lock_dir)
+    monkeypatch.setattr(lock, 'LOCK_MANAGER', lock_manager)
+
+    return lock_manager
+
+
+def test_lock_file_path():
+    lock_manager = LockManager(_lock_dir)
+
+    assert_that(os.path.isdir(_lock_dir)).is_true()
+    assert_that(lock_manager.get_lock_file_path(_file_path)) \
+        .starts_with(f'{_lock_dir}/').ends_with('.lock') \
+        .is_equal_to(lock_manager.get_lock_file_path(os.path.abspath(_file_path))) \
+        .is_not_equal_to(lock_manager.get_lock_file_path(f'{_file_path}.other'))
+
+
+def test_striped_lock_file_path():
+    lock_manager = LockManager(_lock_dir, stripes=4)
+
+    lock_file_paths = {lock_manager.get_lock_file_path(f'{_temp_test_folder}/{index}.json') for index in range(100)}
+
+    assert_that(lock_file_paths).is_equal_to({f'{_lock_dir}/stripe-{stripe}.lock' for stripe in range(4)})
+
+    with pytest.raises(ValueError):
+        LockManager(_lock_dir, stripes=0)
+
+
+def test_lock_kept_apart(lock_manager):
+    json_safe_dump(_file_path, {'a': 1})
+
+    f = open_locked(_file_path, 1, fcntl.LOCK_EX)
+    try:
+        # the data file itself is not locked, its lock file is
+        with open(_file_path, 'r') as other:
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        with open(lock_manager.get_lock_file_path(_file_path), 'r') as other:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other, fcntl.LOCK_SH | fcntl.LOCK_NB)
+
+        assert_that(os.fstat(f.fileno()).st_ino).is_equal_to(os.stat(_file_path).st_ino)
+    finally:
+        release(f)
+
+
+@pytest.mark.parametrize('atomic', [False, True])
+def test_load_and_dump(lock_manager, atomic):
+    json_safe_dump(_file_path, {'a': 1}, atomic=atomic)
+    json_safe_dump(_file_path, {'a': 2}, atomic=atomic)
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2})
+
+    with locked_update(_file_path, atomic=atomic) as content:
+        content['b'] = 3
+    assert_that(json_safe_load(_file_path)).is_equal_to({'a': 2, 'b': 3})
+
+    write_json(_file_path, {'a': 4})
+    assert_that(read_json(_file_path)).is_equal_to({'a': 4})
+
+
+def test_replaced_file(lock_manager):
+    write_json(_file_path, {'a': 1})
+    assert_that(read_json(_file_path)).is_equal_to({'a': 1})
+
+    with open(f'{_file_path}.tmp', 'w') as f:
+        f.write('{"a": 2}')
+    os.replace(f'{_file_path}.tmp', _file_path)
+
+    # the pooled descriptor of the old inode is not used
+    assert_that(read_json(_file_path)).is_equal_to({'a': 2})
+
+
+def test_missing_file(lock_manager):
+    assert_that(read_json(_file_path)).is_none()
+    assert_that(open_locked(_file_path, 1, fcntl.LOCK_EX)).is_none()
+
+    assert_that(os.path.exists(_file_path)).is_false()
+
+
+def test_lock_dir_removed(lock_manager):
+    write_json(_file_path, {'a': 1})
+    descriptors.clear()
+    shutil.rmtree(_lock_dir)
+
+    assert_that(read_json(_file_path)).is_equal_to({'a': 1})
+    assert_that(os.path.isdir(_lock_dir)).is_true()
+
+
+def test_stripe_shared(monkeypatch):
+    monkeypatch.setattr(lock, 'LOCK_MANAGER', LockManager(_lock_dir, stripes=1))
+    write_json(f'{_temp_test_folder}/a.json', {'a': 1})
+    write_json(f'{_temp_test_folder}/b.json', {'b': 1})
+
+    f = open_locked(f'{_temp_test_folder}/a.json', 1, fcntl.LOCK_EX)
+    try:
+        with pytest.raises(TimeoutError):
+            release(open_locked(f'{_temp_test_folder}/b.json', 0.05, fcntl.LOCK_EX))
+    finally:
+        release(f)
+
+    assert_that(os.listdir(_lock_dir)).is_equal_to(['stripe-0.lock'])
+
+
+def test_aio(lock_manager):
+    async def main():
+        await aio.json_safe_dump(_file_path, {'a': 1})
+        await aio.write_json(f'{_temp_test_folder}/b.json', {'b': 1})
+
+        return await aio.json_safe_load(_file_path), await aio.read_json(f'{_temp_test_folder}/b.json')
+
+    assert_that(asyncio.run(main())).is_equal_to(({'a': 1}, {'b': 1}))
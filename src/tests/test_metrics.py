@@ -0,0 +1,152 @@
+#!/bin/python3
+
+import fcntl
+import logging
+import os
+import shutil
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import lock, metrics
+from file_access_protector.metrics import LoggingSink, PrometheusTextfileSink
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load, yaml_safe_dump, yaml_safe_load
+from file_access_protector.without_backupfile import read_json, write_json
+
+_temp_test_folder = "./tests/data/test_data_metrics"
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.fixture
+def records():
+    records = []
+
+    def sink(kind, name, value, labels):
+        records.append((kind, name, value, labels))
+
+    metrics.add_sink(sink)
+
+    yield records
+
+    metrics.remove_sink(sink)
+
+
+def names(records) -> set:
+    return {name for _, name, _, _ in records}
+
+
+def total(records, name: str) -> float:
+    return sum(value for _, record_name, value, _ in records if record_name == name)
+
+
+@pytest.mark.parametrize('load, dump', [(json_safe_load, json_safe_dump), (read_json, write_json)])
+def test_call_metrics(records, load, dump):
+    file_path = f'{_temp_test_folder}/data.json'
+    dump(file_path, {'a': 1})
+    dump(file_path, {'a': 2})
+    records.clear()
+
+    assert_that(load(file_path)).is_equal_to({'a': 2})
+
+    assert_that(names(records)).is_equal_to(
+        {'lock_wait_seconds', 'lock_wait_max_seconds', 'lock_hold_seconds', 'parse_seconds', 'read_bytes_total'})
+    assert_that(total(records, 'read_bytes_total')).is_equal_to(os.path.getsize(file_path))
+    assert_that(records).contains(('counter', 'read_bytes_total', os.path.getsize(file_path), {'codec': 'json'}))
+    assert_that([labels for _, name, _, labels in records if name == 'lock_hold_seconds']) \
+        .is_equal_to([{'lock': 'shared'}])
+
+    records.clear()
+    dump(file_path, {'a': 3})
+
+    assert_that(names(records)).contains('serialize_seconds', 'written_bytes_total', 'lock_hold_seconds')
+    assert_that(total(records, 'written_bytes_total')).is_equal_to(os.path.getsize(file_path))
+
+
+def test_backup_recovery_metric(records):
+    file_path = f'{_temp_test_folder}/data.yaml'
+    yaml_safe_dump(file_path, {'a': 1})
+    with open(file_path, 'w') as f:
+        f.write('{[')
+
+    assert_that(yaml_safe_load(file_path)).is_equal_to({'a': 1})
+    assert_that(records).contains(('counter', 'backup_recoveries_total', 1, {'codec': 'yaml'}))
+
+
+def test_retry_and_timeout_metrics(records):
+    file_path = f'{_temp_test_folder}/data.json'
+    json_safe_dump(file_path, {})
+
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        records.clear()
+
+        with pytest.raises(TimeoutError):
+            json_safe_load(file_path, timeout=0.05)
+
+    assert_that(total(records, 'lock_timeouts_total')).is_equal_to(1)
+    assert_that(total(records, 'lock_retries_total')).is_greater_than(0)
+
+
+def test_disabled_metrics_record_nothing():
+    file_path = f'{_temp_test_folder}/data.json'
+
+    assert_that(metrics.enabled).is_false()
+
+    json_safe_dump(file_path, {'a': 1})
+    json_safe_load(file_path)
+
+    assert_that(len(lock._locked_since)).is_equal_to(0)
+
+
+def test_logging_sink(caplog):
+    file_path = f'{_temp_test_folder}/data.json'
+    sink = LoggingSink(level=logging.INFO)
+
+    metrics.add_sink(sink)
+    try:
+        with caplog.at_level(logging.INFO, logger='file_access_protector.metrics'):
+            json_safe_dump(file_path, {'a': 1})
+    finally:
+        metrics.remove_sink(sink)
+
+    assert_that(caplog.text).contains('written_bytes_total')
+
+
+def test_prometheus_textfile_sink():
+    export_file_path = f'{_temp_test_folder}/metrics.prom'
+    sink = PrometheusTextfileSink(export_file_path, buckets=(0.01, 1), write_interval=3600)
+
+    sink('histogram', 'lock_wait_seconds', 0.005, {'lock': 'shared'})
+    sink('histogram', 'lock_wait_seconds', 0.5, {'lock': 'shared'})
+    sink('counter', 'read_bytes_total', 10, {'codec': 'json'})
+    sink('counter', 'read_bytes_total', 5, {'codec': 'json'})
+    sink('max', 'lock_wait_max_seconds', 0.2, {'lock': 'exclusive'})
+    sink('max', 'lock_wait_max_seconds', 0.1, {'lock': 'exclusive'})
+    sink.write()
+
+    with open(export_file_path, 'r') as f:
+        lines = f.read().splitlines()
+
+    assert_that(lines).is_equal_to([
+        '# TYPE file_access_protector_lock_wait_max_seconds gauge',
+        'file_access_protector_lock_wait_max_seconds{lock="exclusive"} 0.2',
+        '# TYPE file_access_protector_lock_wait_seconds histogram',
+        'file_access_protector_lock_wait_seconds_bucket{lock="shared",le="0.01"} 1',
+        'file_access_protector_lock_wait_seconds_bucket{lock="shared",le="1"} 2',
+        'file_access_protector_lock_wait_seconds_bucket{lock="shared",le="+Inf"} 2',
+        'file_access_protector_lock_wait_seconds_sum{lock="shared"} 0.505',
+        'file_access_protector_lock_wait_seconds_count{lock="shared"} 2',
+        '# TYPE file_access_protector_read_bytes_total counter',
+        'file_access_protector_read_bytes_total{codec="json"} 15',
+    ])
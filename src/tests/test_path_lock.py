@@ -0,0 +1,164 @@
+#!/bin/python3
+
+import fcntl
+import os
+import shutil
+import threading
+import time
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import lock
+from file_access_protector.lock import open_locked, release, upgrade
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load, locked_update
+
+_temp_test_folder = "./tests/data/test_data_path_lock"
+_file_path = f'{_temp_test_folder}/data.json'
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+    json_safe_dump(_file_path, {'count': 0})
+
+    yield
+
+    assert_that(lock._path_locks).is_empty()
+    shutil.rmtree(_temp_test_folder)
+
+
+def hold(lock_type: int, seconds: float) -> threading.Thread:
+    locked = threading.Event()
+
+    def run():
+        f = open_locked(_file_path, 1, lock_type)
+        locked.set()
+        time.sleep(seconds)
+        release(f)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    locked.wait()
+
+    return thread
+
+
+def test_writer_handoff():
+    reader = hold(fcntl.LOCK_SH, 0.1)
+
+    start_time = time.monotonic()
+    f = open_locked(_file_path, 1, fcntl.LOCK_EX)
+    waited = time.monotonic() - start_time
+    release(f)
+
+    reader.join()
+
+    # woken by the release instead of polling the flock (backoff up to 50 ms)
+    assert_that(waited).is_between(0.09, 0.13)
+
+
+def test_one_flock_per_process():
+    readers = [hold(fcntl.LOCK_SH, 0.1) for _ in range(3)]
+
+    f = open_locked(_file_path, 1, fcntl.LOCK_SH)
+    assert_that(lock._path_locks[_file_path].readers).is_equal_to(4)
+    assert_that(f.fileno()).is_equal_to(lock._path_locks[_file_path].file.fileno())
+    release(f)
+
+    for reader in readers:
+        reader.join()
+
+    # released with the last reader
+    with open(_file_path, 'r') as other:
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_waiting_writer_holds_back_readers():
+    reader = hold(fcntl.LOCK_SH, 0.2)
+
+    writer = threading.Thread(target=lambda: release(open_locked(_file_path, 1, fcntl.LOCK_EX)))
+    writer.start()
+    time.sleep(0.05)
+
+    with pytest.raises(TimeoutError):
+        open_locked(_file_path, 0.05, fcntl.LOCK_SH)
+
+    reader.join()
+    writer.join()
+
+
+def test_writer_timeout_lets_readers_in():
+    reader = hold(fcntl.LOCK_SH, 0.2)
+    writer_timed_out = threading.Event()
+
+    def write():
+        with pytest.raises(TimeoutError):
+            open_locked(_file_path, 0.05, fcntl.LOCK_EX)
+        writer_timed_out.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    time.sleep(0.01)
+
+    start_time = time.monotonic()
+    f = open_locked(_file_path, 1, fcntl.LOCK_SH)
+    waited = time.monotonic() - start_time
+    release(f)
+
+    reader.join()
+    writer.join()
+
+    assert_that(writer_timed_out.is_set()).is_true()
+    assert_that(waited).is_less_than(0.1)
+
+
+def test_upgrade():
+    reader = hold(fcntl.LOCK_SH, 0.1)
+
+    f = open_locked(_file_path, 1, fcntl.LOCK_SH)
+    start_time = time.monotonic()
+    upgrade(f, 1)
+
+    assert_that(time.monotonic() - start_time).is_between(0.05, 0.15)
+    with open(_file_path, 'r') as other:
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(other, fcntl.LOCK_SH | fcntl.LOCK_NB)
+
+    release(f)
+    reader.join()
+
+
+def test_upgrade_timeout():
+    reader = hold(fcntl.LOCK_SH, 0.2)
+
+    f = open_locked(_file_path, 1, fcntl.LOCK_SH)
+    with pytest.raises(TimeoutError):
+        upgrade(f, 0.05)
+    release(f)
+
+    reader.join()
+
+
+def test_concurrent_threads():
+    def increment():
+        for _ in range(50):
+            with locked_update(_file_path) as content:
+                content['count'] += 1
+            json_safe_load(_file_path)
+
+    threads = [threading.Thread(target=increment) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert_that(json_safe_load(_file_path)).is_equal_to({'count': 400})
+
+
+def test_missing_file():
+    assert_that(open_locked(f'{_temp_test_folder}/missing.json', 1, fcntl.LOCK_SH)).is_none()
+    assert_that(open_locked(f'{_temp_test_folder}/missing.json', 1, fcntl.LOCK_EX)).is_none()
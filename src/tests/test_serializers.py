@@ -0,0 +1,112 @@
+#!/bin/python3
+
+import json
+import math
+import os
+import shutil
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector import serializers
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load
+from file_access_protector.without_backupfile import read_json, write_json
+
+_temp_test_folder = "./tests/data/test_data_serializers"
+_test_file_path = "./tests/data/test_data.json"
+
+with open(_test_file_path, 'r') as f:
+    _data = json.load(f)
+
+_edge_data = [
+    {"unicode": "Philadelphia, PA – ünïcödé ✓", "slash": "/content/static", "escape": "a\"b\\c\n"},
+    {"float": 0.1, "exp": 1e-7, "negative": -12345678901, "bool": [True, False], "none": None},
+    {"nested": [[[]], {}, [{"a": [1, 2, {"b": {}}]}]]},
+    {"big": 2 ** 70, "negative_big": -2 ** 70, "u64": 2 ** 64 - 1, "digits": "12345678901234567890"},
+]
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+@pytest.mark.parametrize('backend', serializers.available_backends())
+@pytest.mark.parametrize('data', [_data] + _edge_data)
+def test_round_trip_equivalence(backend, data):
+    payload = serializers.dumps(data, backend)
+
+    assert_that(payload).is_instance_of(bytes)
+    assert_that(json.loads(payload)).is_equal_to(data)
+    for other_backend in serializers.available_backends():
+        assert_that(serializers.loads(payload, other_backend)).is_equal_to(data)
+
+
+
+@pytest.mark.parametrize('backend', serializers.available_backends())
+@pytest.mark.parametrize('data', _edge_data)
+def test_loads_buffer(backend, data):
+    payload = serializers.dumps(data, backend)
+
+    assert_that(serializers.loads_buffer(memoryview(payload), backend)).is_equal_to(data)
+    assert_that(serializers.loads_buffer(memoryview(b'\xef\xbb\xbf' + payload), 'json')).is_equal_to(data)
+
+@pytest.mark.parametrize('backend', serializers.available_backends())
+def test_fallback_to_json_for_unsupported_data(backend):
+    data = {"big": 2 ** 70, "inf": [float('inf'), -float('inf')], "none": None}
+    payload = serializers.dumps(data, backend)
+
+    assert_that(json.loads(payload)).is_equal_to(data)
+    for other_backend in serializers.available_backends():
+        assert_that(serializers.loads(payload, other_backend)).is_equal_to(data)
+        assert_that(serializers.loads(payload.decode(), other_backend)).is_equal_to(data)
+        assert_that(serializers.loads_buffer(memoryview(payload), other_backend)).is_equal_to(data)
+
+        # not null
+        assert_that(math.isnan(serializers.loads(serializers.dumps({"nan": float('nan')}, backend),
+                                                 other_backend)['nan'])).is_true()
+
+
+@pytest.mark.parametrize('backend', serializers.available_backends())
+def test_corrupted_data_still_fails(backend):
+    for payload in (b'{"a": 1', b'{"a": 123456789012345678901234'):
+        with pytest.raises(ValueError):
+            serializers.loads(payload, backend)
+        with pytest.raises(ValueError):
+            serializers.loads_buffer(memoryview(payload), backend)
+
+
+@pytest.mark.parametrize('backend', serializers.available_backends())
+@pytest.mark.parametrize('load, dump', [(json_safe_load, json_safe_dump), (read_json, write_json)])
+def test_dump_with_backend(backend, load, dump):
+    file_path = f'{_temp_test_folder}/data.json'
+
+    dump(file_path, _data, backend=backend)
+
+    assert_that(load(file_path)).is_equal_to(_data)
+
+    dump(file_path, {'a': 2 ** 70, 'b': float('inf')}, backend=backend)
+
+    assert_that(load(file_path)).is_equal_to({'a': 2 ** 70, 'b': float('inf')})
+
+
+def test_default_backend():
+    default_backend = serializers.get_default_backend()
+
+    assert_that(default_backend).is_equal_to(serializers.available_backends()[0])
+
+    try:
+        serializers.set_default_backend('json')
+        assert_that(serializers.dumps({"a": 1})).is_equal_to(json.dumps({"a": 1}, indent=4).encode())
+    finally:
+        serializers.set_default_backend(default_backend)
+
+    with pytest.raises(AttributeError):
+        serializers.set_default_backend('not_a_backend')
@@ -0,0 +1,147 @@
+#!/bin/python3
+
+import fcntl
+import os
+import shutil
+import threading
+import time
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector.lock import WaitStrategy
+from file_access_protector.without_backupfile import locked_update, read_json, write_json
+
+_temp_test_folder = "./tests/data/test_data_wait_strategy"
+_file_path = f'{_temp_test_folder}/data.json'
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+    write_json(_file_path, {'a': 1})
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+def hold_lock(seconds: float) -> threading.Thread:
+    locked = threading.Event()
+
+    def hold():
+        with open(_file_path, 'r') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            locked.set()
+            time.sleep(seconds)
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    locked.wait()
+
+    return thread
+
+
+def test_sleep_times():
+    wait = WaitStrategy(spin_time=0, min_wait=0.01, max_wait=0.04, jitter=0.5)
+    sleep_times = wait.sleep_times(time.monotonic() + 10)
+
+    first = [next(sleep_times) for _ in range(5)]
+
+    assert_that(first[0]).is_between(0.005, 0.01)
+    assert_that(first[1]).is_between(0.01, 0.02)
+    for sleep_time in first[2:]:
+        assert_that(sleep_time).is_between(0.02, 0.04)
+
+
+def test_sleep_times_without_jitter():
+    wait = WaitStrategy(spin_time=0, min_wait=0.01, max_wait=0.04, jitter=0)
+    sleep_times = wait.sleep_times(time.monotonic() + 10)
+
+    assert_that([next(sleep_times) for _ in range(4)]).is_equal_to([0.01, 0.02, 0.04, 0.04])
+
+
+def test_sleep_times_stop_at_deadline():
+    wait = WaitStrategy(spin_time=0, min_wait=1, jitter=0)
+
+    assert_that(list(wait.sleep_times(time.monotonic() - 1))).is_empty()
+    # never sleeps past the deadline
+    assert_that(next(wait.sleep_times(time.monotonic() + 0.1))).is_less_than_or_equal_to(0.1)
+
+
+@pytest.mark.parametrize('blocking', [False, True])
+def test_acquire_after_release(blocking):
+    holder = hold_lock(0.1)
+
+    with open(_file_path, 'r') as f:
+        start_time = time.monotonic()
+        WaitStrategy(timeout=2, blocking=blocking).acquire(f.fileno(), fcntl.LOCK_EX)
+        waited = time.monotonic() - start_time
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    holder.join()
+
+    # released after 0.1 s, got within the backoff of max_wait
+    assert_that(waited).is_between(0.05, 0.3)
+
+
+@pytest.mark.parametrize('blocking', [False, True])
+def test_acquire_timeout(blocking):
+    holder = hold_lock(0.5)
+
+    with open(_file_path, 'r') as f:
+        start_time = time.monotonic()
+        with pytest.raises(TimeoutError):
+            WaitStrategy(timeout=0.1, blocking=blocking).acquire(f.fileno(), fcntl.LOCK_EX)
+        waited = time.monotonic() - start_time
+
+    holder.join()
+
+    assert_that(waited).is_between(0.09, 0.2)
+
+
+def test_blocking_timeout_leaves_no_lock():
+    holder = hold_lock(0.2)
+
+    with open(_file_path, 'r') as f:
+        with pytest.raises(TimeoutError):
+            WaitStrategy(timeout=0.05, blocking=True).acquire(f.fileno(), fcntl.LOCK_EX)
+
+        holder.join()
+        # the helper thread gets the lock once released and drops it right away
+        time.sleep(0.05)
+
+        with open(_file_path, 'r') as other:
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(other, fcntl.LOCK_UN)
+
+
+def test_file_lock_timeout_argument():
+    holder = hold_lock(0.5)
+
+    start_time = time.monotonic()
+    with pytest.raises(RuntimeError):
+        read_json(_file_path, timeout=0.1)
+
+    assert_that(time.monotonic() - start_time).is_less_than(0.3)
+
+    holder.join()
+
+
+@pytest.mark.parametrize('wait', [WaitStrategy(timeout=2), WaitStrategy(timeout=2, blocking=True)])
+def test_file_lock_wait_argument(wait):
+    holder = hold_lock(0.1)
+
+    assert_that(read_json(_file_path, wait=wait)).is_equal_to({'a': 1})
+
+    write_json(_file_path, {'a': 2}, wait=wait)
+    with locked_update(_file_path, wait=wait) as content:
+        content['b'] = 3
+
+    holder.join()
+
+    assert_that(read_json(_file_path)).is_equal_to({'a': 2, 'b': 3})
@@ -0,0 +1,95 @@
+#!/bin/python3
+
+import os
+import shutil
+import time
+
+import pytest
+from assertpy import assert_that
+
+from file_access_protector.with_backupfile import json_safe_dump, json_safe_load, yaml_safe_load
+from file_access_protector.writer import CoalescingWriter
+
+_temp_test_folder = "./tests/data/test_data_writer"
+
+
+@pytest.fixture(autouse=True)
+def prepare_test_data():
+    if os.path.exists(_temp_test_folder):
+        shutil.rmtree(_temp_test_folder)
+
+    os.makedirs(_temp_test_folder)
+
+    yield
+
+    shutil.rmtree(_temp_test_folder)
+
+
+def test_writes_are_coalesced():
+    file_path = f'{_temp_test_folder}/state.json'
+
+    with CoalescingWriter(file_path, interval=0.2) as writer:
+        for i in range(100):
+            writer.write({'count': i})
+
+    assert_that(writer.flush_count).is_less_than(5)
+    assert_that(json_safe_load(file_path)).is_equal_to({'count': 99})
+
+
+def test_flush_on_max_pending():
+    file_path = f'{_temp_test_folder}/state.yaml'
+
+    with CoalescingWriter(file_path, interval=60, max_pending=5) as writer:
+        writer.write({'count': 0})
+        time.sleep(0.1)  # first write is due right away
+
+        for i in range(1, 6):
+            writer.write({'count': i})
+
+        deadline = time.time() + 2
+        while writer.pending_count > 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert_that(writer.flush_count).is_equal_to(2)
+        assert_that(yaml_safe_load(file_path)).is_equal_to({'count': 5})
+
+
+def test_explicit_flush_and_closed_writer():
+    file_path = f'{_temp_test_folder}/state.json'
+    writer = CoalescingWriter(file_path, interval=60)
+
+    writer.write({'count': 1})
+    writer.flush()
+    assert_that(json_safe_load(file_path)).is_equal_to({'count': 1})
+
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.write({'count': 2})
+
+
+
+def test_failed_flush_retried_after_interval():
+    file_path = f'{_temp_test_folder}/state.json'
+    call_times = []
+
+    def flaky_dump(file_path, data):
+        call_times.append(time.monotonic())
+        if len(call_times) < 3:
+            raise OSError('disk full')
+
+        json_safe_dump(file_path, data)
+
+    with CoalescingWriter(file_path, interval=0.2, max_pending=1, dump=flaky_dump) as writer:
+        writer.write({'count': 1})
+
+        deadline = time.time() + 2
+        while writer.pending_count > 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+    # max_pending does not make failed flushes retry in a busy loop
+    assert_that(call_times).is_length(3)
+    for previous, current in zip(call_times, call_times[1:]):
+        assert_that(current - previous).is_greater_than_or_equal_to(0.19)
+
+    assert_that(writer.last_error).is_instance_of(OSError)
+    assert_that(json_safe_load(file_path)).is_equal_to({'count': 1})
@@ -1,5 +1,6 @@
 #!/bin/python3
 
+import fcntl
 import os
 import shutil
 import time
@@ -200,13 +201,55 @@ def test_concurrent_yaml_file_access():
     assert_that(backup_content).is_equal_to(_data)
 
 
-@patch('subprocess.call', return_value=1)
-def test_get_file_lock_timeout(mock_subprocess_call):
+def test_get_file_lock_timeout():
     file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
 
-    with pytest.raises(TimeoutError):
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+        with pytest.raises(TimeoutError):
+            r = yaml_safe_load(file_path, timeout=0.1)
+
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def test_get_file_lock_without_subprocess():
+    file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
+
+    with patch('subprocess.call') as mock_subprocess_call:
         r = yaml_safe_load(file_path)
 
+    mock_subprocess_call.assert_not_called()
+
+
+def test_load_with_shared_lock_held():
+    file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'
+
+    with open(file_path, 'r') as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+
+        r = yaml_safe_load(file_path, timeout=0.1)
+
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+    assert_that(r).is_equal_to(_data)
+
+
+def test_load_recover_from_backup():
+    file_path = f'{_temp_test_folder}/recover.yaml'
+    backup_file_path = f'{_temp_test_folder}/recover_backup.yaml'
+
+    with open(file_path, 'w') as f:
+        f.write('[{"corrupted": ')
+    with open(backup_file_path, 'w') as f:
+        yaml.dump({'a': 1}, f)
+
+    r = yaml_safe_load(file_path)
+
+    assert_that(r).is_equal_to({'a': 1})
+    with open(file_path, 'r') as f:
+        assert_that(yaml.load(f, Loader=yaml.CLoader)).is_equal_to({'a': 1})
+
 
 def test_load_file_not_exist():
     file_path = f'{_temp_test_folder}/abc.yaml'
@@ -232,6 +275,24 @@ def test_write_new_file():
     assert_that(os.path.exists(backup_file_path))
 
 
+def test_atomic_dump():
+    file_path = f'{_temp_test_folder}/atomic.yaml'
+    backup_file_path = f'{_temp_test_folder}/atomic_backup.yaml'
+
+    yaml_safe_dump(file_path, {'generation': 1}, atomic=True)
+    first_inode = os.stat(file_path).st_ino
+    yaml_safe_dump(file_path, {'generation': 2}, atomic=True)
+
+    with open(file_path, 'r') as f:
+        assert_that(yaml.load(f, Loader=yaml.CLoader)).is_equal_to({'generation': 2})
+    with open(backup_file_path, 'r') as f:
+        assert_that(yaml.load(f, Loader=yaml.CLoader)).is_equal_to({'generation': 1})
+
+    # previous generation kept as backup without copying it
+    assert_that(os.stat(backup_file_path).st_ino).is_equal_to(first_inode)
+    assert_that([n for n in os.listdir(_temp_test_folder) if n.endswith('.tmp')]).is_empty()
+
+
 @patch('yaml.load', return_value="")
 def test_file_and_backup_corruption_in_load(mock_yaml_load):
     file_path = f'{_temp_test_folder}/{os.path.basename(_test_file_path)}'